@@ -0,0 +1,397 @@
+"""Batched simulation of many tetris games at once with NumPy.
+
+Uses the same rules as tetris.Engine (check_move, make_permanent, check_lines and score_manager), but every board of the batch lives in one array and every step is applied to all of them with array operations. Meant for evaluating placement strategies over tens of thousands of games, not for playing.
+
+Like tetris.Board, every row is an occupancy bitmask with the walls set. Only occupancy is simulated, there is no color layer. Rows are uint32 when the board is narrow enough for it and uint64 otherwise, so wide boards (up to 57 columns) cost one more word per row, not more operations.
+"""
+import numpy as np
+
+from tetris import Board, Constants, PIECES
+
+
+# Piece tables, indexed by kind (index in PIECES) and rotation
+# Rotations past a kind's number of orientations wrap around, just like Piece(rotation)
+ROTATIONS = np.array([len(p.orientations) for p in PIECES], dtype=np.int64)
+MASKS = np.zeros((len(PIECES), 4, 4), dtype=np.uint32)
+for kind, p in enumerate(PIECES):
+    for rotation in range(4):
+        for relative_y, mask in p(rotation).get_masks():
+            MASKS[kind, rotation, relative_y] = mask
+del kind, p, rotation, relative_y, mask
+
+_DY = np.arange(4)
+
+
+class Batch_Engine:
+    """Simulates n games at once. Instead of moving pieces step by step, every board is given a rotation and column for its current piece, which is then hard dropped (make a placement).
+
+    Placements are not checked for whether the piece could actually get from its spawn point to the column, only for where it lands.
+
+    Instance Variables
+    ------------------
+    boards : np.ndarray
+        Array of dtype of shape (n, height + 4). One row of bitmasks per board, see tetris.Board. The 4 extra rows at the bottom are completely full (the floor) so dropping never indexes past the end.
+    current : np.ndarray
+        Kind of the current piece of every board.
+    dtype : np.dtype
+        Type of every row, np.uint32 or (for wider boards) np.uint64.
+    game_over : np.ndarray
+        True for boards that have lost. These boards are no longer changed.
+    height : int
+        Number of rows per board, including the rows pieces start in.
+    held : np.ndarray
+        Kind of the held piece of every board, -1 if nothing is held yet.
+    hidden : int
+        Number of rows at the top of every board where pieces start. A block left in the lowest of them loses the game.
+    lines_complete : np.ndarray
+        Total number of lines completed on every board.
+    n : int
+        Number of boards.
+    queue : np.ndarray
+        The next pieces of every board, shape (n, 5). Column 0 comes next.
+    rng : np.random.Generator
+        Draws the pieces of every board.
+    score : np.ndarray
+        Score of every board.
+    speed : np.ndarray
+        Current speed (seconds per row) of every board.
+    width : int
+        Number of columns per board.
+    _already_held : np.ndarray
+        True for boards that held since their last placement.
+    _empty_row : int
+        Bitmask of a row with nothing but the walls.
+    _full_row : np.ndarray
+        A row with every bit set, of dtype.
+    _index : np.ndarray
+        0 to n - 1, used for picking one row per board.
+    _lines_step_counter : np.ndarray
+        Number of lines left until speed changes on every board.
+    _masks : np.ndarray
+        MASKS as dtype.
+    """
+
+    def __init__(self, n, seed=None, width=Constants.BOARD_WIDTH, height=Constants.BOARD_HEIGHT + Constants.HIDDEN_ROWS, hidden=Constants.HIDDEN_ROWS):
+        """Creates n empty boards and draws their first pieces.
+
+        Parameters
+        ----------
+        n : int
+            Number of boards.
+        seed : int (default = None)
+            Seed of rng. The same seed always gives the same pieces.
+        width : int (default = Constants.BOARD_WIDTH)
+            Number of columns per board.
+        height : int (default = Constants.BOARD_HEIGHT + Constants.HIDDEN_ROWS)
+            Number of rows per board, including the hidden rows pieces start in.
+        hidden : int (default = Constants.HIDDEN_ROWS)
+            Number of rows at the top of every board where pieces start.
+        """
+        # A piece's orientation grid can stick up to 4 columns past the right wall
+        if width + Board.PADDING + 4 <= 32:
+            self.dtype = np.dtype(np.uint32)
+        elif width + Board.PADDING + 4 <= 64:
+            self.dtype = np.dtype(np.uint64)
+        else:
+            raise ValueError(f'width can be at most {64 - Board.PADDING - 4}.')
+
+        self.n = n
+        self.width = width
+        self.height = height
+        self.hidden = hidden
+        self.rng = np.random.default_rng(seed)
+
+        bits = self.dtype.itemsize * 8
+        self._masks = MASKS.astype(self.dtype)
+        self._full_row = np.array((1 << bits) - 1, dtype=self.dtype)
+        self._empty_row = int(Board(width, 1).empty_row) & ((1 << bits) - 1)
+        self.boards = np.full((n, height + 4), self._empty_row, dtype=self.dtype)
+        self.boards[:, height:] = self._full_row
+        self._index = np.arange(n)
+
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lines_complete = np.zeros(n, dtype=np.int64)
+        self.speed = np.full(n, Constants.START_SPEED)
+        self._lines_step_counter = np.full(n, Constants.LINES_SPEED_STEP, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+
+        self.queue = self.rng.integers(len(PIECES), size=(n, 5))
+        self.current = np.empty(n, dtype=np.int64)
+        self.held = np.full(n, -1, dtype=np.int64)
+        self._already_held = np.zeros(n, dtype=bool)
+
+        self.spawn(np.ones(n, dtype=bool))
+
+    def spawn(self, which):
+        """Moves the next piece of the selected boards into current and draws a new piece for the end of their queues.
+
+        Parameters
+        ----------
+        which : np.ndarray
+            Boolean array selecting the boards.
+        """
+        self.current[which] = self.queue[which, 0]
+        self.queue[which, :-1] = self.queue[which, 1:]
+        self.queue[which, -1] = self.rng.integers(len(PIECES), size=np.count_nonzero(which))
+
+    def hold(self, which):
+        """Swaps the current and held pieces of the selected boards, same as Engine.hold. Boards that already held since their last placement or have lost are skipped.
+
+        Parameters
+        ----------
+        which : np.ndarray
+            Boolean array selecting the boards.
+        """
+        which = which & ~self._already_held & ~self.game_over
+
+        first = which & (self.held < 0)
+        swap = which & ~first
+
+        self.held[first] = self.current[first]
+        self.spawn(first)
+
+        self.current[swap], self.held[swap] = self.held[swap], self.current[swap]
+
+        self._already_held |= which
+
+    def _shifted(self, kinds, rotations, xs):
+        """Returns the piece masks moved to their columns, shape (n, 4), and which of them are inside the walls."""
+        shifts = xs + Board.PADDING
+        # Pieces are at most 4 wide, so past this they are completely outside the right wall
+        inside = (shifts >= 0) & (shifts <= self.width + Board.PADDING)
+
+        masks = self._masks[kinds, rotations % ROTATIONS[kinds]]
+        shifts = np.where(inside, shifts, 0).astype(self.dtype)
+        return masks << shifts[:, None], inside
+
+    def fits(self, kinds, rotations, ys, xs):
+        """Checks every board for whether a piece can be at a coordinate. The batched Engine.check_move.
+
+        Parameters
+        ----------
+        kinds : np.ndarray
+            Kind of the piece for every board.
+        rotations : np.ndarray
+            Rotation of the piece for every board.
+        ys : np.ndarray
+            y coordinate of the top left corner of the piece's orientation grid for every board.
+        xs : np.ndarray
+            x coordinate of the top left corner of the piece's orientation grid for every board.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean array, False where the piece would hit a block or be out of bounds.
+        """
+        shifted, inside = self._shifted(kinds, rotations, xs)
+        inside &= (ys >= 0) & (ys <= self.height)
+
+        rows = self.boards[self._index[:, None], np.clip(ys, 0, self.height)[:, None] + _DY]
+        return inside & ~(rows & shifted).any(axis=1)
+
+    def landing(self, kinds, rotations, xs):
+        """Finds where a piece dropped from the top of every board would land.
+
+        Parameters
+        ----------
+        kinds : np.ndarray
+            Kind of the piece for every board.
+        rotations : np.ndarray
+            Rotation of the piece for every board.
+        xs : np.ndarray
+            x coordinate of the top left corner of the piece's orientation grid for every board.
+
+        Returns
+        -------
+        np.ndarray
+            y coordinate the piece lands at for every board, -1 where it does not even fit at the top.
+        """
+        return self._landing(self.boards, kinds, rotations, xs)
+
+    def _landing(self, boards, kinds, rotations, xs):
+        """landing on any rows of boards, one per entry of kinds, rotations and xs."""
+        shifted, inside = self._shifted(kinds, rotations, xs)
+
+        # Every 4 row window of every board, shape (n, height + 1, 4). A view, nothing is copied
+        windows = np.lib.stride_tricks.sliding_window_view(boards, 4, axis=1)
+        hits = (windows & shifted[:, None, :]).any(axis=2)
+
+        # The floor guarantees a hit somewhere, the piece lands right above the first one
+        ys = hits.argmax(axis=1) - 1
+        return np.where(inside, ys, -1)
+
+    def legal(self, rotations, xs):
+        """Checks which boards can place their current piece with a rotation and column: the piece has to fit at the top of the board, inside the walls. Boards that have lost never can.
+
+        Parameters
+        ----------
+        rotations : np.ndarray
+            Rotation of the current piece for every board.
+        xs : np.ndarray
+            x coordinate of the top left corner of the current piece's orientation grid for every board.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean array, True where place would place the piece.
+        """
+        return ~self.game_over & (self.landing(self.current, rotations, xs) >= 0)
+
+    def random_placements(self, rng, tries=8):
+        """Draws a rotation and column for the current piece of every board, uniformly among the legal ones (see legal).
+
+        Every board draws at once, and boards whose draw is illegal draw again. Boards still without a legal draw after tries rounds get every rotation and column checked.
+
+        Parameters
+        ----------
+        rng : np.random.Generator
+            Draws the placements.
+        tries : int (default = 8)
+            Rounds of drawing before checking every placement.
+
+        Returns
+        -------
+        tuple
+            The rotations and xs to pass to place, and a boolean array that is False for boards with no legal placement at all (lost or topped out).
+        """
+        rotations = rng.integers(4, size=self.n)
+        xs = rng.integers(-3, self.width, size=self.n)
+        found = self.legal(rotations, xs)
+
+        for i in range(tries):
+            redraw = np.flatnonzero(~found & ~self.game_over)
+            if not redraw.size:
+                return rotations, xs, found
+            rotations[redraw] = rng.integers(4, size=redraw.size)
+            xs[redraw] = rng.integers(-3, self.width, size=redraw.size)
+            # Only the boards that drew again are checked again
+            found[redraw] = self._landing(self.boards[redraw], self.current[redraw], rotations[redraw], xs[redraw]) >= 0
+
+        stuck = np.flatnonzero(~found & ~self.game_over)
+        if stuck.size:
+            # Every rotation and column, the grid can start up to 3 columns past the left wall
+            candidate_rotations = np.repeat(np.arange(4), self.width + 3)
+            candidate_xs = np.tile(np.arange(-3, self.width), 4)
+            ys = self._landing(
+                np.repeat(self.boards[stuck], candidate_xs.size, axis=0), np.repeat(self.current[stuck], candidate_xs.size),
+                np.tile(candidate_rotations, stuck.size), np.tile(candidate_xs, stuck.size),
+            ).reshape(stuck.size, candidate_xs.size)
+
+            # A random key per legal candidate, the highest one is picked
+            keys = np.where(ys >= 0, rng.random(ys.shape), -1)
+            picks = keys.argmax(axis=1)
+            rotations[stuck] = candidate_rotations[picks]
+            xs[stuck] = candidate_xs[picks]
+            found[stuck] = keys[np.arange(stuck.size), picks] >= 0
+
+        return rotations, xs, found
+
+    def place(self, rotations, xs):
+        """Hard drops the current piece of every board that has not lost, with the given rotation and column. Then clears lines, updates scores and speeds, gets the next pieces and checks for losses, the batched Engine.hard_drop.
+
+        Boards whose piece does not fit at the top with that rotation and column (see legal) are left unchanged, like a move Engine.check_move refuses.
+
+        Parameters
+        ----------
+        rotations : np.ndarray
+            Rotation to place the current piece with on every board.
+        xs : np.ndarray
+            x coordinate of the top left corner of the current piece's orientation grid on every board.
+
+        Returns
+        -------
+        np.ndarray
+            Number of lines cleared on every board.
+        """
+        ys = self.landing(self.current, rotations, xs)
+        active = ~self.game_over & (ys >= 0)
+
+        # make_permanent
+        shifted, inside = self._shifted(self.current, rotations, xs)
+        index = self._index[active]
+        self.boards[index[:, None], ys[active][:, None] + _DY] |= shifted[active]
+
+        self.spawn(active)
+        self._already_held[active] = False
+
+        lines = self.check_lines()
+
+        # Check for loss after completing and clearing any lines
+        self.game_over |= self.boards[:, self.hidden - 1] != self._empty_row
+
+        return lines
+
+    def check_lines(self):
+        """Clears the completed lines of every board, moving everything above them down, and updates scores. The batched Engine.check_lines.
+
+        Returns
+        -------
+        np.ndarray
+            Number of lines cleared on every board.
+        """
+        field = self.boards[:, :self.height]
+        full = field == self._full_row
+        lines = full.sum(axis=1)
+
+        cleared = lines > 0
+        if cleared.any():
+            # Stable sort full rows (False) to the top, keeping the rest in order, then empty them
+            order = np.argsort(~full[cleared], axis=1, kind='stable')
+            compacted = np.take_along_axis(field[cleared], order, axis=1)
+            compacted[np.arange(self.height)[None, :] < lines[cleared][:, None]] = self._empty_row
+            field[cleared] = compacted
+
+            self.score_manager(lines)
+
+        return lines
+
+    def score_manager(self, lines):
+        """Adds to the score, lines completed and speed of every board. The batched Engine.score_manager.
+
+        Parameters
+        ----------
+        lines : np.ndarray
+            Number of lines cleared on every board.
+        """
+        self.score += 100 * lines
+        self.lines_complete += lines
+        self.score[lines == 4] += 100
+
+        self._lines_step_counter -= lines
+        step = self._lines_step_counter <= 0
+        # Allow excess lines to overflow to next counter
+        self._lines_step_counter[step] += Constants.LINES_SPEED_STEP
+        self.speed[step] *= Constants.SPEED_STEP
+
+    def get_rows(self, i):
+        """Returns the rows of board i as a list of Python ints in the same layout as tetris.Board.rows (without the floor)."""
+        # Sign extend, so the right wall goes on forever like in Board
+        return [int(row) - (1 << self.dtype.itemsize * 8) for row in self.boards[i, :self.height]]
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Plays many games with random legal placements to measure batch simulation speed.')
+    parser.add_argument('--boards', type=int, default=10000, help='number of boards (default: %(default)s)')
+    parser.add_argument('--placements', type=int, default=200, help='placements per board (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for pieces and placements (default: %(default)s)')
+    parser.add_argument('--width', type=int, default=Constants.BOARD_WIDTH, help='columns per board (default: %(default)s)')
+    parser.add_argument('--height', type=int, default=Constants.BOARD_HEIGHT, help='displayed rows per board (default: %(default)s)')
+    parser.add_argument('--hidden', type=int, default=Constants.HIDDEN_ROWS, help='rows above the displayed ones where pieces start (default: %(default)s)')
+    args = parser.parse_args()
+
+    batch = Batch_Engine(args.boards, args.seed, args.width, args.height + args.hidden, args.hidden)
+    rng = np.random.default_rng(args.seed)
+
+    start = time.perf_counter()
+    for i in range(args.placements):
+        rotations, xs, found = batch.random_placements(rng)
+        # A piece that fits nowhere at the top has topped out
+        batch.game_over |= ~found
+        batch.place(rotations, xs)
+    elapsed = time.perf_counter() - start
+
+    print(f'{args.boards * args.placements / elapsed:,.0f} placements/sec')
+    print(f'{np.count_nonzero(batch.game_over)} of {batch.n} games lost, mean score {batch.score.mean():.1f}')
@@ -0,0 +1,256 @@
+"""Benchmarks of the engine and renderer hot paths of tetris.py, with fixed seeds so runs can be compared.
+
+Every benchmark is timed a few times and the best rate is kept (the least disturbed run). Results can be saved as a baseline, and later runs are compared against it, reporting every benchmark that got slower by more than a threshold.
+
+Usage:
+    python benchmark.py --save       # measure and store the baseline
+    python benchmark.py              # measure and compare against the baseline
+"""
+import json
+import os
+import platform
+import sys
+import time
+from random import Random
+
+from tetris import Board, Engine, Field_Renderer, PIECES, Palette, render
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+
+def set_cell(board, y, x, color):
+    """Puts a single block on board, keeping every layer of it consistent. For building test boards only."""
+    board.rows[y] |= 1 << (x + Board.PADDING)
+    board.colors[y][x] = color
+    board.counts[y] += 1
+    board.skyline[x] = min(board.skyline[x], y)
+
+
+def random_board(rng, height, size=(10, 23)):
+    """Returns a board (of size columns by rows) filled up to height rows with random blocks and holes, like a game in progress. No row is full."""
+    board = Board(*size)
+    for y in range(board.height - height, board.height):
+        holes = rng.sample(range(board.width), rng.randint(1, 4))
+        for x in range(board.width):
+            if x not in holes:
+                set_cell(board, y, x, rng.choice(Palette.BLOCKS))
+    return board
+
+
+def line_board(rng, lines):
+    """Returns a board whose bottom 4 rows (where a piece was just placed) have lines full rows among them, plus the rows place would report."""
+    board = random_board(rng, 8)
+    rows = list(range(board.height - 4, board.height))
+
+    for y in rng.sample(rows, lines):
+        for x in range(board.width):
+            if not board.colors[y][x]:
+                set_cell(board, y, x, rng.choice(Palette.BLOCKS))
+
+    return board, rows
+
+
+def bench_render(rng, n=50):
+    """render() of whole boards with a piece over them."""
+    boards = [random_board(rng, rng.randint(0, 15)) for i in range(10)]
+    start = time.perf_counter()
+    for i in range(n):
+        board = boards[i % len(boards)]
+        render(board.colors[3:], PIECES[i % len(PIECES)](), [5, 3])
+    return n, time.perf_counter() - start
+
+
+def bench_draw(width=10, height=20):
+    """Field_Renderer.draw of a piece moving over a board, the per-frame render of the game."""
+    def bench(rng, n=5000):
+        board = random_board(rng, height // 2, (width, height + 3))
+        renderer = Field_Renderer(board, 3)
+        moves = [(PIECES[rng.randrange(len(PIECES))](rng.randrange(4)), [rng.randrange(3, 3 + height // 2), rng.randrange(0, width - 3)]) for i in range(n)]
+
+        start = time.perf_counter()
+        for piece, coord in moves:
+            renderer.draw(piece, coord)
+        return n, time.perf_counter() - start
+
+    bench.__doc__ = f'Field_Renderer.draw of a piece moving over a {width}x{height} board, the per-frame render of the game.'
+    return bench
+
+
+def bench_check_move(width=10, height=20):
+    """Engine.check_move of random pieces and coordinates on boards in progress."""
+    def bench(rng, n=200000):
+        engine = Engine(seed=0, width=width, height=height)
+        boards = [random_board(rng, rng.randint(0, height * 3 // 4), (width, height + 3)) for i in range(10)]
+        moves = [(PIECES[rng.randrange(len(PIECES))](rng.randrange(4)), [rng.randrange(-1, height + 2), rng.randrange(-2, width)]) for i in range(1000)]
+
+        start = time.perf_counter()
+        for i in range(n // len(moves)):
+            engine.board = boards[i % len(boards)]
+            for piece, coord in moves:
+                engine.check_move(piece, coord)
+        return n // len(moves) * len(moves), time.perf_counter() - start
+
+    bench.__doc__ = f'Engine.check_move of random pieces and coordinates on {width}x{height} boards in progress.'
+    return bench
+
+
+def bench_check_lines(lines):
+    """Board.clear_lines after a placement that completed lines (0 to 4) lines."""
+    def bench(rng, n=20000):
+        boards = [line_board(rng, lines) for i in range(n)]
+        start = time.perf_counter()
+        for board, rows in boards:
+            board.clear_lines(rows)
+        return n, time.perf_counter() - start
+
+    bench.__doc__ = f'Board.clear_lines after a placement that completed {lines} line{"" if lines == 1 else "s"}.'
+    return bench
+
+
+def bench_rotate(rng, n=500000):
+    """Piece.rotate_cw followed by get_blocks, for every piece."""
+    pieces = [p() for p in PIECES]
+    start = time.perf_counter()
+    for i in range(n // len(pieces)):
+        for piece in pieces:
+            piece.rotate_cw().get_blocks()
+    return n // len(pieces) * len(pieces), time.perf_counter() - start
+
+
+def bench_piece_buffer(mode):
+    """Taking pieces from a Piece_Buffer."""
+    def bench(rng, n=200000):
+        buffer = Engine.Piece_Buffer(rng.randrange(1 << 32), mode)
+        start = time.perf_counter()
+        for i in range(n):
+            next(buffer)
+        return n, time.perf_counter() - start
+
+    bench.__doc__ = f"Taking pieces from a '{mode}' Piece_Buffer."
+    return bench
+
+
+def bench_game(width=10, height=20):
+    """Whole placements of a headless game: rotating and moving the piece to a random column, then hard dropping it. Lost games are restarted."""
+    def bench(rng, n=20000):
+        engine = Engine(seed=rng.randrange(1 << 32), width=width, height=height)
+        plans = [(rng.randrange(4), rng.randrange(-width // 2, width // 2 + 1)) for i in range(1000)]
+
+        start = time.perf_counter()
+        for i in range(n):
+            if engine.game_over:
+                engine = Engine(seed=i, width=width, height=height)
+
+            rotations, shift = plans[i % len(plans)]
+            for r in range(rotations):
+                engine.step('rotate_cw')
+            for s in range(abs(shift)):
+                engine.step('right' if shift > 0 else 'left')
+            engine.step('hard_drop')
+        return n, time.perf_counter() - start
+
+    bench.__doc__ = f'Whole placements of a headless game on a {width}x{height} board: rotating and moving the piece to a random column, then hard dropping it. Lost games are restarted.'
+    return bench
+
+
+BENCHMARKS = {
+    'render': bench_render,
+    'draw': bench_draw(),
+    'draw_40x80': bench_draw(40, 80),
+    'check_move': bench_check_move(),
+    'check_move_40x80': bench_check_move(40, 80),
+    **{f'check_lines_{lines}': bench_check_lines(lines) for lines in range(5)},
+    'rotate_get_blocks': bench_rotate,
+    'piece_buffer_uniform': bench_piece_buffer('uniform'),
+    'piece_buffer_bag': bench_piece_buffer('bag'),
+    'game_placements': bench_game(),
+    'game_placements_40x80': bench_game(40, 80),
+}
+
+
+def run(names, seed=0, repeat=5):
+    """Runs benchmarks and returns the best rate of each.
+
+    Parameters
+    ----------
+    names : str list
+        Keys of BENCHMARKS to run.
+    seed : int (default = 0)
+        Seed of every benchmark's inputs. Every repeat uses the same inputs.
+    repeat : int (default = 5)
+        Number of times each benchmark is run.
+
+    Returns
+    -------
+    dict
+        Operations per second of every benchmark.
+    """
+    results = dict()
+    for name in names:
+        best = 0
+        for i in range(repeat):
+            ops, elapsed = BENCHMARKS[name](Random(seed))
+            best = max(best, ops / elapsed)
+        results[name] = best
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints results next to baseline and returns the names of the benchmarks that are more than threshold (a fraction) slower."""
+    regressions = []
+
+    print(f'{"benchmark":<24}{"ops/sec":>14}{"baseline":>14}{"change":>9}')
+    for name, rate in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f'{name:<24}{rate:>14,.0f}{"-":>14}{"":>9}')
+            continue
+
+        change = rate / base - 1
+        flag = ''
+        if change < -threshold:
+            regressions.append(name)
+            flag = '  SLOWER'
+        print(f'{name:<24}{rate:>14,.0f}{base:>14,.0f}{change:>+9.1%}{flag}')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmarks the hot paths of tetris.py and compares them against a stored baseline.')
+    parser.add_argument('names', nargs='*', metavar='NAME', help=f'benchmarks to run, any of {", ".join(BENCHMARKS)} (default: all)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline file (default: %(default)s)')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline instead of comparing')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown (as a fraction) reported as a regression (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each benchmark, the best one counts (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the benchmark inputs (default: %(default)s)')
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark {name!r}')
+    machine = {'python': platform.python_version(), 'machine': platform.machine(), 'seed': args.seed}
+
+    baseline = {'machine': machine, 'results': dict()}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline['machine'] != machine:
+            print(f'Warning: the baseline was measured with {baseline["machine"]}, this run is {machine}.', file=sys.stderr)
+
+    results = run(names, args.seed, args.repeat)
+    regressions = compare(results, baseline['results'], args.threshold)
+
+    if args.save:
+        baseline['machine'] = machine
+        baseline['results'].update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=4)
+        print(f'Saved baseline to {args.baseline}')
+    elif regressions:
+        print(f'{len(regressions)} benchmark{"" if len(regressions) == 1 else "s"} more than {args.threshold:.0%} slower than the baseline: {", ".join(regressions)}')
+        sys.exit(1)
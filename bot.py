@@ -0,0 +1,549 @@
+"""Placement search for automated play of tetris.Engine.
+
+For the current piece (and the piece hold would give), every legal final placement is found: a rotation and column the piece can be moved to from where it starts, then hard dropped. Moves follow the same rules as Engine (check_move): rotations happen where the piece starts, then it slides sideways, then it drops. Each placement is applied to a copy of the board's occupancy rows and scored by a pluggable scoring function, and the best one wins.
+
+Boards are handled as tuples of Board row bitmasks, which are cheap to copy and hashable, so the placements and scores of positions that come up again are memoized in transposition caches.
+
+Lookahead searches sequences of placements over the preview of coming pieces in a pool of processes.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+from time import monotonic
+
+from tetris import Board, LRU_Cache
+
+
+Placement = namedtuple('Placement', ['hold', 'rotation', 'x', 'y', 'lines', 'score'])
+Placement.__doc__ = """A final position of a piece. hold is True if the piece is the one hold gives, rotation is the piece's rotation, x and y the coordinate of the top left corner of its orientation grid, lines the number of lines placing it clears and score its score."""
+
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    # Before Python 3.10
+    def popcount(n):
+        """Returns the number of set bits of a non-negative int."""
+        return bin(n).count('1')
+
+
+def features(rows, width):
+    """Measures a board for scoring.
+
+    Parameters
+    ----------
+    rows : int tuple
+        The occupancy bitmasks of the board, top to bottom, like Board.rows.
+    width : int
+        Number of columns of the board.
+
+    Returns
+    -------
+    int tuple
+        The aggregate height (sum of the column heights), number of holes (empty cells with a block somewhere above them), bumpiness (sum of the height differences of neighboring columns) and the highest column height.
+    """
+    field = ((1 << width) - 1) << Board.PADDING
+    height = len(rows)
+
+    heights = [0 for x in range(width)]
+    aggregate = holes = 0
+    # Columns that have a block in this row or above
+    covered = 0
+
+    for y, row in enumerate(rows):
+        row &= field
+
+        new = row & ~covered
+        if new:
+            covered |= new
+            while new:
+                lowest = new & -new
+                heights[lowest.bit_length() - 1 - Board.PADDING] = height - y
+                new ^= lowest
+
+        if covered:
+            # Every covered column is 1 taller because of this row
+            aggregate += popcount(covered)
+            holes += popcount(covered & ~row)
+
+    bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+    return aggregate, holes, bumpiness, max(heights)
+
+
+def el_tetris(rows, lines, width):
+    """The default scoring function, a weighted sum of features and lines cleared. Higher is better.
+
+    Weights from Yiyuan Lee's tuned heuristic for tetris bots.
+
+    Parameters
+    ----------
+    rows : int tuple
+        The occupancy bitmasks of the board after the placement, like Board.rows.
+    lines : int
+        Number of lines the placement cleared.
+    width : int
+        Number of columns of the board.
+
+    Returns
+    -------
+    float
+        Score of the placement.
+    """
+    aggregate, holes, bumpiness, top = features(rows, width)
+    return -0.510066 * aggregate + 0.760666 * lines - 0.35663 * holes - 0.184483 * bumpiness
+
+
+def fits(rows, masks, y, x):
+    """Board.fits for a tuple of rows and the masks of an orientation (see Piece.get_masks)."""
+    shift = x + Board.PADDING
+    if shift < 0:
+        return False
+
+    height = len(rows)
+    for relative_y, mask in masks:
+        row = y + relative_y
+        if row < 0 or row >= height or rows[row] & (mask << shift):
+            return False
+
+    return True
+
+
+def column_tops(rows, width):
+    """Board.skyline for a tuple of rows: the row of the highest block in every column, len(rows) if it is empty."""
+    field = ((1 << width) - 1) << Board.PADDING
+    tops = [len(rows) for x in range(width)]
+
+    covered = 0
+    for y, row in enumerate(rows):
+        new = row & field & ~covered
+        while new:
+            lowest = new & -new
+            tops[lowest.bit_length() - 1 - Board.PADDING] = y
+            new ^= lowest
+        covered |= row & field
+        if covered == field:
+            break
+
+    return tops
+
+
+def place(rows, masks, y, x, width):
+    """Board.place followed by Board.clear_lines on a copy of rows.
+
+    Returns
+    -------
+    tuple
+        The new rows and the number of lines cleared.
+    """
+    shift = x + Board.PADDING
+    new = list(rows)
+
+    full = []
+    for relative_y, mask in masks:
+        new[y + relative_y] |= mask << shift
+        if new[y + relative_y] == Board.FULL_ROW:
+            full.append(y + relative_y)
+
+    if full:
+        for row in reversed(full):
+            del new[row]
+        empty_row = ~(((1 << width) - 1) << Board.PADDING)
+        new[:0] = [empty_row for row in full]
+
+    return tuple(new), len(full)
+
+
+class Searcher:
+    """Finds the best placement of the current or hold piece of an Engine.
+
+    Instance Variables
+    ------------------
+    score : callable
+        Scoring function, called as score(rows, lines, width) with the rows after a placement. Higher is better. See el_tetris.
+    _placements : LRU_Cache
+        Transposition cache of the placements of a piece from a start coordinate on a board.
+    _scores : LRU_Cache
+        Transposition cache of the score of a board after a placement.
+    """
+
+    def __init__(self, score=el_tetris, cache_size=1 << 16):
+        """Creates a searcher with empty caches.
+
+        Parameters
+        ----------
+        score : callable (default = el_tetris)
+            Scoring function, see score.
+        cache_size : int (default = 65536)
+            Most positions kept in each transposition cache.
+        """
+        self.score = score
+
+        self._placements = LRU_Cache(cache_size)
+        self._scores = LRU_Cache(cache_size)
+
+    def placements(self, rows, piece, coord, width):
+        """Finds every legal hard drop of piece.
+
+        Parameters
+        ----------
+        rows : int tuple
+            The occupancy bitmasks of the board.
+        piece : Piece-like
+            The piece, in the rotation it starts in.
+        coord : int list
+            The y, x coordinate the piece starts at.
+        width : int
+            Number of columns of the board.
+
+        Returns
+        -------
+        tuple
+            A (rotation, x, y, rows, lines) tuple for every placement: the final rotation and coordinate, the rows after placing it and the lines it cleared.
+        """
+        key = (rows, piece, coord[0], coord[1])
+        return self._placements.get(key, lambda: tuple(self._find_placements(rows, piece, coord, width)))
+
+    def _find_placements(self, rows, piece, coord, width):
+        """Yields every hard drop of piece from coord: each rotation it can turn to where it starts, moved to each column it can reach at that row, then dropped. The tuples are those placements returns."""
+        y, start_x = coord
+        states = len(piece.orientations)
+        tops = column_tops(rows, width)
+
+        for turns in range(states):
+            # Rotate the way that takes fewer presses, like Searcher.play does
+            rotated = piece
+            for i in range(turns if turns * 2 <= states else states - turns):
+                rotated = rotated.rotate_cw() if turns * 2 <= states else rotated.rotate_ccw()
+                if not fits(rows, rotated.get_masks(), y, start_x):
+                    break
+            else:
+                masks = rotated.get_masks()
+                if not fits(rows, masks, y, start_x):
+                    continue
+
+                left = start_x
+                while fits(rows, masks, y, left - 1):
+                    left -= 1
+                right = start_x
+                while fits(rows, masks, y, right + 1):
+                    right += 1
+
+                # If the piece is above the highest block of every column it covers, it lands on one of them. Otherwise (it is under an overhang, like after gravity moved it down) the skyline says nothing about what is below it, so it is dropped a row at a time
+                columns = rotated.get_columns()
+                for x in range(left, right + 1):
+                    drop = min(tops[x + relative_x] - 1 - bottom for relative_x, top, bottom in columns)
+                    if drop < y:
+                        drop = y
+                        while fits(rows, masks, drop + 1, x):
+                            drop += 1
+
+                    new, lines = place(rows, masks, drop, x, width)
+                    yield rotated.rotation, x, drop, new, lines
+
+    def evaluate(self, rows, lines, width, hidden):
+        """Returns the score of the board after a placement, -inf if the placement loses the game (leaves a block in the lowest of the hidden rows, like in Engine.check_lines)."""
+        def make():
+            empty_row = ~(((1 << width) - 1) << Board.PADDING)
+            if rows[hidden - 1] != empty_row:
+                return float('-inf')
+            return self.score(rows, lines, width)
+
+        return self._scores.get((rows, lines, hidden), make)
+
+    def best(self, engine):
+        """Finds the best placement of engine's current piece, or of the piece hold would give if holding is allowed.
+
+        Parameters
+        ----------
+        engine : tetris.Engine
+            The game to search.
+
+        Returns
+        -------
+        Placement
+            The best placement, None if the piece cannot be placed anywhere. Ties go to the first placement found.
+        """
+        rows = tuple(engine.board.rows)
+        width = engine.board.width
+        hidden = engine.hidden
+
+        options = [(False, engine.current, engine.current_coord)]
+        if engine.held is None:
+            # Holding for the first time brings in the next piece
+            options.append((True, engine.piece_buffer.peek(1)[0], engine.spawn_coord()))
+        elif not engine._already_held:
+            options.append((True, engine.held, engine.spawn_coord()))
+
+        best = None
+        for hold, piece, coord in options:
+            for rotation, x, y, new, lines in self.placements(rows, piece, coord, width):
+                score = self.evaluate(new, lines, width, hidden)
+                if best is None or score > best.score:
+                    best = Placement(hold, rotation, x, y, lines, score)
+
+        return best
+
+    def play(self, engine, placement):
+        """Makes a placement by stepping engine (hold, rotations, moves and a hard drop), so it is recorded like a player's input.
+
+        Parameters
+        ----------
+        engine : tetris.Engine
+            The game to play in.
+        placement : Placement
+            A placement returned by best for the engine's current state.
+        """
+        if placement.hold:
+            engine.step('hold')
+
+        states = len(engine.current.orientations)
+        turns = (placement.rotation - engine.current.rotation) % states
+        if turns * 2 <= states:
+            for i in range(turns):
+                engine.step('rotate_cw')
+        else:
+            for i in range(states - turns):
+                engine.step('rotate_ccw')
+
+        shift = placement.x - engine.current_coord[1]
+        for i in range(abs(shift)):
+            engine.step('right' if shift > 0 else 'left')
+
+        engine.step('hard_drop')
+
+
+class Timeout(Exception):
+    """Raised inside a lookahead search that ran past its deadline."""
+
+
+# The Searcher of a lookahead worker process, made by _init_worker. Its caches live as long as the process
+_worker_searcher = None
+
+
+def _init_worker(score):
+    """Initializer of lookahead worker processes."""
+    global _worker_searcher
+
+    _worker_searcher = Searcher(score)
+
+
+def _children(searcher, state, width, spawn):
+    """Generates every move from a lookahead state.
+
+    A state is a (rows, current, coord, held, can_hold, queue) tuple: the board, the current piece and its coordinate, the held piece, whether holding is allowed and the pieces still known to come.
+
+    Yields
+    ------
+    tuple
+        The Placement of the move (without a score), the rows after it and the state after it. The state is None when the queue has run out, so the search cannot go deeper.
+    """
+    rows, current, coord, held, can_hold, queue = state
+
+    options = [(False, current, coord, held, queue)]
+    if can_hold:
+        if held is None:
+            # Holding for the first time brings in the next piece
+            if queue:
+                options.append((True, queue[0], spawn, current, queue[1:]))
+        else:
+            options.append((True, held, spawn, current, queue))
+
+    for hold, piece, start, new_held, new_queue in options:
+        for rotation, x, y, new_rows, lines in searcher.placements(rows, piece, start, width):
+            child = None
+            if new_queue:
+                child = (new_rows, new_queue[0], spawn, new_held, True, new_queue[1:])
+            yield Placement(hold, rotation, x, y, lines, None), new_rows, child
+
+
+def _value(searcher, rows, state, lines, depth, width, hidden, spawn, deadline):
+    """Returns the best score reachable from a position within depth more placements. rows (after lines were cleared so far) is scored when depth runs out, the queue runs out or the game is lost."""
+    value = searcher.evaluate(rows, lines, width, hidden)
+    if depth == 0 or state is None or value == float('-inf'):
+        return value
+
+    if deadline is not None and monotonic() > deadline:
+        raise Timeout()
+
+    best = float('-inf')
+    for placement, new_rows, child in _children(searcher, state, width, spawn):
+        best = max(best, _value(searcher, new_rows, child, lines + placement.lines, depth - 1, width, hidden, spawn, deadline))
+    return best
+
+
+def _search_task(rows, state, lines, depth, width, hidden, spawn, deadline):
+    """Runs _value in a worker process. Returns None if the deadline passed."""
+    try:
+        return _value(_worker_searcher, rows, state, lines, depth, width, hidden, spawn, deadline)
+    except Timeout:
+        return None
+
+
+class Lookahead:
+    """Plans placements over the Piece_Buffer preview and the hold slot, a number of pieces deep. Every sequence of placements (with or without holding) is explored and the first placement of the sequence that leads to the best scored board wins.
+
+    The subtrees below the first placement are searched in a pool of worker processes. With a time budget, the search deepens one piece at a time and keeps the result of the deepest search that finished in time. A finished search of a given depth always gives the same result for the same position, ties going to the first placement found, so the budget only decides how deep it gets.
+
+    Instance Variables
+    ------------------
+    budget : float
+        Seconds each search may take, None for no limit.
+    depth : int
+        Most placements to look ahead, including the first.
+    depth_reached : int
+        Depth of the search that gave the last result.
+    searcher : Searcher
+        Finds placements and scores for the first placement (in this process).
+    _pool : concurrent.futures.ProcessPoolExecutor
+        The worker processes. None to search in this process.
+    """
+
+    def __init__(self, depth=2, budget=None, workers=None, score=el_tetris):
+        """Starts the worker processes.
+
+        Parameters
+        ----------
+        depth : int (default = 2)
+            Most placements to look ahead, including the first.
+        budget : float (default = None)
+            Seconds each search may take. If None, searches always go to depth.
+        workers : int (default = None)
+            Number of worker processes. If None, one per CPU. If 0, everything is searched in this process.
+        score : callable (default = el_tetris)
+            Scoring function, see Searcher.score. Has to be picklable (defined at the top level of a module).
+        """
+        self.depth = depth
+        self.budget = budget
+        self.depth_reached = 0
+
+        self.searcher = Searcher(score)
+
+        self._pool = None
+        if workers != 0:
+            self._pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(score,))
+        else:
+            _init_worker(score)
+
+    def best(self, engine):
+        """Finds the placement of engine's current piece (or the piece hold would give) that starts the best sequence.
+
+        Parameters
+        ----------
+        engine : tetris.Engine
+            The game to search.
+
+        Returns
+        -------
+        Placement
+            The first placement of the best sequence, with the score of the board it leads to. None if the piece cannot be placed anywhere.
+        """
+        deadline = None if self.budget is None else monotonic() + self.budget
+
+        width = engine.board.width
+        hidden = engine.hidden
+        spawn = tuple(engine.spawn_coord())
+        can_hold = engine.held is None or not engine._already_held
+        state = (tuple(engine.board.rows), engine.current, tuple(engine.current_coord), engine.held, can_hold, tuple(engine.piece_buffer.pieces))
+
+        moves = list(_children(self.searcher, state, width, spawn))
+        if not moves:
+            return None
+
+        best = None
+        for depth in range(1, self.depth + 1):
+            values = self._search(moves, depth, width, hidden, spawn, deadline)
+            if values is None:
+                break
+
+            index = max(range(len(moves)), key=lambda i: (values[i], -i))
+            best = moves[index][0]._replace(score=values[index])
+            self.depth_reached = depth
+
+            if deadline is not None and monotonic() > deadline:
+                break
+
+        if best is None:
+            # Not even the first depth finished in time, fall back to the placement alone
+            values = [self.searcher.evaluate(rows, placement.lines, width, hidden) for placement, rows, child in moves]
+            index = max(range(len(moves)), key=lambda i: (values[i], -i))
+            best = moves[index][0]._replace(score=values[index])
+            self.depth_reached = 1
+
+        return best
+
+    def _search(self, moves, depth, width, hidden, spawn, deadline):
+        """Returns the value of every first move searched to depth, or None if the deadline passed first."""
+        if depth == 1:
+            return [self.searcher.evaluate(rows, placement.lines, width, hidden) for placement, rows, child in moves]
+
+        tasks = [(rows, child, placement.lines, depth - 1, width, hidden, spawn, deadline) for placement, rows, child in moves]
+
+        if self._pool is None:
+            values = [_search_task(*task) for task in tasks]
+        else:
+            futures = [self._pool.submit(_search_task, *task) for task in tasks]
+            timeout = None if deadline is None else max(0, deadline - monotonic())
+            done, pending = wait(futures, timeout)
+            if pending:
+                # The tasks still running give up at the deadline on their own
+                for future in pending:
+                    future.cancel()
+                return None
+            values = [future.result() for future in futures]
+
+        if None in values:
+            return None
+        return values
+
+    def close(self):
+        """Stops the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    def play(self, engine, placement):
+        """Makes a placement, see Searcher.play."""
+        self.searcher.play(engine, placement)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from tetris import Constants, Engine
+
+    parser = argparse.ArgumentParser(description='Plays games with the placement search and reports its speed and results.')
+    parser.add_argument('--games', type=int, default=5, help='number of games (default: %(default)s)')
+    parser.add_argument('--pieces', type=int, default=1000, help='most pieces per game (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game, the others follow (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=1, help='placements to look ahead, more than 1 uses the preview (default: %(default)s)')
+    parser.add_argument('--budget', type=float, help='with --depth, seconds per piece (default: no limit)')
+    parser.add_argument('--workers', type=int, help='with --depth, worker processes, 0 for none (default: one per CPU)')
+    parser.add_argument('--width', type=int, default=Constants.BOARD_WIDTH, help='columns of the board (default: %(default)s)')
+    parser.add_argument('--height', type=int, default=Constants.BOARD_HEIGHT, help='displayed rows of the board (default: %(default)s)')
+    parser.add_argument('--hidden', type=int, default=Constants.HIDDEN_ROWS, help='rows above the displayed ones where pieces start (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.depth > 1:
+        searcher = Lookahead(args.depth, args.budget, args.workers)
+    else:
+        searcher = Searcher()
+    pieces = 0
+
+    start = time.perf_counter()
+    for game in range(args.games):
+        engine = Engine(seed=args.seed + game, width=args.width, height=args.height, hidden=args.hidden)
+        for i in range(args.pieces):
+            placement = searcher.best(engine)
+            if placement is None:
+                break
+
+            searcher.play(engine, placement)
+            pieces += 1
+            if engine.game_over:
+                break
+
+        print(f'seed {args.seed + game}: {engine.lines_complete} lines, score {engine.score}, {"lost" if engine.game_over else "not lost"}')
+
+    print(f'{pieces / (time.perf_counter() - start):,.0f} pieces/sec (searched and played)')
+
+    if args.depth > 1:
+        searcher.close()
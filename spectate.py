@@ -0,0 +1,544 @@
+"""Broadcasting a running game to spectators.
+
+The game publishes to a Spectator_Server once per frame. Only what changed is sent: a delta with the cells whose displayed color changed (found by Field_View, the same way the renderers find what to redraw) plus the score and the falling piece. Every so often (and whenever a new game starts) a keyframe with the whole displayed gamefield is sent instead, so spectators that join or fall behind can start over from it.
+
+The tk thread only encodes the update and hands it to the server's asyncio event loop, which runs on its own thread and does all the work per spectator. Every spectator has a bounded queue of messages waiting to be sent. When it is full, the spectator is too slow: it is marked as behind and nothing more is queued for it. Once it has sent everything still in its queue, it is queued the last keyframe and the deltas since, so it catches up without the game waiting on it. Spectators that fall behind again before catching up (or are still behind at the next keyframe) too many times in a row are dropped.
+
+Message format: every message is prefixed by its length (uint32) and starts with HEADER: the kind (KEYFRAME or DELTA), a sequence number, score, lines, the falling piece's index in PIECES (NO_PIECE for none), its rotation and its y, x coordinate. A keyframe then has the width and height (uint16) and one byte per displayed cell, row by row. A delta has the number of cells (uint16), then a CELL for every changed cell. Cell colors are indexes in COLORS.
+
+Usage:
+    python spectate.py                   # play with spectators allowed
+    python spectate.py --watch           # watch the game
+    python spectate.py --bench 300       # connect 300 headless spectators and report what they received
+"""
+import asyncio
+import queue
+import struct
+import threading
+from collections import namedtuple
+
+from tetris import Constants, Field_View, Game, PIECES, Palette, tk
+
+
+# Every color a displayed cell can have, the wire value is the index
+COLORS = (None,) + Palette.BLOCKS + (Palette.GARBAGE,)
+_COLOR_INDEX = {color: i for i, color in enumerate(COLORS)}
+_PIECE_INDEX = {p: i for i, p in enumerate(PIECES)}
+NO_PIECE = 255
+
+# Message kinds
+KEYFRAME = 0
+DELTA = 1
+
+LENGTH = struct.Struct('<I')
+HEADER = struct.Struct('<BIIIBBhh')
+# Width and height of a keyframe
+SIZE = struct.Struct('<HH')
+# Number of cells of a delta
+COUNT = struct.Struct('<H')
+# Displayed row, x and color index of a changed cell
+CELL = struct.Struct('<HHB')
+
+
+Update = namedtuple('Update', ['kind', 'seq', 'score', 'lines', 'piece', 'rotation', 'y', 'x', 'size', 'cells'])
+Update.__doc__ = """A decoded message. piece is an index in PIECES or NO_PIECE, size is the width and height of a keyframe (None for a delta) and cells is a list of (row, x, color) tuples, every displayed cell for a keyframe."""
+
+
+def decode(message):
+    """Decodes a message (without its length prefix) into an Update.
+
+    Parameters
+    ----------
+    message : bytes-like
+        The message.
+
+    Returns
+    -------
+    Update
+        The decoded message. Colors are Palette colors (None for empty cells).
+    """
+    kind, seq, score, lines, piece, rotation, y, x = HEADER.unpack_from(message)
+    offset = HEADER.size
+
+    cells = []
+    size = None
+    if kind == KEYFRAME:
+        size = width, height = SIZE.unpack_from(message, offset)
+        offset += SIZE.size
+        for row in range(height):
+            start = offset + row * width
+            cells.extend((row, x, COLORS[color]) for x, color in enumerate(message[start:start + width]))
+    else:
+        count, = COUNT.unpack_from(message, offset)
+        offset += COUNT.size
+        for row, x, color in CELL.iter_unpack(message[offset:offset + count * CELL.size]):
+            cells.append((row, x, COLORS[color]))
+
+    return Update(kind, seq, score, lines, piece, rotation, y, x, size, cells)
+
+
+class Spectator_Feed(Field_View):
+    """Encodes the updates of one game for spectators. Field_View keeps track of what spectators have been sent, so a delta holds exactly the cells that changed.
+
+    Instance Variables
+    ------------------
+    seq : int
+        Sequence number of the last message.
+    _state : tuple
+        The score, lines and piece of the last message.
+    """
+
+    def __init__(self, board, hidden=Constants.HIDDEN_ROWS):
+        """Starts a feed of board. The first message should be a keyframe.
+
+        Parameters
+        ----------
+        board : Board
+            The board of the game.
+        hidden : int (default = Constants.HIDDEN_ROWS)
+            Number of rows at the top of board that are not displayed.
+        """
+        super().__init__(board, hidden)
+
+        self.seq = 0
+        self._state = None
+
+    @staticmethod
+    def _get_state(engine):
+        """Returns the score, lines and piece of engine, as they are sent in HEADER."""
+        piece = engine.current
+        if piece is None:
+            return (engine.score, engine.lines_complete, NO_PIECE, 0, 0, 0)
+        return (engine.score, engine.lines_complete, _PIECE_INDEX[type(piece)], piece.rotation, engine.current_coord[0], engine.current_coord[1])
+
+    def _header(self, kind, state):
+        """Returns the header of the next message and remembers the state it holds."""
+        self._state = state
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        return HEADER.pack(kind, self.seq, *state)
+
+    def keyframe(self, engine):
+        """Returns a keyframe message of engine (with its length prefix): the whole displayed gamefield, including the falling piece."""
+        self.changes(engine.current, engine.current_coord)
+
+        cells = bytes(_COLOR_INDEX[color] for row in self._shown for color in row)
+        message = self._header(KEYFRAME, self._get_state(engine)) + SIZE.pack(self.board.width, len(self._shown)) + cells
+        return LENGTH.pack(len(message)) + message
+
+    def delta(self, engine):
+        """Returns a delta message of engine (with its length prefix) since the last message, or None if nothing changed."""
+        changed = self.changes(engine.current, engine.current_coord)
+
+        state = self._get_state(engine)
+        if not changed and state == self._state:
+            return None
+
+        parts = [self._header(DELTA, state), COUNT.pack(len(changed))]
+        parts.extend(CELL.pack(row, x, _COLOR_INDEX[color]) for row, x, color in changed)
+        message = b''.join(parts)
+        return LENGTH.pack(len(message)) + message
+
+
+class _Client:
+    """A connected spectator, see Spectator_Server.
+
+    Instance Variables
+    ------------------
+    behind : bool
+        True after the queue overflowed. Nothing new is queued until what is already queued has been sent, then the spectator is sent the last keyframe and the deltas since.
+    queue : asyncio.Queue
+        Messages waiting to be sent, bounded.
+    resyncs : int
+        Times in a row the spectator fell behind (its queue overflowed, or it was still behind at a keyframe) without ever catching up in between.
+    writer : asyncio.StreamWriter
+        Writes to the spectator.
+    """
+
+    def __init__(self, writer, size):
+        self.writer = writer
+        self.queue = asyncio.Queue(size)
+        self.behind = False
+        self.resyncs = 0
+
+
+class Spectator_Server:
+    """Broadcasts a game to any number of spectators. Published from the tk thread, served by an asyncio event loop on a background thread.
+
+    Instance Variables
+    ------------------
+    dropped : int
+        Number of spectators dropped for being too slow.
+    host : str
+        Address served on.
+    keyframe_interval : int
+        Deltas between keyframes.
+    loop : asyncio.AbstractEventLoop
+        The event loop of the network thread.
+    max_resyncs : int
+        Times in a row a spectator can fall behind before it is dropped.
+    port : int
+        Port served on.
+    queue_size : int
+        Most messages waiting for a spectator.
+    resyncs : int
+        Number of times a spectator fell behind and was sent a keyframe.
+    thread : threading.Thread
+        The network thread.
+    _clients : set
+        Every connected _Client. Only touched on the network thread.
+    _deltas : int
+        Deltas published since the last keyframe.
+    _feed : Spectator_Feed
+        Encodes the updates of the current game. Only touched on the tk thread.
+    _keyframe : bytes
+        The last keyframe. Only touched on the network thread, like _since.
+    _server : asyncio.Server
+        The listening server.
+    _since : list
+        The deltas broadcast since the last keyframe.
+    """
+
+    def __init__(self, host='127.0.0.1', port=7438, queue_size=256, keyframe_interval=120, max_resyncs=3):
+        """Starts serving on the network thread. Returns once the server is listening.
+
+        Parameters
+        ----------
+        host : str (default = '127.0.0.1')
+            Address to serve on.
+        port : int (default = 7438)
+            Port to serve on.
+        queue_size : int (default = 256)
+            Most messages waiting for a spectator. Must be more than keyframe_interval, so a keyframe and the deltas since it always fit.
+        keyframe_interval : int (default = 120)
+            Deltas between keyframes.
+        max_resyncs : int (default = 3)
+            Times in a row a spectator can fall behind before it is dropped.
+        """
+        if queue_size <= keyframe_interval:
+            raise ValueError('queue_size must be more than keyframe_interval.')
+
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.keyframe_interval = keyframe_interval
+        self.max_resyncs = max_resyncs
+
+        self.resyncs = 0
+        self.dropped = 0
+        self._feed = None
+        self._deltas = 0
+        self._clients = set()
+        self._keyframe = None
+        self._since = []
+
+        self.loop = asyncio.new_event_loop()
+        self._server = self.loop.run_until_complete(asyncio.start_server(self._handle, host, port))
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def publish(self, engine):
+        """Sends what changed in engine since the last call to every spectator. Called by the game every frame, on the tk thread.
+
+        Parameters
+        ----------
+        engine : Engine
+            The game. A new board means a new game (or a loaded one, maybe of another size), which starts with a keyframe.
+        """
+        if self._feed is None or self._feed.board is not engine.board:
+            self._feed = Spectator_Feed(engine.board, engine.hidden)
+            self._deltas = self.keyframe_interval
+
+        if self._deltas >= self.keyframe_interval:
+            message = self._feed.keyframe(engine)
+            self._deltas = 0
+            keyframe = True
+        else:
+            message = self._feed.delta(engine)
+            if message is None:
+                return
+            self._deltas += 1
+            keyframe = False
+
+        self.loop.call_soon_threadsafe(self._broadcast, message, keyframe)
+
+    def close(self):
+        """Disconnects every spectator and stops the server."""
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def _shutdown(self):
+        """Closes the server and every connection and waits for their tasks to end. On the network thread."""
+        self._server.close()
+        for client in self._clients:
+            # Without waiting to send what is still buffered
+            client.writer.transport.abort()
+        self._clients.clear()
+
+        # Closing the connections ends the tasks, but do not wait forever on them
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=1)
+            for task in pending:
+                task.cancel()
+
+    def _broadcast(self, message, keyframe):
+        """Queues message for every spectator. On the network thread."""
+        if keyframe:
+            self._keyframe = message
+            self._since = []
+        else:
+            self._since.append(message)
+
+        for client in list(self._clients):
+            if client.behind:
+                # Still has not caught up since the last keyframe
+                if keyframe:
+                    self._fall_behind(client)
+                continue
+            try:
+                client.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._fall_behind(client)
+
+    def _fall_behind(self, client):
+        """Stops queueing messages for a spectator whose queue overflowed, so it is sent a fresh keyframe once it is ready for it (see _handle). Drops it instead if it keeps falling behind."""
+        client.resyncs += 1
+        if client.resyncs > self.max_resyncs:
+            self.dropped += 1
+            self._clients.discard(client)
+            # It would never read what is still buffered
+            client.writer.transport.abort()
+            return
+
+        self.resyncs += 1
+        client.behind = True
+
+    def _catch_up(self, client):
+        """Queues the last keyframe and the deltas since for a spectator with an empty queue."""
+        if self._keyframe is not None:
+            client.queue.put_nowait(self._keyframe)
+            for message in self._since:
+                client.queue.put_nowait(message)
+
+    async def _handle(self, reader, writer):
+        """asyncio.start_server callback for every spectator that connects. Sends it messages until it disconnects or is dropped."""
+        client = _Client(writer, self.queue_size)
+        self._catch_up(client)
+        self._clients.add(client)
+
+        # Spectators never send anything, reading only finds out when they leave
+        closed = asyncio.ensure_future(reader.read())
+        try:
+            while not writer.is_closing():
+                if client.queue.empty():
+                    if client.behind:
+                        client.behind = False
+                        self._catch_up(client)
+                    else:
+                        client.resyncs = 0
+                get = asyncio.ensure_future(client.queue.get())
+                done, pending = await asyncio.wait((get, closed), return_when=asyncio.FIRST_COMPLETED)
+                if get not in done:
+                    get.cancel()
+                    break
+
+                writer.write(get.result())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            closed.cancel()
+            self._clients.discard(client)
+            writer.close()
+
+
+class Spectator_Client:
+    """A connection to a Spectator_Server, run by an asyncio event loop on a background thread.
+
+    Instance Variables
+    ------------------
+    updates : queue.SimpleQueue
+        Every message received, as an Update. None is added when the connection closes.
+    thread : threading.Thread
+        The network thread.
+    """
+
+    def __init__(self, host, port):
+        """Starts connecting on the network thread. Returns right away.
+
+        Parameters
+        ----------
+        host : str
+            Address of the server.
+        port : int
+            Port of the server.
+        """
+        self.updates = queue.SimpleQueue()
+        self.thread = threading.Thread(target=asyncio.run, args=(self._run(host, port),), daemon=True)
+        self.thread.start()
+
+    async def _run(self, host, port):
+        """Connects, then decodes every message received into updates until the connection closes."""
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            while True:
+                length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                self.updates.put(decode(await reader.readexactly(length)))
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+
+        self.updates.put(None)
+
+
+class Spectator_View:
+    """A tk window showing a broadcast game, drawn with one rectangle per cell like Canvas_Renderer.
+
+    Instance Variables
+    ------------------
+    client : Spectator_Client
+        Receives the game.
+    info_lbl : tk.Label
+        Shows the score and lines.
+    root : tk.Tk
+        Root of the tk application.
+    size : int
+        Pixels per block. If not given, picked by the first keyframe from the size of the gamefield.
+    _canvas : tk.Canvas
+        Shows the gamefield.
+    _hex : dict
+        Cache of the tk color string of every color used so far.
+    _items : list
+        The canvas item id of every displayed cell. Made by the first keyframe.
+    """
+
+    def __init__(self, client, size=None):
+        """Creates the window and starts showing updates.
+
+        Parameters
+        ----------
+        client : Spectator_Client
+            Receives the game.
+        size : int (default = None)
+            Pixels per block. If None, the biggest that keeps the gamefield within Constants.GAME_SIZE (but at least Constants.MIN_BLOCK_SIZE) is used.
+        """
+        self.client = client
+        self.size = size
+        self._hex = dict()
+        self._items = None
+
+        self.root = tk.Tk()
+        self.root.title('Tetris - Spectating')
+        self._canvas = tk.Canvas(self.root, bd=Constants.BD_SIZE, relief='sunken', bg=Palette.BLANK_HEX)
+        self._canvas.grid(row=0, column=0)
+        self.info_lbl = tk.Label(self.root, text='Waiting for the game...', fg='white', bg=Palette.BLANK_HEX)
+        self.info_lbl.grid(row=1, column=0, sticky='ew')
+        self.root['bg'] = Palette.BLANK_HEX
+
+        self.root.after(0, self.poll)
+        self.root.mainloop()
+
+    def _get_hex(self, color):
+        """Returns the tk color string of color. None gives Palette.BLANK."""
+        try:
+            return self._hex[color]
+        except KeyError:
+            self._hex[color] = '#' + Palette._get_blank_hex(color or Palette.BLANK)
+            return self._hex[color]
+
+    def _make_grid(self, width, height):
+        """Creates the rectangles of a width by height gamefield."""
+        if self.size is None:
+            self.size = max(Constants.MIN_BLOCK_SIZE, min(Constants.GAME_SIZE[0] // width, Constants.GAME_SIZE[1] // height))
+        size = self.size
+        offset = Constants.BD_SIZE
+        outline = self._get_hex(Palette.GRIDLINE)
+
+        self._canvas.delete('all')
+        self._canvas.config(width=width * size, height=height * size)
+        self._items = [[self._canvas.create_rectangle(x * size + offset, row * size + offset, (x+1) * size + offset, (row+1) * size + offset, outline=outline) for x in range(width)] for row in range(height)]
+
+    def poll(self):
+        """Applies every update received since the last call, then checks again next frame."""
+        while True:
+            try:
+                update = self.client.updates.get_nowait()
+            except queue.Empty:
+                break
+
+            if update is None:
+                self.info_lbl['text'] = 'The game has ended.'
+                return
+
+            if update.kind == KEYFRAME:
+                width, height = update.size
+                if self._items is None or len(self._items) != height or len(self._items[0]) != width:
+                    self._make_grid(width, height)
+            elif self._items is None:
+                continue
+
+            for row, x, color in update.cells:
+                self._canvas.itemconfig(self._items[row][x], fill=self._get_hex(color))
+            self.info_lbl['text'] = f'Score: {update.score}    Lines: {update.lines}'
+
+        self.root.after(round(1000 / Constants.FRAME_RATE), self.poll)
+
+
+async def bench(host, port, spectators, seconds):
+    """Connects spectators headless spectators for seconds and returns how many messages, keyframes and bytes each received on average, and how many were disconnected."""
+    received = [[0, 0, 0] for i in range(spectators)]
+    disconnected = 0
+
+    async def spectate(counts):
+        nonlocal disconnected
+
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while True:
+                length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                message = await reader.readexactly(length)
+                counts[0] += 1
+                counts[1] += message[0] == KEYFRAME
+                counts[2] += LENGTH.size + length
+        except (asyncio.IncompleteReadError, OSError):
+            disconnected += 1
+        finally:
+            writer.close()
+
+    tasks = [asyncio.ensure_future(spectate(counts)) for counts in received]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    return [sum(counts[i] for counts in received) / spectators for i in range(3)] + [disconnected]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Plays tetris while broadcasting it to spectators, or spectates.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to serve on, or of the game (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=7438, help='port to serve on, or of the game (default: %(default)s)')
+    parser.add_argument('--watch', action='store_true', help='watch a game instead of playing')
+    parser.add_argument('--bench', type=int, metavar='N', help='connect N headless spectators to a game and report what they received')
+    parser.add_argument('--seconds', type=float, default=10, help='with --bench, how long to stay connected (default: %(default)s)')
+    parser.add_argument('--backend', choices=Constants.BACKENDS, default=Constants.BACKEND, help='how the gamefield is drawn (default: %(default)s)')
+    parser.add_argument('--seed', type=int, help='seed of the piece sequence (default: random)')
+    parser.add_argument('--width', type=int, default=Constants.BOARD_WIDTH, help='columns of the gamefield (default: %(default)s)')
+    parser.add_argument('--height', type=int, default=Constants.BOARD_HEIGHT, help='displayed rows of the gamefield (default: %(default)s)')
+    parser.add_argument('--hidden', type=int, default=Constants.HIDDEN_ROWS, help='rows above the gamefield where pieces start (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.bench:
+        messages, keyframes, size, disconnected = asyncio.run(bench(args.host, args.port, args.bench, args.seconds))
+        print(f'{args.bench} spectators for {args.seconds:g}s, each received {messages:.0f} messages ({keyframes:.0f} keyframes), {size / 1024:.1f} KiB')
+        print(f'{disconnected} disconnected by the game')
+    elif args.watch:
+        Spectator_View(Spectator_Client(args.host, args.port))
+    else:
+        server = Spectator_Server(args.host, args.port)
+        print(f'Spectators can watch on {args.host}:{args.port}')
+        Game(backend=args.backend, seed=args.seed, spectators=server, width=args.width, height=args.height, hidden=args.hidden)
+        print(f'{server.resyncs} resyncs of slow spectators, {server.dropped} dropped')
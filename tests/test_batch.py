@@ -0,0 +1,29 @@
+"""Tests of Batch_Engine, the NumPy simulation of many boards."""
+import numpy as np
+
+from batch import Batch_Engine
+
+
+def test_illegal_placement_leaves_board_unchanged():
+    batch = Batch_Engine(2, seed=0)
+    boards = batch.boards.copy()
+    current = batch.current.copy()
+
+    # Board 0 places far past the right wall, board 1 in the middle
+    batch.place(np.array([0, 0]), np.array([batch.width + 2, 3]))
+
+    assert not batch.game_over.any()
+    assert (batch.boards[0] == boards[0]).all()
+    assert batch.current[0] == current[0]
+    assert (batch.boards[1] != boards[1]).any()
+
+
+def test_random_placements_are_legal():
+    batch = Batch_Engine(500, seed=1)
+    rng = np.random.default_rng(1)
+
+    for i in range(30):
+        rotations, xs, found = batch.random_placements(rng)
+        assert (batch.legal(rotations, xs) == found).all()
+        batch.game_over |= ~found
+        batch.place(rotations, xs)
@@ -0,0 +1,26 @@
+"""Tests of Board, the bitboard of the gamefield."""
+from tetris import Board, I_Piece, Palette
+
+
+def test_place_counts_blocks():
+    board = Board()
+    touched = board.place(I_Piece(), [board.height - 4, 0])
+
+    for y in touched:
+        assert board.counts[y] == board.width - board.colors[y].count(None)
+
+
+def test_overlapping_place_does_not_clear():
+    board = Board()
+    y = board.height - 1
+    for x in range(board.width - 4):
+        board.rows[y] |= 1 << (x + Board.PADDING)
+        board.colors[y][x] = Palette.I
+    board.counts[y] = board.width - 4
+
+    # A horizontal I over the first 4 blocks of the row: 4 cells placed, none of them new
+    rows = board.place(I_Piece(1), [y, 0])
+
+    assert board.counts[y] == board.width - 4
+    assert board.clear_lines(rows) == 0
+    assert board.rows[y] != Board.FULL_ROW
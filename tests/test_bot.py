@@ -0,0 +1,32 @@
+"""Tests of the placement search in bot.py."""
+from bot import Searcher, fits
+from tetris import Board, O_Piece, T_Piece
+
+
+def test_placements_under_overhang():
+    board = Board()
+    # A roof over the left half of the board, with the piece already moved down under it
+    for x in range(5):
+        board.rows[10] |= 1 << (x + Board.PADDING)
+    rows = tuple(board.rows)
+
+    for piece in (O_Piece(), T_Piece()):
+        placements = Searcher().placements(rows, piece, [12, 0], board.width)
+        assert placements
+
+        for rotation, x, y, new, lines in placements:
+            masks = type(piece)(rotation).get_masks()
+            assert y >= 12
+            assert fits(rows, masks, y, x)
+            assert not fits(rows, masks, y + 1, x)
+
+
+def test_evaluate_uses_hidden_rows():
+    board = Board()
+    # A block in row 3: the lowest hidden row of a board with 4 of them, but displayed with 3
+    board.rows[3] |= 1 << Board.PADDING
+    rows = tuple(board.rows)
+
+    searcher = Searcher()
+    assert searcher.evaluate(rows, 0, board.width, 3) > float('-inf')
+    assert searcher.evaluate(rows, 0, board.width, 4) == float('-inf')
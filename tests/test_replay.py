@@ -0,0 +1,39 @@
+"""Tests of Replay, the recordings of a game's events."""
+import pytest
+
+from bot import Searcher
+from tetris import Engine, Replay
+
+
+def record(engine, pieces):
+    """Plays pieces placements of a recording engine with the bot, with a gravity tick before each."""
+    searcher = Searcher()
+    for i in range(pieces):
+        engine.tick()
+        placement = searcher.best(engine)
+        if placement is None or engine.game_over:
+            break
+        searcher.play(engine, placement)
+    return engine
+
+
+@pytest.mark.parametrize('compression', Replay.COMPRESSIONS)
+def test_round_trip_plays_the_same_game(compression):
+    engine = record(Engine(seed=7, record=True), 60)
+    assert engine.lines_complete > 0
+
+    replay = Replay.loads(engine.replay.dumps(compression))
+    assert (replay.seed, replay.randomizer) == (engine.replay.seed, engine.replay.randomizer)
+    assert list(replay) == list(engine.replay)
+
+    played = replay.play()
+    assert (played.score, played.lines_complete) == (engine.score, engine.lines_complete)
+    assert played.board.rows == engine.board.rows
+
+
+def test_round_trip_keeps_dimensions():
+    engine = record(Engine(seed=8, record=True, width=14, height=30, hidden=4), 30)
+
+    played = Replay.loads(engine.replay.dumps()).play()
+    assert (played.board.width, played.board.height, played.hidden) == (14, 34, 4)
+    assert (played.score, played.lines_complete) == (engine.score, engine.lines_complete)
@@ -0,0 +1,80 @@
+"""Tests of Save_State, the binary snapshots of an Engine."""
+import pytest
+
+from bot import Searcher
+from tetris import Engine, Save_State
+
+
+def play(engine, pieces):
+    """Plays pieces placements of engine with the bot, so it scores lines."""
+    searcher = Searcher()
+    for i in range(pieces):
+        placement = searcher.best(engine)
+        if placement is None or engine.game_over:
+            break
+        searcher.play(engine, placement)
+    return engine
+
+
+def test_fields_match_engine():
+    engine = play(Engine(seed=3), 60)
+    assert engine.lines_complete > 0
+
+    state = Save_State.from_engine(engine)
+    assert state.score == engine.score
+    assert state.lines_complete == engine.lines_complete
+    assert state.game_over == engine.game_over
+
+
+def test_restore_continues_the_same_game():
+    engine = play(Engine(seed=4), 30)
+    restored = Save_State(bytes(Save_State.from_engine(engine).data)).restore()
+
+    assert restored.board.rows == engine.board.rows
+    assert restored.board.colors == engine.board.colors
+    assert restored.current_coord == engine.current_coord
+    assert (restored.score, restored.lines_complete, restored.speed) == (engine.score, engine.lines_complete, engine.speed)
+
+    for action in ('left', 'rotate_cw', 'hard_drop', 'hold', 'right', 'hard_drop'):
+        engine.step(action)
+        restored.step(action)
+    assert restored.board.rows == engine.board.rows
+    assert type(restored.current) is type(engine.current)
+
+
+def test_negative_seed():
+    engine = Engine(seed=-5)
+    restored = Save_State.from_engine(engine).restore()
+    assert restored.piece_buffer.seed == -5
+    assert [type(p) for p in restored.piece_buffer.peek(20)] == [type(p) for p in engine.piece_buffer.peek(20)]
+
+
+def test_seed_out_of_range():
+    with pytest.raises(ValueError):
+        Save_State.from_engine(Engine(seed=1 << 64))
+
+
+def test_long_queue():
+    engine = Engine(seed=1)
+    engine.piece_buffer.peek(300)
+    restored = Save_State.from_engine(engine).restore()
+    assert [type(p) for p in restored.piece_buffer.peek(300)] == [type(p) for p in engine.piece_buffer.peek(300)]
+
+
+def test_save_many(tmp_path):
+    engines = [play(Engine(seed=seed), 10) for seed in range(3)]
+    path = tmp_path / 'states.ttss'
+    Save_State.save_many(path, [Save_State.from_engine(engine) for engine in engines])
+
+    states = Save_State.load_many(path)
+    assert [state.score for state in states] == [engine.score for engine in engines]
+    assert [state.restore().board.rows for state in states] == [engine.board.rows for engine in engines]
+
+
+def test_board_dimensions():
+    engine = play(Engine(seed=5, width=40, height=80, hidden=4), 20)
+    restored = Save_State.from_engine(engine).restore()
+
+    assert (restored.board.width, restored.board.height, restored.hidden) == (40, 84, 4)
+    assert restored.board.rows == engine.board.rows
+
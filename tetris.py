@@ -1,25 +1,90 @@
-import tkinter as tk
-from tkinter import messagebox
-from threading import Timer
-from random import choice
+from time import perf_counter
+# For --startup-time, as early as possible
+_import_start = perf_counter()
+
+import sys
+from importlib import import_module
+from time import monotonic, perf_counter_ns
+from functools import wraps
+from random import Random, randrange
+from itertools import count, islice
+from collections import deque, namedtuple, OrderedDict
+import os
+import mmap
+import struct
+import zlib
+
+
+class Lazy_Import:
+    """Stands in for a module that is only imported the first time one of its attributes is used. Attributes that are not in the module are imported as its submodules, so PIL.Image works without importing PIL.Image up front.
+
+    Runs that never open a window or draw anything (headless engines, bots, replays) never import tkinter or PIL at all.
+
+    Instance Variables
+    ------------------
+    _missing : str
+        Message shown before exiting if the module is not installed. If None, the error is raised instead.
+    _module : module
+        The module once it is imported, None before that.
+    _name : str
+        Name of the module.
+    """
+
+    def __init__(self, name, missing=None):
+        """Stands in for module name without importing it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the module.
+        missing : str (default = None)
+            Message to show before exiting if the module is not installed. If None, the error is raised instead.
+        """
+        self._name = name
+        self._missing = missing
+        self._module = None
+
+    def __getattr__(self, attribute):
+        """Imports the module (and the submodule attribute if needed) and returns attribute. Kept as an attribute of the proxy, so this only runs once per attribute."""
+        global import_module
+
+        if attribute.startswith('__'):
+            raise AttributeError(attribute)
+
+        try:
+            if self._module is None:
+                self._module = import_module(self._name)
+
+            try:
+                value = getattr(self._module, attribute)
+            except AttributeError:
+                value = import_module(f'{self._name}.{attribute}')
+        except ModuleNotFoundError:
+            if self._missing is None:
+                raise
+            print('\n-----')
+            print(self._missing)
+            print('-----')
+            sys.exit()
+
+        setattr(self, attribute, value)
+        return value
+
+
+tk = Lazy_Import('tkinter')
+messagebox = Lazy_Import('tkinter.messagebox')
+PIL = Lazy_Import('PIL', "This program requires the Python library 'Pillow'. Use pip or pipenv install pillow to download the library (virtual environment is encouraged).")
+hashlib = Lazy_Import('hashlib')
+json = Lazy_Import('json')
+lzma = Lazy_Import('lzma')
 
 # DPI Awareness
-try:
-    import ctypes
-    ctypes.windll.shcore.SetProcessDpiAwareness(1)
-except:
-    print('There was a problem setting DPI Awareness')
-
-# Import PIL
-try:
-    import PIL.Image
-    import PIL.ImageTk
-    import PIL.ImageDraw
-except ModuleNotFoundError:
-    print('\n-----')
-    print("This program requires the Python library 'Pillow'. Use pip or pipenv install pillow to download the library (virtual environment is encouraged).")
-    print('-----')
-    exit()
+if sys.platform == 'win32':
+    try:
+        import ctypes
+        ctypes.windll.shcore.SetProcessDpiAwareness(1)
+    except:
+        print('There was a problem setting DPI Awareness', file=sys.stderr)
 
 
 # CONSTANTS
@@ -33,20 +98,52 @@ class Constants:
     # Lines to clear before speed changes
     LINES_SPEED_STEP = 4
 
+    # Most frames drawn per second
+    FRAME_RATE = 60
+
+    # In seconds:
+    # Delayed auto shift, how long left/right/down must be held before they start repeating
+    DAS = 0.17
+    # Auto repeat rate, time between repeats once they start. 0 moves as far as possible at once
+    ARR = 0.05
+    # How pieces are picked, one of Engine.Piece_Buffer.MODES
+    RANDOMIZER = 'uniform'
+
+    # In blocks:
+    # Default size of the board. Columns, displayed rows, and rows above those where pieces start (not displayed)
+    BOARD_WIDTH = 10
+    BOARD_HEIGHT = 20
+    HIDDEN_ROWS = 3
+
     # In pixels:
-    # Should be divisible by 10
+    # Width of the gamefield at startup. Should be divisible by BOARD_WIDTH
     GAME_WIDTH = 400
     # Border size
     BD_SIZE = 5
 
+    # How the gamefield is drawn, one of BACKENDS:
+    # 'image' renders textured blocks with PIL, 'canvas' uses plain tk.Canvas rectangles (lighter on low-power machines)
+    BACKEND = 'image'
+    BACKENDS = ('image', 'canvas')
+
+    # Number of block sizes whose sprites are kept in memory at once (the window can be resized)
+    SPRITE_SCALES = 4
+    # Smallest block size the window can be resized to
+    MIN_BLOCK_SIZE = 10
+    # Seconds the window size has to stay the same before everything is redrawn at the new size
+    RESIZE_DELAY = 0.15
+
+    # Where rendered images are cached between launches
+    CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'tetris')
+
 
     # DON'T MANUALLY ADJUST
-    if GAME_WIDTH % 10:
-        raise ValueError('GAME_WIDTH must be divisible by 10.')
-    # Fixed aspect ratio
-    GAME_SIZE = (GAME_WIDTH, GAME_WIDTH * 2)
-    # Pixels per block
-    BLOCK_SIZE = GAME_WIDTH // 10
+    if GAME_WIDTH % BOARD_WIDTH:
+        raise ValueError('GAME_WIDTH must be divisible by BOARD_WIDTH.')
+    # Pixels per block at startup with the default board. The window can be resized after that, see App.set_block_size
+    BLOCK_SIZE = GAME_WIDTH // BOARD_WIDTH
+    # Fixed aspect ratio. Other board sizes get the block size that fits them in this, see App
+    GAME_SIZE = (GAME_WIDTH, BLOCK_SIZE * BOARD_HEIGHT)
 
 class Palette:
     """Contains the specific RGB tuples used for colors in the program. (Treated as an enum but not actually one because it conflicts with PIL)
@@ -76,10 +173,71 @@ class Palette:
     O = (255, 255, 0)
     T = (128, 0, 128)
 
-generated_squares = dict()
+    # Every color a block can have
+    BLOCKS = (I, J, L, S, Z, O, T)
+
+    # Rows sent by the opponent in versus mode
+    GARBAGE = (80, 80, 80)
+
+class LRU_Cache:
+    """A mapping that holds at most maxsize items. When it is full, adding an item drops the least recently used one.
+
+    Instance Variables
+    ------------------
+    maxsize : int
+        Most items held at once.
+    _items : collections.OrderedDict
+        The items, least recently used first.
+    """
+
+    def __init__(self, maxsize):
+        """Creates an empty cache.
 
+        Parameters
+        ----------
+        maxsize : int
+            Most items held at once.
+        """
+        global OrderedDict
+
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def get(self, key, make):
+        """Returns the item of key, calling make() to create it if it is not cached.
+
+        Parameters
+        ----------
+        key : hashable
+            The key of the item.
+        make : callable
+            Returns the item. Only called on a miss.
+
+        Returns
+        -------
+        object
+            The item.
+        """
+        try:
+            self._items.move_to_end(key)
+            return self._items[key]
+        except KeyError:
+            value = self._items[key] = make()
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            return value
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+atlases = LRU_Cache(Constants.SPRITE_SCALES)
+profile_sheets = LRU_Cache(Constants.SPRITE_SCALES)
 
-def block_render(color=None, block=False, grid=False):
+
+def block_render(color=None, block=False, grid=False, size=None):
     """Renders the image of a single square.
 
     Parameters
@@ -90,6 +248,8 @@ def block_render(color=None, block=False, grid=False):
         Determines if the block style overlay should be used.
     grid : bool (default = False)
         Determines if the gridline overlay should be used.
+    size : int (default = None)
+        Width and height of the square in pixels. If None, Constants.BLOCK_SIZE is used.
 
     Returns
     -------
@@ -100,7 +260,8 @@ def block_render(color=None, block=False, grid=False):
     global Constants
     global Palette
 
-    size = Constants.BLOCK_SIZE
+    if size is None:
+        size = Constants.BLOCK_SIZE
 
     if not color:
         color = Palette.BLANK
@@ -148,10 +309,10 @@ def block_render(color=None, block=False, grid=False):
 
     return square
 
-def render(field, piece=None, piece_coord=None):
+def render(field, piece=None, piece_coord=None, size=None):
     """Converts the list field to a PIL.ImageTk.PhotoImage object and returns it.
 
-    Creates a blank image with size GAME_SIZE. Then iterates through the entire list, placing squares on the image with the appropiate color with the size BLOCK_SIZE. If element is None, it becomes an blank square. If Block, a square with the block's color is used. There SHOULD BE NO Pieces in list, they should be preformated to be Blocks.
+    Creates a blank image the size of field. Then iterates through the entire list, placing squares on the image with the appropiate color with the size BLOCK_SIZE. If element is None, it becomes an blank square. If Block, a square with the block's color is used. There SHOULD BE NO Pieces in list, they should be preformated to be Blocks.
 
     Parameters
     ----------
@@ -161,6 +322,8 @@ def render(field, piece=None, piece_coord=None):
         A Piece that should be displayed over the field. Used to display the current piece over gamefield without changing the gamefield itself. If used, piece_coord must also be given. Ignored if None.
     piece_coord : int tuple (default = None)
         The y, x coordinate of where the bottom left corner of piece will be displayed over the field. If used, piece must also be given. Ignored if None.
+    size : int (default = None)
+        Pixels per block. If None, Constants.BLOCK_SIZE is used.
 
     Returns
     -------
@@ -168,31 +331,19 @@ def render(field, piece=None, piece_coord=None):
         Image of field.
     """
     global Constants
-    global generated_squares
-    global block_render
+    global get_atlas
 
-    y_pixels = len(field) * Constants.BLOCK_SIZE
-    x_pixels = len(field[0]) * Constants.BLOCK_SIZE
+    if size is None:
+        size = Constants.BLOCK_SIZE
+    atlas = get_atlas(size)
+    y_pixels = len(field) * size
+    x_pixels = len(field[0]) * size
 
     im = PIL.Image.new('RGB', (x_pixels, y_pixels), Palette.BLANK)
 
     for y, row in enumerate(field):
         for x, block in enumerate(row):
-            box = (x * Constants.BLOCK_SIZE, y * Constants.BLOCK_SIZE, (x+1) * Constants.BLOCK_SIZE, (y+1) * Constants.BLOCK_SIZE)
-
-            try:
-                # Use cached image if present
-                square = generated_squares[block].copy()
-            except KeyError:
-                # Generates and caches block image
-                if block:
-                    square = block_render(block, block=True)
-                else:
-                    # Block is an empty square
-                    square = block_render(grid=True)
-                generated_squares[block] = square.copy()
-
-            im.paste(square, box)
+            im.paste(atlas[block], (x * size, y * size, (x+1) * size, (y+1) * size))
 
     if piece:
         for relative_y, row in enumerate(piece.get_blocks()):
@@ -209,881 +360,3370 @@ def render(field, piece=None, piece_coord=None):
                     except IndexError:
                         continue
 
-                    box = (x * Constants.BLOCK_SIZE, y * Constants.BLOCK_SIZE, (x+1) * Constants.BLOCK_SIZE, (y+1) * Constants.BLOCK_SIZE)
-
-                    try:
-                        # Use cached image if present
-                        square = generated_squares[block].copy()
-                    except KeyError:
-                        # Generates and caches block image
-                        if block is None:
-                            # Block is an empty square
-                            square = block_render(grid=True)
-                        else:
-                            square = block_render(block, block=True)
-                        generated_squares[block] = square.copy()
-
-                    im.paste(square, box)
+                    im.paste(atlas[block], (x * size, y * size, (x+1) * size, (y+1) * size))
 
     return im
 
+def get_atlas(size=None):
+    """Returns the Sprite_Atlas of a block size, making it if it is not in atlases. Only the Constants.SPRITE_SCALES most recently used sizes are kept.
 
-class App:
-    """Controls the tkinter application used as an interface for the game.
+    Parameters
+    ----------
+    size : int (default = None)
+        Block size in pixels. If None, Constants.BLOCK_SIZE is used.
 
-    Instance Variables
-    ------------------
-    game_cvs : tk.Canvas
-        Canvas for displaying the gamefield.
-    hold_cvs : tk.Canvas
-        Canvas for displaying held tetris pieces.
-    info_lbl : tk.Label
-        Label widget to display current score, speed, and lines completed.
-    next_cvs : tk.Canvas
-        Canvas for displaying incoming pieces (pieces in Game.Piece_Buffer).
-    root : tk.Tk
-        Root of the tk application.
-    _game_im : PIL.ImageTk.PhotoImage
-        Variable to hold game_cvs's displayed image in memory.
-    _game_im_center : int tuple
-        2 element tuple giving the center coord of game_cvs for _game_im.
-    _hold_im : PIL.ImageTk.PhotoImage
-        Variable to hold hold_cvs's displayed image in memory.
-    _hold_im_center : int tuple
-        2 element tuple giving the center coord of hold_cvs for _hold_im.
-    _next_im : PIL.ImageTk.PhotoImage
-        Variable to hold next_cvs's displayed image in memory.
-    _next_im_center : int tuple
-        2 element tuple giving the center coord of next_cvs for _next_im.
+    Returns
+    -------
+    Sprite_Atlas
+        The atlas of that size.
     """
-    global tk, PIL
-
-    def __init__(self, game):
-        """Create the tkinter window in which the game is played.
-
-        Parameters
-        ----------
-        game: Game
-            The instance of game that is being played. Needed in order to bind events to the tk application and to bind game.lose to when the window is closed.
+    global Constants
+    global atlases
+    global Sprite_Atlas
 
-        Returns
-        -------
-        Tk
-            The tk.Tk object that controls the window
-        """
-        global Constants, Palette
+    if size is None:
+        size = Constants.BLOCK_SIZE
 
+    return atlases.get(size, lambda: Sprite_Atlas(size))
 
-        self.root = tk.Tk()
-        self.root.title('Tetris')
+def get_profiles(size=None):
+    """Returns the profile image (see Piece.gen_profile) of every Piece class at a block size, made if they are not in profile_sheets. The profiles are cached on disk as one sheet per block size, see cache_path.
 
+    Parameters
+    ----------
+    size : int (default = None)
+        Block size in pixels. If None, Constants.BLOCK_SIZE is used.
 
-        # HOLD CANVAS
-        self.hold_cvs = tk.Canvas(self.root)
-        self.hold_cvs.grid(row=0, column=0, sticky='new')
+    Returns
+    -------
+    dict
+        The profile of every class in PIECES.
+    """
+    global PIL
+    global Constants, Palette
+    global PIECES
+    global profile_sheets
+    global Sprite_Atlas
+    global cache_path, load_cached_image, save_cached_image
 
-        # Size
-        hold_size = Constants.BLOCK_SIZE * 4
-        self.hold_cvs.config(width=hold_size, height=hold_size)
+    if size is None:
+        size = Constants.BLOCK_SIZE
 
-        # Appearance
-        self.hold_cvs['relief'] = 'sunken'
-        self.hold_cvs['bd'] = Constants.BD_SIZE
+    def make():
+        width, height = 4 * size, 2 * size
+        key = (Sprite_Atlas.VERSION, Palette.BLANK, Palette.GRIDLINE, tuple((p.kind, p.color, p.orientations[0].grid, p._rot_for_profile) for p in PIECES))
+        path = cache_path('profiles', size, key)
 
-        # Init image
-        # Position is the center of the image, hence the / 2
-        self._hold_im_center = ((hold_size / 2) + Constants.BD_SIZE, (hold_size / 2) + Constants.BD_SIZE)
-        self._hold_im = PIL.Image.new('RGB', (hold_size, hold_size), Palette.BLANK)
-        self._hold_im = PIL.ImageTk.PhotoImage(self._hold_im)
-        self.hold_cvs.create_image(self._hold_im_center, image=self._hold_im)
+        sheet = load_cached_image(path, (width, height * len(PIECES)))
+        if sheet is None:
+            sheet = PIL.Image.new('RGB', (width, height * len(PIECES)))
+            for i, p in enumerate(PIECES):
+                sheet.paste(p().gen_profile(size), (0, i * height))
+            save_cached_image(sheet, path)
 
+        return {p: sheet.crop((0, i * height, width, (i+1) * height)) for i, p in enumerate(PIECES)}
 
-        # GAMEFIELD CANVAS
-        self.game_cvs = tk.Canvas(self.root)
-        self.game_cvs.grid(row=0, column=1, rowspan=2, sticky='nesw')
+    return profile_sheets.get(size, make)
 
-        # Size (More so for readability)
-        game_sizex = Constants.GAME_SIZE[0]
-        game_sizey = Constants.GAME_SIZE[1]
-        self.game_cvs.config(width=game_sizex, height=game_sizey)
+def cache_path(name, size, key):
+    """Returns the path in Constants.CACHE_DIR an image is cached at.
 
-        # Appearance
-        self.game_cvs['relief'] = 'sunken'
-        self.game_cvs['bd'] = Constants.BD_SIZE
+    Parameters
+    ----------
+    name : str
+        What the image is, the start of the file name.
+    size : int
+        Block size of the image.
+    key : tuple
+        Everything else the image depends on (palette, shapes, a version). Changing any of it gives a different file.
+    """
+    global Constants
+    global hashlib
+    global os
 
-        # Init image
-        self._game_im_center = ((game_sizex / 2) + Constants.BD_SIZE, (game_sizey / 2) + Constants.BD_SIZE)
-        self._game_im = PIL.Image.new('RGB', (game_sizex, game_sizey), Palette.BLANK)
-        self._game_im = PIL.ImageTk.PhotoImage(self._game_im)
-        self.game_cvs.create_image(self._game_im_center, image=self._game_im)
+    digest = hashlib.sha1(repr((size, key)).encode()).hexdigest()[:16]
+    return os.path.join(Constants.CACHE_DIR, f'{name}-{size}-{digest}.png')
 
+def load_cached_image(path, size):
+    """Returns the image cached at path, or None if there is none or it is not an RGB image of size (width, height)."""
+    global PIL
 
-        # NEXT CANVAS
-        self.next_cvs = tk.Canvas(self.root)
-        self.next_cvs.grid(row=0, column=2, sticky='new')
+    try:
+        image = PIL.Image.open(path)
+        image.load()
+    except OSError:
+        return None
 
-        # Size
-        next_sizex = Constants.BLOCK_SIZE * 4
-        # 5 blocks, 2 lines each, plus a gap between each = 14
-        next_sizey = 14 * Constants.BLOCK_SIZE
-        self.next_cvs.config(width=next_sizex, height=next_sizey)
+    if image.size != size or image.mode != 'RGB':
+        return None
+    return image
 
-        # Appearance
-        self.next_cvs['relief'] = 'sunken'
-        self.next_cvs['bd'] = Constants.BD_SIZE
+def save_cached_image(image, path):
+    """Writes image to path. Failing to write the cache is not an error, the image is just made again next time."""
+    global os
 
-        # Init image
-        self._next_im_center = ((next_sizex / 2) + Constants.BD_SIZE, (next_sizey / 2) + Constants.BD_SIZE)
-        self._next_im = PIL.Image.new('RGB', (next_sizex, next_sizey), Palette.BLANK)
-        self._next_im = PIL.ImageTk.PhotoImage(self._next_im)
-        self.next_cvs.create_image(self._next_im_center, image=self._next_im)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so other launches never read half a file
+        temp = f'{path}.{os.getpid()}.tmp'
+        image.save(temp, 'PNG')
+        os.replace(temp, path)
+    except OSError:
+        pass
 
+def get_square(block):
+    """Returns the image of a single square of the gamefield from the atlas of Constants.BLOCK_SIZE. The image is shared, do not modify it.
 
-        # SCORE LABEL
-        self.info_lbl = tk.Label(self.root, text='init text')
-        self.info_lbl.grid(row=1, column=0, sticky='nesw')
-        self.info_lbl['fg'] = 'white'
+    Parameters
+    ----------
+    block : int tuple
+        The Palette color of the square. None for an empty square with gridlines.
 
+    Returns
+    -------
+    PIL.Image
+        Image of the square.
+    """
+    global get_atlas
 
-        # ON CLOSE PROTOCOL
-        def on_closing():
-            """Protocol handler for when the window should close."""
-            game.stop()
-        self.root.protocol("WM_DELETE_WINDOW", on_closing)
+    return get_atlas()[block]
 
 
-        # FINAL SETTINGS
-        self.set_background(Palette.BLANK_HEX)
-        self.update_lbl(0, 0, Constants.START_SPEED)
+class Sprite_Atlas:
+    """Every square of the gamefield at one block size, rendered once into a single image: the empty square with gridlines, then every color of Palette.BLOCKS in block style, in one row.
 
-        # Disable window resizing
-        self.root.resizable(False, False)
+    The atlas is saved in Constants.CACHE_DIR under a name made from the block size and the palette (see cache_path), so later launches load it instead of drawing it again. Changing the palette (or the size) simply gives a different file.
 
-        self.make_bindings(game)
+    Instance Variables
+    ------------------
+    image : PIL.Image
+        The atlas.
+    size : int
+        Width and height of a square in pixels.
+    sprites : dict
+        The image of every square, keyed by color (None for the empty square). Cut out of image once, when the atlas is made, and pasted as they are after that.
+    """
+    # Bump when block_render changes, so old cache files are not used
+    VERSION = 1
 
-    def make_bindings(self, game):
-        """Setup all event bindings needed in the program.
+    def __init__(self, size):
+        """Loads the atlas from the cache, or renders it and saves it to the cache.
 
         Parameters
         ----------
-        game: Game
-            The instance of game that is being played. Needed in order to bind events to the tk application.
+        size : int
+            Width and height of a square in pixels.
         """
-        # WASD Controls
-        self.root.bind_all('<s>', game.down)
-        self.root.bind_all('<space>', game.hard_drop)
+        global PIL
+        global Palette
+        global block_render
+        global cache_path, load_cached_image, save_cached_image
+
+        self.size = size
+        colors = (None,) + Palette.BLOCKS
+        path = cache_path('atlas', size, (self.VERSION, Palette.BLANK, Palette.GRIDLINE, Palette.BLOCKS))
+
+        self.image = load_cached_image(path, (size * len(colors), size))
+        if self.image is None:
+            self.image = PIL.Image.new('RGB', (size * len(colors), size))
+            for i, color in enumerate(colors):
+                if color:
+                    square = block_render(color, block=True, size=size)
+                else:
+                    square = block_render(grid=True, size=size)
+                self.image.paste(square, (i * size, 0))
+            save_cached_image(self.image, path)
+
+        self.sprites = {color: self.image.crop((i * size, 0, (i+1) * size, size)) for i, color in enumerate(colors)}
 
-        self.root.bind_all('<a>', game.left)
-        self.root.bind_all('<d>', game.right)
+    def __getitem__(self, color):
+        """Returns the sprite of a color. Colors that are not in Palette.BLOCKS are rendered on first use and kept."""
+        global block_render
 
-        self.root.bind_all('<q>', game.rotate_ccw)
-        self.root.bind_all('<e>', game.rotate_cw)
+        try:
+            return self.sprites[color]
+        except KeyError:
+            square = self.sprites[color] = block_render(color, block=True, size=self.size)
+            return square
 
-        self.root.bind_all('<w>', game.hold)
 
-        self.root.bind_all('<p>', game.lose)
+class Board:
+    """Bitboard representation of the gamefield. Occupancy is stored as one integer bitmask per row and colors are stored in a separate layer.
 
-        # Arrow Controls
-        self.root.bind_all('<Down>', game.down)
+    Column x of a row is occupied when bit x + PADDING of its mask is set. Every bit outside of the playfield is also set, so the walls behave exactly like placed blocks and a collision test is a single AND per row of the piece. Python ints are two's complement, so the right wall extends forever and a completely full row is simply FULL_ROW (-1).
 
-        self.root.bind_all('<Left>', game.left)
-        self.root.bind_all('<Right>', game.right)
+    Class Variables
+    ---------------
+    FULL_ROW : int
+        Bitmask of a row with every column occupied.
+    PADDING : int
+        Number of wall bits to the right of column 0. Leaves room for the empty columns of a 4 by 4 orientation grid hanging past the left wall.
 
-        self.root.bind_all('<Up>', game.rotate_cw)
+    Instance Variables
+    ------------------
+    colors : list
+        A height by width list of None and/or Palette colors. This is the layer that gets rendered.
+    counts : int list
+        Number of blocks in every row. A row is full when its count is width.
+    empty_row : int
+        Bitmask of a row with nothing but the walls.
+    height : int
+        Number of rows, including the rows pieces start in.
+    row_ids : int list
+        An id per row that changes whenever that row's contents change or it moves. Unique across all boards, so anything drawing the board only has to redraw rows whose id differs from the one it last drew.
+    rows : int list
+        One occupancy bitmask per row.
+    skyline : int list
+        The row of the highest block in every column, or height if the column is empty. Kept up to date by place and clear_lines.
+    width : int
+        Number of columns.
+    """
+    FULL_ROW = -1
+    PADDING = 3
 
-        self.root.bind_all('<z>', game.hold)
+    _ids = count()
 
-    def set_background(self, color, container=None):
-        """Recursively sets the background of every widget to color.
+    def __init__(self, width=10, height=23):
+        """Creates an empty board.
 
         Parameters
         ----------
-        color : int tuple
-            The rgb color to set the backgrounds to.
-        container : Tk object (default = None)
-            The container to look through for widgets and more containers to change the background of.
+        width : int (default = 10)
+            Number of columns.
+        height : int (default = 23)
+            Number of rows, including the rows pieces start in.
         """
-        if container is None:
-            container = self.root
-
-        container.config(bg=color)
+        self.width = width
+        self.height = height
 
-        for child in container.winfo_children():
-            if child.winfo_children():
-                # child has children, go through its children
-                self.set_background(color, child)
-            else:
-                child.config(bg=color)
+        self.empty_row = ~(((1 << width) - 1) << self.PADDING)
+        self.rows = [self.empty_row for y in range(height)]
+        self.colors = [[None for x in range(width)] for y in range(height)]
+        self.row_ids = [next(self._ids) for y in range(height)]
+        self.counts = [0 for y in range(height)]
+        self.skyline = [height for x in range(width)]
 
+    @classmethod
+    def from_colors(cls, colors):
+        """Creates a board from a color layer, filling in every other layer.
 
-    def start(self, call_me):
-        """Starts the event loop and calls get_ready to display instructions. call_me is a function that will be called once the user has closed the get_ready popup."""
+        Parameters
+        ----------
+        colors : list
+            A height by width list of None and/or Palette colors, like Board.colors. The rows are copied.
 
-        def get_ready():
-            """Show a pop-up window with instructions and a start button."""
-            global messagebox
+        Returns
+        -------
+        Board
+            The board.
+        """
+        board = cls(len(colors[0]), len(colors))
 
-            message = "Welcome to my homebrew Python version of Tetris.\n"
-            message += "Everyone who doesn't live under a rock knows the rules, so I'm not going to explain them here. However the controls I will explain.\n\n"
+        for y, row in enumerate(colors):
+            mask = 0
+            for x, color in enumerate(row):
+                if color is not None:
+                    mask |= 1 << (x + cls.PADDING)
+                    if board.skyline[x] == board.height:
+                        board.skyline[x] = y
 
-            message += "Controls:\n"
-            message += "   Move left/right - A / D or left / right arrows\n"
-            message += "   Rotate left/right - Q / E or up arrow (only rotate right)\n"
-            message += "   Down - S or down arrow\n"
-            message += "   Hard drop - Space\n"
-            message += "   Hold - W or Z\n"
-            message += "   Quit - P\n\n"
+            board.rows[y] |= mask
+            board.colors[y] = list(row)
+            board.counts[y] = board.width - row.count(None)
 
-            message += "Made by Carson Jones (2021).\n"
-            message += "Source code: https://github.com/DJCubed12/Tetris"
+        return board
 
-            messagebox.showinfo('Instructions', message)
+    def fits(self, piece, coord):
+        """Checks if piece can be at coord without overlapping a block or a wall.
 
-            call_me()
+        Parameters
+        ----------
+        piece : Piece-like
+            The Piece being tested.
+        coord : int list
+            The y, x coordinate of the top left corner of piece's orientation grid.
 
-        self.root.after_idle(get_ready)
-        self.root.mainloop()
+        Returns
+        -------
+        bool
+            False if the piece would hit a block or be out of bounds, otherwise True.
+        """
+        shift = coord[1] + self.PADDING
+        if shift < 0:
+            # Every block of the piece would be past the left wall
+            return False
 
+        rows = self.rows
+        height = self.height
+        for relative_y, mask in piece.get_masks():
+            y = coord[0] + relative_y
+            if y < 0 or y >= height:
+                return False
+            if rows[y] & (mask << shift):
+                return False
 
+        return True
 
-        call_me()
+    def place(self, piece, coord):
+        """Permanently sets the blocks of piece at coord in both the occupancy and color layers. Does not check for conflicts.
 
-    def play_again(self, score, lines, speed):
-        """The user has lost. Display stats and ask for another round. If yes return True for Game."""
-        global messagebox
+        Parameters
+        ----------
+        piece : Piece-like
+            The Piece being placed.
+        coord : int list
+            The y, x coordinate of the top left corner of piece's orientation grid.
 
-        message = "GAME OVER\n\n"
+        Returns
+        -------
+        int list
+            The rows the piece has blocks in. Only these rows can have been completed.
+        """
+        shift = coord[1] + self.PADDING
+        touched = []
+        for relative_y, mask in piece.get_masks():
+            y = coord[0] + relative_y
+            self.rows[y] |= mask << shift
+            self.row_ids[y] = next(self._ids)
+            touched.append(y)
+
+        for relative_y, relative_x in piece.get_cells():
+            row = self.colors[coord[0] + relative_y]
+            # Only count blocks that were not there yet, so a piece overlapping blocks never makes a row look full
+            if row[coord[1] + relative_x] is None:
+                self.counts[coord[0] + relative_y] += 1
+            row[coord[1] + relative_x] = piece.color
+
+        for relative_x, top, bottom in piece.get_columns():
+            x = coord[1] + relative_x
+            if coord[0] + top < self.skyline[x]:
+                self.skyline[x] = coord[0] + top
+
+        return touched
+
+    def clear_lines(self, rows=None):
+        """Deletes every full row and adds empty rows to the top so everything above shifts down.
 
-        message += f"Final Stats:\n"
-        message += f"   Score - {score}\n"
-        message += f"   Lines - {lines}\n"
-        message += f"   Speed - {(1/speed):.3f} blocks/sec\n\n"
+        Parameters
+        ----------
+        rows : int list (default = None)
+            The only rows that could be full, like the rows returned by place. If None, every row is checked.
 
-        message += f"Play Again?\n"
+        Returns
+        -------
+        int
+            Number of lines cleared.
+        """
+        if rows is None:
+            rows = range(self.height)
+        lines = sorted(set(y for y in rows if self.counts[y] == self.width))
 
-        return messagebox.askyesno('Play Again?', message)
+        if lines:
+            self._compact(lines)
 
+            # Rows only ever move down, so each column's new top is at or below its old one
+            for x in range(self.width):
+                bit = 1 << (x + self.PADDING)
+                y = self.skyline[x]
+                while y < self.height and not self.rows[y] & bit:
+                    y += 1
+                self.skyline[x] = y
 
-    def update_game(self, new_image):
-        """Update the image in the game canvas.
+        return len(lines)
 
-        Clear self.game_cvs. Convert PIL Image to PIL ImageTk and place on game_cvs.
+    def _compact(self, lines):
+        """Removes lines from every layer in one pass, adding as many empty rows to the top.
 
         Parameters
         ----------
-        new_image : PIL.Image
-            The new image to display. Must be PIL.Image not PIL.ImageTk.
+        lines : int list
+            Indexes of the rows to remove, in ascending order.
         """
-        self.game_cvs.delete('all')
+        first = lines[0]
+        last = lines[-1]
+        # Rows between the first and last line that survive
+        between = [y for y in range(first, last) if y not in lines]
+        new = len(lines)
 
-        self._game_im = PIL.ImageTk.PhotoImage(new_image)
-        self.game_cvs.create_image(self._game_im_center, image=self._game_im)
+        self.rows[:last + 1] = [self.empty_row for i in range(new)] + self.rows[:first] + [self.rows[y] for y in between]
+        self.colors[:last + 1] = [[None for x in range(self.width)] for i in range(new)] + self.colors[:first] + [self.colors[y] for y in between]
+        self.row_ids[:last + 1] = [next(self._ids) for i in range(new)] + self.row_ids[:first] + [self.row_ids[y] for y in between]
+        self.counts[:last + 1] = [0 for i in range(new)] + self.counts[:first] + [self.counts[y] for y in between]
 
-    def update_next(self, new_image):
-        """Update the image in the next canvas.
+    def add_garbage(self, lines, hole, color):
+        """Pushes every row up and fills the bottom with lines rows that are full except for one column. Rows pushed past the top are lost.
 
-        Clear self.next_cvs. Convert PIL Image to PIL ImageTk and place on next_cvs.
+        Parameters
+        ----------
+        lines : int
+            Number of rows to add.
+        hole : int
+            The empty column of every added row.
+        color : tuple
+            Color of the added blocks.
+        """
+        lines = min(lines, self.height)
+        if lines <= 0:
+            return
+
+        row = self.FULL_ROW & ~(1 << (hole + self.PADDING))
+        self.rows[:] = self.rows[lines:] + [row for i in range(lines)]
+        self.colors[:] = self.colors[lines:] + [[None if x == hole else color for x in range(self.width)] for i in range(lines)]
+        self.counts[:] = self.counts[lines:] + [self.width - 1 for i in range(lines)]
+        # Every row moved
+        self.row_ids[:] = [next(self._ids) for y in range(self.height)]
+
+        for x in range(self.width):
+            if self.skyline[x] < self.height:
+                self.skyline[x] -= lines
+            elif x != hole:
+                # Empty column, the garbage is the top now
+                self.skyline[x] = self.height - lines
+
+            if self.skyline[x] < 0:
+                # The top block was pushed out, find the new one
+                bit = 1 << (x + self.PADDING)
+                y = 0
+                while y < self.height and not self.rows[y] & bit:
+                    y += 1
+                self.skyline[x] = y
+
+    def drop_distance(self, piece, coord):
+        """Finds how many rows piece can fall from coord before it would hit something. coord must be a position piece fits at.
+
+        If the piece is above the skyline in every column it covers, this is a lookup per column. Otherwise (the piece is tucked under an overhang) it falls back to moving the piece down one row at a time.
 
         Parameters
         ----------
-        new_image : PIL.Image
-            The new image to display. Must be PIL.Image not PIL.ImageTk.
+        piece : Piece-like
+            The falling Piece.
+        coord : int list
+            The y, x coordinate of the top left corner of piece's orientation grid.
+
+        Returns
+        -------
+        int
+            Number of rows the piece can move down.
         """
-        self.next_cvs.delete('all')
+        y, x = coord
+        skyline = self.skyline
+
+        distance = self.height
+        for relative_x, top, bottom in piece.get_columns():
+            # Number of empty rows between this column's lowest block and the highest block under it
+            gap = skyline[x + relative_x] - 1 - (y + bottom)
+            if gap < 0:
+                break
+            if gap < distance:
+                distance = gap
+        else:
+            return distance
+
+        distance = 0
+        while self.fits(piece, [y + distance + 1, x]):
+            distance += 1
+        return distance
+
+    def column_heights(self):
+        """Returns the number of rows from the bottom of the board to the highest block (inclusive) of every column."""
+        return [self.height - top for top in self.skyline]
+
+    def is_row_empty(self, y):
+        """Returns True if row y has no blocks in it."""
+        return self.rows[y] == self.empty_row
 
-        self._next_im = PIL.ImageTk.PhotoImage(new_image)
-        self.next_cvs.create_image(self._next_im_center, image=self._next_im)
 
-    def update_hold(self, new_image):
-        """Update the image in the hold canvas.
+class Field_View:
+    """Keeps track of which cells of a Board and the falling piece changed since they were last drawn. Subclasses decide how those cells are drawn.
 
-        Clear self.hold_cvs. Convert PIL Image to PIL ImageTk and place on hold_cvs.
+    A cell is only checked if it might have changed: the cells the piece was drawn on, the cells it is drawn on now, and the rows of the board whose row_ids changed (blocks placed or rows shifted by a line clear). Cells that end up the same color as what is already shown are skipped.
+
+    Instance Variables
+    ------------------
+    board : Board
+        The board being drawn.
+    hidden : int
+        Number of rows at the top of board that are not displayed.
+    _piece_cells : list
+        The y, x board coordinates the piece was drawn on last frame.
+    _row_ids : int list
+        The board row_ids of the rows currently shown.
+    _shown : list
+        The color of every cell currently shown. None for empty squares.
+    """
+
+    def __init__(self, board, hidden=Constants.HIDDEN_ROWS):
+        """Starts out showing the board as it is now, without a piece.
 
         Parameters
         ----------
-        new_image : PIL.Image
-            The new image to display. Must be PIL.Image not PIL.ImageTk.
+        board : Board
+            The board to draw.
+        hidden : int (default = Constants.HIDDEN_ROWS)
+            Number of rows at the top of board that are not displayed.
         """
-        self.hold_cvs.delete('all')
+        self.board = board
+        self.hidden = hidden
 
-        self._hold_im = PIL.ImageTk.PhotoImage(new_image)
-        self.hold_cvs.create_image(self._hold_im_center, image=self._hold_im)
+        self._shown = [list(row) for row in board.colors[hidden:]]
+        self._row_ids = board.row_ids[hidden:]
+        self._piece_cells = []
 
-    def update_lbl(self, score, lines, speed):
+    def changes(self, piece=None, piece_coord=None):
+        """Finds every displayed cell whose color is different from what was shown last time, and records them as shown.
+
+        Parameters
+        ----------
+        piece : Piece-like (default = None)
+            The falling piece to draw over the board. Ignored if None.
+        piece_coord : int list (default = None)
+            The y, x board coordinate of the top left corner of piece's orientation grid.
+
+        Returns
+        -------
+        list
+            A row, x, color tuple for every changed cell. row is the displayed row (board row minus hidden) and color is None for empty squares.
+        """
+        board = self.board
+        hidden = self.hidden
+
+        dirty = []
+
+        # Rows of the board that changed or moved
+        for y in range(hidden, board.height):
+            if board.row_ids[y] != self._row_ids[y - hidden]:
+                self._row_ids[y - hidden] = board.row_ids[y]
+                dirty.extend((y, x) for x in range(board.width))
+
+        # Where the piece was, in case it moved off of those cells
+        dirty.extend(self._piece_cells)
+
+        # Where the piece is now
+        piece_cells = {}
+        if piece:
+            for relative_y, relative_x in piece.get_cells():
+                y = piece_coord[0] + relative_y
+                x = piece_coord[1] + relative_x
+                if hidden <= y < board.height and 0 <= x < board.width:
+                    piece_cells[(y, x)] = piece.color
+            dirty.extend(piece_cells)
+        self._piece_cells = list(piece_cells)
+
+        changed = []
+        for y, x in dirty:
+            color = piece_cells.get((y, x), board.colors[y][x])
+
+            shown_row = self._shown[y - hidden]
+            if shown_row[x] != color:
+                shown_row[x] = color
+                changed.append((y - hidden, x, color))
+
+        return changed
+
+
+class Field_Renderer(Field_View):
+    """Incrementally renders a Board and the falling piece onto a persistent PIL image (the back buffer). Only the cells given by Field_View.changes are repainted.
+
+    Instance Variables
+    ------------------
+    image : PIL.Image
+        The back buffer. Always shows the latest frame drawn.
+    size : int
+        Pixels per block.
+    _atlas : Sprite_Atlas
+        The sprites of size.
+    _full_frame : bool
+        True until the first draw, which has to report the whole image as changed.
+    """
+
+    def __init__(self, board, hidden=Constants.HIDDEN_ROWS, size=None):
+        """Renders the first frame in full.
+
+        Parameters
+        ----------
+        board : Board
+            The board to render.
+        hidden : int (default = Constants.HIDDEN_ROWS)
+            Number of rows at the top of board that are not displayed.
+        size : int (default = None)
+            Pixels per block. If None, Constants.BLOCK_SIZE is used.
+        """
+        global Constants
+        global render
+        global get_atlas
+
+        super().__init__(board, hidden)
+
+        if size is None:
+            size = Constants.BLOCK_SIZE
+        self.size = size
+        self._atlas = get_atlas(size)
+
+        self.image = render(board.colors[hidden:], size=size)
+        self._full_frame = True
+
+    def draw(self, piece=None, piece_coord=None):
+        """Brings the back buffer up to date with the board and the piece at piece_coord.
+
+        Parameters
+        ----------
+        piece : Piece-like (default = None)
+            The falling piece to draw over the board. Ignored if None.
+        piece_coord : int list (default = None)
+            The y, x board coordinate of the top left corner of piece's orientation grid.
+
+        Returns
+        -------
+        int tuple
+            The pixel box (left, top, right, bottom) of image that changed, or None if nothing changed.
+        """
+        size = self.size
+
+        box = None
+        for row, x, color in self.changes(piece, piece_coord):
+            left = x * size
+            top = row * size
+            self.image.paste(self._atlas[color], (left, top, left + size, top + size))
+
+            if box is None:
+                box = [left, top, left + size, top + size]
+            else:
+                box[0] = min(box[0], left)
+                box[1] = min(box[1], top)
+                box[2] = max(box[2], left + size)
+                box[3] = max(box[3], top + size)
+
+        if self._full_frame:
+            self._full_frame = False
+            return (0, 0) + self.image.size
+
+        return box and tuple(box)
+
+
+class Canvas_Renderer(Field_View):
+    """Draws a Board and the falling piece directly on a tk.Canvas as a fixed grid of rectangle items. The items are created once, after that only the fill of changed cells is updated. No images are involved.
+
+    Instance Variables
+    ------------------
+    canvas : tk.Canvas
+        The canvas the grid is drawn on.
+    size : int
+        Pixels per block.
+    _hex : dict
+        Cache of the tk color string of every color used so far.
+    _items : list
+        The canvas item id of every displayed cell.
+    """
+
+    def __init__(self, board, hidden, canvas, size=None):
+        """Creates the grid of rectangles showing the board as it is now.
+
+        Parameters
+        ----------
+        board : Board
+            The board to draw.
+        hidden : int
+            Number of rows at the top of board that are not displayed.
+        canvas : tk.Canvas
+            The canvas to draw on. Anything already on it is deleted.
+        size : int (default = None)
+            Pixels per block. If None, Constants.BLOCK_SIZE is used.
+        """
+        global Constants
+        global Palette
+
+        super().__init__(board, hidden)
+
+        if size is None:
+            size = Constants.BLOCK_SIZE
+        self.size = size
+        self.canvas = canvas
+        self._hex = dict()
+
+        offset = Constants.BD_SIZE
+        outline = self._get_hex(Palette.GRIDLINE)
+
+        canvas.delete('all')
+        self._items = []
+        for row, colors in enumerate(self._shown):
+            items = []
+            for x, color in enumerate(colors):
+                left = x * size + offset
+                top = row * size + offset
+                items.append(canvas.create_rectangle(left, top, left + size, top + size, fill=self._get_hex(color), outline=outline))
+            self._items.append(items)
+
+    def _get_hex(self, color):
+        """Returns the tk color string of color. None gives Palette.BLANK."""
+        global Palette
+
+        try:
+            return self._hex[color]
+        except KeyError:
+            self._hex[color] = '#' + Palette._get_blank_hex(color or Palette.BLANK)
+            return self._hex[color]
+
+    def draw(self, piece=None, piece_coord=None):
+        """Updates the fill of every rectangle whose cell changed.
+
+        Parameters
+        ----------
+        piece : Piece-like (default = None)
+            The falling piece to draw over the board. Ignored if None.
+        piece_coord : int list (default = None)
+            The y, x board coordinate of the top left corner of piece's orientation grid.
+
+        Returns
+        -------
+        None
+            The canvas is already up to date, there is no image to display.
+        """
+        for row, x, color in self.changes(piece, piece_coord):
+            self.canvas.itemconfig(self._items[row][x], fill=self._get_hex(color))
+
+
+class Frame_Sink:
+    """Streams frames of the gamefield as raw RGB bytes (rgb24, rows top to bottom, no header or padding) to a binary file or pipe, for example the stdin of an encoder:
+
+        ffmpeg -f rawvideo -pix_fmt rgb24 -s WIDTHxHEIGHT -r 60 -i - out.mp4
+
+    Frames are drawn by a Field_Renderer and kept in a persistent bytearray. Only the pixel box the renderer reports as changed is copied into it, and the frame is written through a memoryview, so frames are never encoded or copied as a whole.
+
+    Instance Variables
+    ------------------
+    file : file object
+        Binary file or pipe the frames are written to.
+    frames : int
+        Number of frames written.
+    renderer : Field_Renderer
+        Draws the board attached last. None until attach is called.
+    size : int tuple
+        Width and height of the frames in pixels. None until attach is called.
+    _buffer : bytearray
+        The current frame.
+    _view : memoryview
+        View of _buffer, for writing and copying into it without copies.
+    """
+
+    def __init__(self, file):
+        """Sets up the sink. Nothing can be written until a board is attached.
+
+        Parameters
+        ----------
+        file : file object
+            Binary file or pipe to write the frames to.
+        """
+        self.file = file
+        self.frames = 0
+        self.renderer = None
+        self.size = None
+
+        self._buffer = None
+        self._view = None
+
+    def attach(self, board, hidden=Constants.HIDDEN_ROWS):
+        """Starts drawing a board, for example the board of a new game. Every board attached to a sink has to give frames of the same size.
+
+        Parameters
+        ----------
+        board : Board
+            The board to draw.
+        hidden : int (default = Constants.HIDDEN_ROWS)
+            Number of rows at the top of board that are not displayed.
+        """
+        global Field_Renderer
+
+        self.renderer = Field_Renderer(board, hidden)
+        size = self.renderer.image.size
+
+        if self.size is None:
+            self.size = size
+            self._buffer = bytearray(size[0] * size[1] * 3)
+            self._view = memoryview(self._buffer)
+        elif size != self.size:
+            raise ValueError(f'Frames are {self.size[0]}x{self.size[1]}, the board gives {size[0]}x{size[1]}.')
+
+    def write(self, piece=None, piece_coord=None):
+        """Draws the attached board with the piece at piece_coord and writes the frame. Unchanged frames are written too, so frames stay evenly spaced in time.
+
+        Parameters
+        ----------
+        piece : Piece-like (default = None)
+            The falling piece to draw over the board. Ignored if None.
+        piece_coord : int list (default = None)
+            The y, x board coordinate of the top left corner of piece's orientation grid.
+        """
+        box = self.renderer.draw(piece, piece_coord)
+        if box:
+            self._update(box)
+
+        self._output(self._view)
+        self.frames += 1
+
+    def close(self):
+        """Closes file."""
+        self.file.close()
+
+    def _update(self, box):
+        """Copies the pixel box (left, top, right, bottom) of the renderer's image into the frame."""
+        left, top, right, bottom = box
+        row_bytes = self.size[0] * 3
+        data = self.renderer.image.crop(box).tobytes()
+
+        if right - left == self.size[0]:
+            # Full width, the rows are contiguous in the frame too
+            self._view[top * row_bytes:bottom * row_bytes] = data
+            return
+
+        start = left * 3
+        width = (right - left) * 3
+        for i, y in enumerate(range(top, bottom)):
+            offset = y * row_bytes + start
+            self._view[offset:offset + width] = data[i * width:(i + 1) * width]
+
+    def _output(self, frame):
+        """Hands a finished frame to file."""
+        self.file.write(frame)
+
+
+class Ring_Buffer_Sink(Frame_Sink):
+    """A Frame_Sink that writes into a memory-mapped file holding the last few frames, for a reader process on the same machine. The writer never waits for the reader, frames the reader does not get to in time are overwritten.
+
+    Layout: HEADER (MAGIC, width, height, slots, frames written, all little endian), then slots frames of raw RGB bytes. Frame n (counting from 0) is in slot n % slots. The frame count is updated after a frame is complete, so the newest complete frame is in slot (frames - 1) % slots. A reader should check that the count did not move on by slots or more while it was copying a frame.
+
+    Class Variables
+    ---------------
+    HEADER : struct.Struct
+        Layout of the header.
+    MAGIC : bytes
+        The first bytes of the file.
+
+    Instance Variables
+    ------------------
+    path : str
+        Path of the memory-mapped file.
+    slots : int
+        Number of frames the file holds.
+    _map : mmap.mmap
+        The memory-mapped file.
+    """
+    HEADER = struct.Struct('<4sIIIQ')
+    MAGIC = b'TTFR'
+
+    def __init__(self, path, slots=8):
+        """Sets up the sink. The file is created once the first board is attached.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file to create. Overwritten if it exists.
+        slots : int (default = 8)
+            Number of frames the file holds.
+        """
+        super().__init__(None)
+
+        self.path = path
+        self.slots = slots
+        self._map = None
+
+    def attach(self, board, hidden=Constants.HIDDEN_ROWS):
+        """Overrides Frame_Sink.attach to create the file for the frame size."""
+        global mmap
+
+        super().attach(board, hidden)
+
+        if self._map is None:
+            self.file = open(self.path, 'w+b')
+            self.file.truncate(self.HEADER.size + self.slots * len(self._buffer))
+            self._map = mmap.mmap(self.file.fileno(), 0)
+            self._write_header()
+
+    def close(self):
+        """Overrides Frame_Sink.close to unmap the file first."""
+        if self._map is not None:
+            self._map.close()
+            self.file.close()
+
+    def _output(self, frame):
+        """Overrides Frame_Sink._output to copy the frame into its slot and publish it."""
+        offset = self.HEADER.size + self.frames % self.slots * len(frame)
+        self._map[offset:offset + len(frame)] = frame
+        self._write_header(self.frames + 1)
+
+    def _write_header(self, frames=0):
+        """Writes the header with the given frame count."""
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.size[0], self.size[1], self.slots, frames)
+
+
+class Profile_Panel:
+    """Shows piece profiles on a tk.Canvas in a column of slots, with rows of blank grid squares (separators) between them. Used for the next and hold canvases.
+
+    Everything is drawn once and then only swapped: the separators are canvas image items that never change, and every slot is an image item pointing at the cached PhotoImage of a piece's profile. Showing new pieces only changes which PhotoImage a slot points at, and slots that already show the right piece are left alone.
+
+    Instance Variables
+    ------------------
+    canvas : tk.Canvas
+        The canvas the panel is drawn on.
+    size : int
+        Pixels per block.
+    _separator_items : int list
+        Canvas item ids of the separators. Hidden until something is shown.
+    _separator_rows : int list
+        The row (in blocks) of each separator.
+    _shown : list
+        The Piece class shown in each slot. None for empty slots.
+    _slot_items : int list
+        Canvas item id of each slot.
+    _slot_rows : int list
+        The row (in blocks) of the top of each slot.
+    """
+    global Constants
+    global LRU_Cache
+
+    # Shared by every panel, per block size. PhotoImages can only be made once tk is running, so these are filled in as needed
+    _profile_ims = LRU_Cache(7 * Constants.SPRITE_SCALES)
+    _separator_ims = LRU_Cache(Constants.SPRITE_SCALES)
+
+    def __init__(self, canvas, slot_rows, separator_rows, size=None):
+        """Creates the separator and slot items on canvas.
+
+        Parameters
+        ----------
+        canvas : tk.Canvas
+            The canvas to draw on.
+        slot_rows : int list
+            The row (in blocks) of the top of each slot. Slots are 2 rows high.
+        separator_rows : int list
+            The row (in blocks) of each separator.
+        size : int (default = None)
+            Pixels per block. If None, Constants.BLOCK_SIZE is used.
+        """
+        global Constants
+
+        if size is None:
+            size = Constants.BLOCK_SIZE
+
+        self.canvas = canvas
+        self.size = size
+        self._slot_rows = slot_rows
+        self._separator_rows = separator_rows
+
+        separator_im = self._get_separator_im()
+        self._separator_items = [self._create_item(row, separator_im) for row in separator_rows]
+        for item in self._separator_items:
+            canvas.itemconfig(item, state='hidden')
+
+        self._slot_items = [self._create_item(row, '') for row in slot_rows]
+        self._shown = [None for row in slot_rows]
+
+    def _create_item(self, row, image):
+        """Creates an image item with its top left corner at the start of row."""
+        return self.canvas.create_image(self._row_coords(row), image=image, anchor='nw')
+
+    def _row_coords(self, row):
+        """Returns the canvas coordinates of the top left corner of row."""
+        offset = Constants.BD_SIZE
+        return offset, offset + row * self.size
+
+    def _get_separator_im(self):
+        """Returns the cached PhotoImage of a separator at size, making it first if needed."""
+        global PIL
+        global render
+
+        return self._separator_ims.get(self.size, lambda: PIL.ImageTk.PhotoImage(render([[None for x in range(4)]], size=self.size)))
+
+    def _get_profile_im(self, kind):
+        """Returns the cached PhotoImage of the profile of the Piece class kind at size, making it first if needed."""
+        global PIL
+        global get_profiles
+
+        return self._profile_ims.get((kind, self.size), lambda: PIL.ImageTk.PhotoImage(get_profiles(self.size)[kind]))
+
+    def show(self, pieces):
+        """Shows pieces in the slots, in order.
+
+        Parameters
+        ----------
+        pieces : list
+            A Piece-like (or None to leave it empty) for each slot.
+        """
+        for i, piece in enumerate(pieces):
+            kind = None if piece is None else piece.__class__
+            if kind is self._shown[i]:
+                continue
+            self._shown[i] = kind
+
+            image = '' if kind is None else self._get_profile_im(kind)
+            self.canvas.itemconfig(self._slot_items[i], image=image)
+
+        state = 'normal' if any(self._shown) else 'hidden'
+        for item in self._separator_items:
+            self.canvas.itemconfig(item, state=state)
+
+    def set_size(self, size):
+        """Moves every item and swaps every image for the ones of a new block size, keeping what is shown.
+
+        Parameters
+        ----------
+        size : int
+            Pixels per block.
+        """
+        self.size = size
+
+        separator_im = self._get_separator_im()
+        for item, row in zip(self._separator_items, self._separator_rows):
+            self.canvas.coords(item, self._row_coords(row))
+            self.canvas.itemconfig(item, image=separator_im)
+
+        for item, row, kind in zip(self._slot_items, self._slot_rows, self._shown):
+            self.canvas.coords(item, self._row_coords(row))
+            self.canvas.itemconfig(item, image='' if kind is None else self._get_profile_im(kind))
+
+
+class App:
+    """Controls the tkinter application used as an interface for the game.
+
+    Instance Variables
+    ------------------
+    backend : str
+        How the gamefield is drawn. One of Constants.BACKENDS.
+    block_size : int
+        Pixels per block. Changes when the window is resized.
+    field_height : int
+        Number of displayed rows of the gamefield.
+    field_width : int
+        Number of columns of the gamefield.
+    game : Game
+        The game being played. Told to redraw when block_size changes.
+    game_cvs : tk.Canvas
+        Canvas for displaying the gamefield.
+    hold_cvs : tk.Canvas
+        Canvas for displaying held tetris pieces.
+    hold_panel : Profile_Panel
+        Draws the held piece on hold_cvs.
+    info_lbl : tk.Label
+        Label widget to display current score, speed, and lines completed.
+    next_cvs : tk.Canvas
+        Canvas for displaying incoming pieces (pieces in Game.Piece_Buffer).
+    next_panel : Profile_Panel
+        Draws the incoming pieces on next_cvs.
+    root : tk.Tk
+        Root of the tk application.
+    _game_im : PIL.ImageTk.PhotoImage
+        Variable to hold game_cvs's displayed image in memory. Not used by the 'canvas' backend.
+    _game_im_center : int tuple
+        2 element tuple giving the center coord of game_cvs for _game_im.
+    _resize_id : str
+        Id of the scheduled call to apply_resize, for debouncing. None if nothing is scheduled.
+    """
+    global tk, PIL
+
+    def __init__(self, game, backend=None, width=None, height=None):
+        """Create the tkinter window in which the game is played.
+
+        Parameters
+        ----------
+        game: Game
+            The instance of game that is being played. Needed in order to bind events to the tk application and to bind game.lose to when the window is closed.
+        backend : str (default = None)
+            How the gamefield is drawn. One of Constants.BACKENDS. If None, Constants.BACKEND is used.
+        width : int (default = None)
+            Number of columns of the gamefield. If None, Constants.BOARD_WIDTH is used.
+        height : int (default = None)
+            Number of displayed rows of the gamefield. If None, Constants.BOARD_HEIGHT is used.
+
+        Returns
+        -------
+        Tk
+            The tk.Tk object that controls the window
+        """
+        global Constants, Palette
+
+        if backend is None:
+            backend = Constants.BACKEND
+        if backend not in Constants.BACKENDS:
+            raise ValueError(f'backend must be one of {Constants.BACKENDS}, not {backend!r}.')
+        if width is None:
+            width = Constants.BOARD_WIDTH
+        if height is None:
+            height = Constants.BOARD_HEIGHT
+        self.backend = backend
+        self.game = game
+        self.field_width = width
+        self.field_height = height
+        # Bigger fields start with smaller blocks, so the window stays about GAME_SIZE
+        self.block_size = max(Constants.MIN_BLOCK_SIZE, min(Constants.GAME_SIZE[0] // width, Constants.GAME_SIZE[1] // height))
+
+
+        self.root = tk.Tk()
+        self.root.title('Tetris')
+
+
+        # HOLD CANVAS
+        self.hold_cvs = tk.Canvas(self.root)
+        self.hold_cvs.grid(row=0, column=0, sticky='new')
+
+        # Appearance
+        self.hold_cvs['relief'] = 'sunken'
+        self.hold_cvs['bd'] = Constants.BD_SIZE
+
+        # Init panel
+        # The profile is 2 rows high with a blank row above and below it
+        self.hold_panel = Profile_Panel(self.hold_cvs, [1], [0, 3], self.block_size)
+
+
+        # GAMEFIELD CANVAS
+        self.game_cvs = tk.Canvas(self.root)
+        self.game_cvs.grid(row=0, column=1, rowspan=2, sticky='nesw')
+
+        # Appearance
+        self.game_cvs['relief'] = 'sunken'
+        self.game_cvs['bd'] = Constants.BD_SIZE
+
+        # The image is made by make_renderer
+        self._game_im_center = None
+        self._game_im = None
+
+
+        # NEXT CANVAS
+        self.next_cvs = tk.Canvas(self.root)
+        self.next_cvs.grid(row=0, column=2, sticky='new')
+
+        # Appearance
+        self.next_cvs['relief'] = 'sunken'
+        self.next_cvs['bd'] = Constants.BD_SIZE
+
+        # Init panel
+        # 5 profiles, 2 rows each, with a blank row between each
+        self.next_panel = Profile_Panel(self.next_cvs, [0, 3, 6, 9, 12], [2, 5, 8, 11], self.block_size)
+
+
+        # SCORE LABEL
+        self.info_lbl = tk.Label(self.root, text='init text')
+        self.info_lbl.grid(row=1, column=0, sticky='nesw')
+        self.info_lbl['fg'] = 'white'
+
+
+        # ON CLOSE PROTOCOL
+        def on_closing():
+            """Protocol handler for when the window should close."""
+            game.stop()
+        self.root.protocol("WM_DELETE_WINDOW", on_closing)
+
+
+        # FINAL SETTINGS
+        self.set_background(Palette.BLANK_HEX)
+        self.update_lbl(0, 0, Constants.START_SPEED)
+        self.size_canvases()
+
+        # Redraw everything at a new block size once the user stops resizing
+        self._resize_id = None
+        self.root.bind('<Configure>', self.on_configure)
+
+        self.make_bindings(game)
+
+    def make_bindings(self, game):
+        """Setup all event bindings needed in the program.
+
+        Parameters
+        ----------
+        game: Game
+            The instance of game that is being played. Needed in order to bind events to the tk application.
+        """
+        def bind(key, action):
+            """Queue action in game when key is pressed and released."""
+            self.root.bind_all(f'<KeyPress-{key}>', lambda event: game.queue_input('press', action))
+            self.root.bind_all(f'<KeyRelease-{key}>', lambda event: game.queue_input('release', action))
+
+        # WASD Controls
+        bind('s', 'down')
+        bind('space', 'hard_drop')
+
+        bind('a', 'left')
+        bind('d', 'right')
+
+        bind('q', 'rotate_ccw')
+        bind('e', 'rotate_cw')
+
+        bind('w', 'hold')
+
+        bind('p', 'lose')
+
+        bind('F5', 'save')
+        bind('F9', 'load')
+
+        # Arrow Controls
+        bind('Down', 'down')
+
+        bind('Left', 'left')
+        bind('Right', 'right')
+
+        bind('Up', 'rotate_cw')
+
+        bind('z', 'hold')
+
+    def set_background(self, color, container=None):
+        """Recursively sets the background of every widget to color.
+
+        Parameters
+        ----------
+        color : int tuple
+            The rgb color to set the backgrounds to.
+        container : Tk object (default = None)
+            The container to look through for widgets and more containers to change the background of.
+        """
+        if container is None:
+            container = self.root
+
+        container.config(bg=color)
+
+        for child in container.winfo_children():
+            if child.winfo_children():
+                # child has children, go through its children
+                self.set_background(color, child)
+            else:
+                child.config(bg=color)
+
+
+    def start(self, call_me):
+        """Starts the event loop and calls get_ready to display instructions. call_me is a function that will be called once the user has closed the get_ready popup."""
+
+        def get_ready():
+            """Show a pop-up window with instructions and a start button."""
+            global messagebox
+
+            message = "Welcome to my homebrew Python version of Tetris.\n"
+            message += "Everyone who doesn't live under a rock knows the rules, so I'm not going to explain them here. However the controls I will explain.\n\n"
+
+            message += "Controls:\n"
+            message += "   Move left/right - A / D or left / right arrows\n"
+            message += "   Rotate left/right - Q / E or up arrow (only rotate right)\n"
+            message += "   Down - S or down arrow\n"
+            message += "   Hard drop - Space\n"
+            message += "   Hold - W or Z\n"
+            message += "   Quit - P\n"
+            message += "   Save/load game - F5 / F9 (with --state)\n\n"
+
+            message += "Made by Carson Jones (2021).\n"
+            message += "Source code: https://github.com/DJCubed12/Tetris"
+
+            messagebox.showinfo('Instructions', message)
+
+            call_me()
+
+        self.root.after_idle(get_ready)
+        self.root.mainloop()
+
+    def play_again(self, score, lines, speed):
+        """The user has lost. Display stats and ask for another round. If yes return True for Game."""
+        global messagebox
+
+        message = "GAME OVER\n\n"
+
+        message += f"Final Stats:\n"
+        message += f"   Score - {score}\n"
+        message += f"   Lines - {lines}\n"
+        message += f"   Speed - {(1/speed):.3f} blocks/sec\n\n"
+
+        message += f"Play Again?\n"
+
+        return messagebox.askyesno('Play Again?', message)
+
+
+    def size_canvases(self):
+        """Sets the size of every canvas for block_size."""
+        size = self.block_size
+
+        self.hold_cvs.config(width=4 * size, height=4 * size)
+        self.game_cvs.config(width=self.field_width * size, height=self.field_height * size)
+        # 5 blocks, 2 lines each, plus a gap between each = 14
+        self.next_cvs.config(width=4 * size, height=14 * size)
+
+    def on_configure(self, event):
+        """Event binding for the window changing size. Waits until it has stayed the same for Constants.RESIZE_DELAY before calling apply_resize, so dragging the window does not redraw anything."""
+        global Constants
+
+        # Configure events of every widget come through root
+        if event.widget is not self.root:
+            return
+
+        if self._resize_id is not None:
+            self.root.after_cancel(self._resize_id)
+        self._resize_id = self.root.after(round(Constants.RESIZE_DELAY * 1000), self.apply_resize)
+
+    def apply_resize(self):
+        """Picks the biggest block size that fits the window and switches to it."""
+        global Constants
+
+        self._resize_id = None
+
+        # The size the window asks for is the current blocks plus everything else (borders, label), so a window at that size keeps its block size
+        # 4 blocks for hold, the gamefield and 4 for next wide, the gamefield (or next, 14) high
+        columns = self.field_width + 8
+        rows = max(self.field_height, 14)
+        padding_x = self.root.winfo_reqwidth() - columns * self.block_size
+        padding_y = self.root.winfo_reqheight() - rows * self.block_size
+
+        width = (self.root.winfo_width() - padding_x) // columns
+        height = (self.root.winfo_height() - padding_y) // rows
+        self.set_block_size(max(Constants.MIN_BLOCK_SIZE, min(width, height)))
+
+    def set_block_size(self, size):
+        """Redraws everything with a new block size.
+
+        Parameters
+        ----------
+        size : int
+            Pixels per block.
+        """
+        if size == self.block_size:
+            return
+        self.block_size = size
+
+        self.size_canvases()
+        self.hold_panel.set_size(size)
+        self.next_panel.set_size(size)
+        self.game.rescale()
+
+    def make_renderer(self, board, hidden):
+        """Creates the renderer that draws board on game_cvs with this app's backend.
+
+        Parameters
+        ----------
+        board : Board
+            The board to draw.
+        hidden : int
+            Number of rows at the top of board that are not displayed.
+
+        Returns
+        -------
+        Field_Renderer or Canvas_Renderer
+            The renderer, at block_size. Its draw method returns a box to pass to update_game along with its image, or None if there is nothing more to do.
+        """
+        global Constants, Palette
+        global Field_Renderer, Canvas_Renderer
+
+        # A loaded game can be on a board of another size
+        if (board.width, board.height - hidden) != (self.field_width, self.field_height):
+            self.field_width, self.field_height = board.width, board.height - hidden
+            self.size_canvases()
+
+        if self.backend == 'canvas':
+            return Canvas_Renderer(board, hidden, self.game_cvs, self.block_size)
+
+        renderer = Field_Renderer(board, hidden, self.block_size)
+
+        # Start from a blank image of the right size, the first draw fills it in
+        self.game_cvs.delete('all')
+        game_sizex, game_sizey = renderer.image.size
+        self._game_im_center = ((game_sizex / 2) + Constants.BD_SIZE, (game_sizey / 2) + Constants.BD_SIZE)
+        self._game_im = PIL.ImageTk.PhotoImage(PIL.Image.new('RGB', renderer.image.size, Palette.BLANK))
+        self.game_cvs.create_image(self._game_im_center, image=self._game_im)
+
+        return renderer
+
+    def update_game(self, new_image, box=None):
+        """Update the image in the game canvas.
+
+        If box is None, clear self.game_cvs, convert PIL Image to PIL ImageTk and place on game_cvs. Otherwise only the box region of new_image is converted and copied into the displayed image.
+
+        Parameters
+        ----------
+        new_image : PIL.Image
+            The new image to display. Must be PIL.Image not PIL.ImageTk.
+        box : int tuple (default = None)
+            The pixel box (left, top, right, bottom) of new_image that changed since the last update. new_image must be the same size as the displayed image.
+        """
+        if box is None:
+            self.game_cvs.delete('all')
+
+            self._game_im = PIL.ImageTk.PhotoImage(new_image)
+            self.game_cvs.create_image(self._game_im_center, image=self._game_im)
+        else:
+            region = PIL.ImageTk.PhotoImage(new_image.crop(box))
+            self.game_cvs.tk.call(str(self._game_im), 'copy', str(region), '-to', box[0], box[1])
+
+    def update_next(self, pieces):
+        """Update the pieces shown in the next canvas.
+
+        Parameters
+        ----------
+        pieces : list
+            The incoming pieces, in order.
+        """
+        self.next_panel.show(pieces)
+
+    def update_hold(self, piece):
+        """Update the piece shown in the hold canvas.
+
+        Parameters
+        ----------
+        piece : Piece-like
+            The held piece. None to show nothing.
+        """
+        self.hold_panel.show([piece])
+
+    def update_lbl(self, score, lines, speed):
         """Update the info label to reflect the new score, lines completed, and speed.
 
         Parameters
         ----------
-        score : int
-            The current score the user has.
+        score : int
+            The current score the user has.
+        lines : int
+            The total number of lines completed.
+        speed : int
+            The current speed.
+        """
+        new_score = f'Score:\n{score}\n\n'
+        new_lines = f'Lines:\n{lines}\n\n'
+        new_speed = f'Speed:\n{1/speed:.3f} blocks/sec'
+
+        self.info_lbl['text'] = new_score + new_lines + new_speed
+
+class Engine:
+    """The rules of the game on their own. Keeps track of a grid (10x20 by default) where the game is played and contains functions for piece movement, and coordincate checking. There is no rendering and no timers, so it can run without a display (bots, tests, analytics).
+
+    The game is advanced by calling step with one of ACTIONS, or the action methods themselves, and tick for gravity. Game builds the tk frontend on top of this by overriding the action methods.
+
+    Players holding down a key is handled here too: press and release mark an action as held, and update_input repeats held REPEATABLE actions with delayed auto shift (das) and auto repeat rate (arr), so frontends don't have to rely on the OS's key repeat.
+
+    Class Variables
+    ---------------
+    ACTIONS : str tuple
+        Names of the actions step accepts. Each is also a method.
+    REPEATABLE : str tuple
+        Actions that repeat while held.
+
+    Instance Variables
+    ------------------
+    arr : float
+        Auto repeat rate. Seconds between repeats of a held action once it starts repeating. 0 or less repeats as far as the piece can go.
+    board : Board
+        A bitboard describing the placement of all current blocks. The extra hidden top rows are for pieces to start in (not to be display).
+    current : Piece-like
+        The current piece falling.
+    current_coord : int list
+        The y, x coordinate of where the top left corner of the current Piece is on the gamefield. Next Pieces start at spawn_coord().
+    das : float
+        Delayed auto shift. Seconds a REPEATABLE action must be held before it starts repeating.
+    game_over : bool
+        True once the game has been lost. Nothing stops the engine from being stepped afterwards, that is up to whoever is running it.
+    gamefield : list
+        The color layer of board. Read only, use board to make changes.
+    held : Piece-like
+        Variable to hold held piece to be swapped out on command.
+    hidden : int
+        Number of rows at the top of board where pieces start, not displayed. A block left in the lowest of them loses the game.
+    lines_complete : int
+        Total number of lines completed.
+    piece_buffer : Piece_Buffer
+        Iterator giving next pieces.
+    replay : Replay
+        Records every step and tick, None if the game is not being recorded.
+    score : int
+        Score the user has earned.
+    speed : int
+        Current speed in seconds. Pieces automatically fall at this speed.
+    _already_held : bool
+        Becomes true when the user holds a piece (calls hold). If True, this prevents the user to hold again until the next piece.
+    _auto_shift : dict
+        Every held REPEATABLE action and the seconds until it next repeats.
+    _lines_step_counter : int
+        Number of lines left until speed changes. Resets to Constants.LINES_SPEED_STEP.
+    """
+    ACTIONS = ('left', 'right', 'down', 'hard_drop', 'rotate_cw', 'rotate_ccw', 'hold')
+    REPEATABLE = ('left', 'right', 'down')
+
+    def __init__(self, seed=None, randomizer=None, record=False, width=None, height=None, hidden=None):
+        """Initializes variables and creates the first piece.
+
+        Parameters
+        ----------
+        seed : int (default = None)
+            Seed of the piece sequence. If None, a random seed is picked. Stored in piece_buffer.seed.
+        randomizer : str (default = None)
+            How pieces are picked, one of Piece_Buffer.MODES. If None, Constants.RANDOMIZER is used.
+        record : bool (default = False)
+            If True, every step and tick is recorded in replay.
+        width : int (default = None)
+            Number of columns. If None, Constants.BOARD_WIDTH is used.
+        height : int (default = None)
+            Number of displayed rows. If None, Constants.BOARD_HEIGHT is used.
+        hidden : int (default = None)
+            Number of rows above the displayed ones where pieces start. If None, Constants.HIDDEN_ROWS is used.
+        """
+        global Constants
+        global Board
+        global Replay
+
+        if randomizer is None:
+            randomizer = Constants.RANDOMIZER
+        if width is None:
+            width = Constants.BOARD_WIDTH
+        if height is None:
+            height = Constants.BOARD_HEIGHT
+        if hidden is None:
+            hidden = Constants.HIDDEN_ROWS
+        if width < 4 or height < 1 or hidden < 1:
+            raise ValueError('The board must be at least 4 wide, with at least 1 displayed and 1 hidden row.')
+
+        # The extra hidden rows are where the pieces start from
+        self.board = Board(width, height + hidden)
+        self.hidden = hidden
+
+        self.score = 0
+        self.speed = Constants.START_SPEED
+        self.lines_complete = 0
+        self._lines_step_counter = Constants.LINES_SPEED_STEP
+        self.game_over = False
+
+        self.piece_buffer = self.Piece_Buffer(seed, randomizer)
+        self.replay = Replay(self.piece_buffer.seed, randomizer, dimensions=(width, height, hidden)) if record else None
+        self.current = None
+        self.current_coord = self.spawn_coord()    # y, x
+        self.held = None
+        self._already_held = False
+
+        self.das = Constants.DAS
+        self.arr = Constants.ARR
+        self._auto_shift = dict()
+
+        self.spawn()
+
+    @property
+    def gamefield(self):
+        """The color layer of the board. A list of rows containing None and/or Palette colors."""
+        return self.board.colors
+
+    def step(self, action):
+        """Applies one of ACTIONS.
+
+        Parameters
+        ----------
+        action : str
+            The name of the action.
+
+        Returns
+        -------
+        bool
+            True if the action changed anything.
+        """
+        if action not in self.ACTIONS:
+            raise ValueError(f'action must be one of {self.ACTIONS}, not {action!r}.')
+
+        if self.replay is not None:
+            self.replay.record(action)
+
+        return getattr(self, action)()
+
+    def tick(self):
+        """Applies gravity once. Same as the down action, but recorded as a tick.
+
+        Returns
+        -------
+        bool
+            Always True, the piece either moved down or was placed.
+        """
+        if self.replay is not None:
+            self.replay.record('tick')
+
+        return self.down()
+
+    def press(self, action):
+        """The player started holding action. Applies it once, and if it is REPEATABLE, starts auto shifting it (see update_input).
+
+        Parameters
+        ----------
+        action : str
+            One of ACTIONS.
+        """
+        if action in self.REPEATABLE:
+            # Left and right cancel each other out, the latest one wins
+            if action == 'left':
+                self._auto_shift.pop('right', None)
+            elif action == 'right':
+                self._auto_shift.pop('left', None)
+
+            self._auto_shift[action] = self.das
+
+        self.step(action)
+
+    def release(self, action):
+        """The player stopped holding action. Stops it from repeating.
+
+        Parameters
+        ----------
+        action : str
+            One of ACTIONS.
+        """
+        self._auto_shift.pop(action, None)
+
+    def update_input(self, elapsed):
+        """Repeats held REPEATABLE actions for the time that passed.
+
+        Parameters
+        ----------
+        elapsed : float
+            Seconds since the last call.
+        """
+        auto_shift = self._auto_shift
+        for action in list(auto_shift):
+            remaining = auto_shift[action] - elapsed
+
+            if self.arr <= 0:
+                if remaining <= 0:
+                    # Instant repeat, as far as it will go (down stops before placing the piece)
+                    for i in range(self.board.height):
+                        if action == 'down' and not self.check_move(self.current, [self.current_coord[0] + 1, self.current_coord[1]]):
+                            break
+                        if not self.step(action):
+                            break
+                    remaining = 0
+            else:
+                while remaining <= 0 and self._auto_shift is auto_shift:
+                    self.step(action)
+                    remaining += self.arr
+
+            if self._auto_shift is not auto_shift:
+                # step made a new game (Game.lose), held keys were for the old one
+                return
+            auto_shift[action] = remaining
+
+    def spawn(self):
+        """Makes the next piece in the Piece Buffer the current piece and moves it to the top."""
+        self.current = next(self.piece_buffer)
+        self.current_coord = self.spawn_coord()
+
+    def spawn_coord(self):
+        """Returns the y, x coordinate new and swapped in pieces start at, the top middle of the board."""
+        return [0, (self.board.width - 4) // 2]
+
+    def lose(self):
+        """Called once the game has been lost."""
+        self.game_over = True
+
+
+    def hold(self):
+        """Swap out the Piece in the current and hold variables.
+
+        If hold is None (first held piece), save current Piece to it and replace current with the next Piece. Change the piece position to the top.
+
+        Returns
+        -------
+        bool
+            False if the user already held this piece, otherwise True.
+        """
+        # If this is the first held piece
+        if self.held is None:
+            self.held = self.current
+            self.spawn()
+        # Prevent user from holding again before next piece
+        elif self._already_held:
+            return False
+        else:
+            new_hold = self.current
+            self.current = self.held
+            self.held = new_hold
+            self.current_coord = self.spawn_coord()
+
+        self._already_held = True
+        return True
+
+    def down(self):
+        """Moves the piece down if allowed by check_move, otherwise, make_permanent.
+
+        Returns
+        -------
+        bool
+            Always True, the piece either moved down or was placed.
+        """
+        new_coord = [self.current_coord[0] + 1, self.current_coord[1]]
+        all_clear = self.check_move(self.current, new_coord)
+
+        if all_clear:
+            self.current_coord = new_coord
+        else:
+            self.make_permanent()
+
+        return True
+
+    def hard_drop(self):
+        """Drops the piece as far as possible and places it there (using make_permanent).
+
+        Returns
+        -------
+        bool
+            Always True, the piece is always placed.
+        """
+        self.current_coord = self.ghost_coord()
+
+        self.make_permanent()
+
+        return True
+
+    def ghost_coord(self):
+        """Returns the coordinate the current piece would land at if it was hard dropped.
+
+        Returns
+        -------
+        int list
+            The y, x coordinate of the top left corner of the current piece's orientation grid.
+        """
+        distance = self.board.drop_distance(self.current, self.current_coord)
+        return [self.current_coord[0] + distance, self.current_coord[1]]
+
+    def right(self):
+        """Moves the piece right if allowed by check_move.
+
+        Returns
+        -------
+        bool
+            True if the piece moved.
+        """
+        new_coord = [self.current_coord[0], self.current_coord[1] + 1]
+        all_clear = self.check_move(self.current, new_coord)
+
+        if all_clear:
+            self.current_coord = new_coord
+
+        return all_clear
+
+    def left(self):
+        """Moves the piece left if allowed by check_move.
+
+        Returns
+        -------
+        bool
+            True if the piece moved.
+        """
+        new_coord = [self.current_coord[0], self.current_coord[1] - 1]
+        all_clear = self.check_move(self.current, new_coord)
+
+        if all_clear:
+            self.current_coord = new_coord
+
+        return all_clear
+
+    def rotate_cw(self):
+        """Rotates the piece clockwise if allowed by check_move.
+
+        Returns
+        -------
+        bool
+            True if the piece rotated.
+        """
+        new_orient = self.current.rotate_cw()
+        all_clear = self.check_move(new_orient, self.current_coord)
+
+        if all_clear:
+            self.current = new_orient
+
+        return all_clear
+
+    def rotate_ccw(self):
+        """Rotates the piece counter-clockwise if allowed by check_move.
+
+        Returns
+        -------
+        bool
+            True if the piece rotated.
+        """
+        new_orient = self.current.rotate_ccw()
+        all_clear = self.check_move(new_orient, self.current_coord)
+
+        if all_clear:
+            self.current = new_orient
+
+        return all_clear
+
+
+    def check_move(self, new_piece, new_coord):
+            """Checks to see if the new position will conflict with the current gamefield. If so return True.
+
+            Checks for when the block of a piece has the same coord as an existing block in the gamefield. Also checks for if a block of the piece would be outside the bounds of the gamefield.
+
+            Parameters
+            ----------
+            new_piece : Piece-like
+                The Piece being tested at position new_coord.
+            new_coord : int list
+                The new y, x coordinate of the top left corner of new_piece's orientation grid.
+
+            Returns
+            -------
+            bool
+                False if the new position would hit a pre-existing block, otherwise True.
+            """
+            return self.board.fits(new_piece, new_coord)
+
+    def make_permanent(self):
+        """Permanently places the current piece at it's current position, checks for lines completed, and gets next piece.
+
+        Sets the current piece's blocks in the board. Then the current piece is the next piece in the Piece Buffer and the current coordinate is reset. Then checks for and clears lines completed using check_lines, only looking at the rows the piece was placed in.
+        """
+        rows = self.board.place(self.current, self.current_coord)
+
+        self.spawn()
+        # Allow hold button again
+        self._already_held = False
+
+        self.check_lines(rows)
+
+    def check_lines(self, rows=None):
+        """Finds completed lines, clears them, moves everything down accordingly, and updates the score.
+
+        If any lines were completed, they are deleted and a new empty line is added to the top of the gamefield, shuffling everything down. Updates score and speed accordingly.
+
+        Parameters
+        ----------
+        rows : int list (default = None)
+            The only rows that could have been completed. If None, every row is checked.
+        """
+        lines = self.board.clear_lines(rows)
+        if lines:
+            self.score_manager(lines)
+
+        # Check for loss after completing and clearing any lines
+        if not self.board.is_row_empty(self.hidden - 1):
+            self.lose()
+
+    def score_manager(self, lines):
+        """Manages the changes and additions to the user's score including changing the speed.
+
+        Parameters
+        ----------
         lines : int
-            The total number of lines completed.
-        speed : int
-            The current speed.
+            Number of lines that have been cleared.
         """
-        new_score = f'Score:\n{score}\n\n'
-        new_lines = f'Lines:\n{lines}\n\n'
-        new_speed = f'Speed:\n{1/speed:.3f} blocks/sec'
+        global Constants
 
-        self.info_lbl['text'] = new_score + new_lines + new_speed
+        self.score += 100 * lines
+        self.lines_complete += lines
+        if lines == 4:
+            self.score += 100
+
+        self._lines_step_counter -= lines
+        if self._lines_step_counter <= 0:
+            # Allow excess lines to overflow to next counter
+            self._lines_step_counter += Constants.LINES_SPEED_STEP
+            self.speed *= Constants.SPEED_STEP
+
+    def add_garbage(self, lines, hole):
+        """Adds lines rows of garbage to the bottom of the board, full except for column hole (see Board.add_garbage). Sent by the opponent in versus mode. Not recorded in replay.
+
+        The current piece is moved up with the board if it would overlap it, then checks for loss just like check_lines. The game is also lost if the piece does not fit anywhere above.
+
+        Parameters
+        ----------
+        lines : int
+            Number of rows to add.
+        hole : int
+            The empty column of every added row.
+        """
+        global Palette
+
+        self.board.add_garbage(lines, hole, Palette.GARBAGE)
+
+        y, x = self.current_coord
+        while y > 0 and not self.check_move(self.current, [y, x]):
+            y -= 1
+        self.current_coord = [y, x]
+
+        if not self.board.is_row_empty(self.hidden - 1) or not self.check_move(self.current, self.current_coord):
+            self.lose()
+
+    def save_state(self):
+        """Returns a Save_State of the game, to resume it later with load_state."""
+        global Save_State
+
+        return Save_State.from_engine(self)
+
+    def load_state(self, state):
+        """Resumes a game saved with save_state. The game is no longer recorded (see Save_State.restore).
+
+        Parameters
+        ----------
+        state : Save_State
+            The saved game.
+        """
+        state.restore(self)
+
+    class Piece_Buffer:
+        """Iterator object that generates tetris pieces from its own seedable random number generator, so the same seed always gives the same sequence. Always keeps at least size pieces ready.
+
+        Pieces are generated in order and kept in a deque, so taking the next piece is O(1) and peeking ahead (even past size) never changes the sequence.
+
+        Class Variables
+        ---------------
+        MODES : str tuple
+            The ways pieces can be picked. 'uniform' picks each piece at random. 'bag' deals all 7 pieces in a random order before dealing them again (7-bag randomizer).
+
+        Instance Variables
+        ------------------
+        mode : str
+            One of MODES.
+        pieces : list
+            The next size pieces, in order.
+        rng : random.Random
+            Picks the pieces.
+        seed : int
+            The seed rng started from.
+        size : int
+            Number of pieces kept ready (shown in the next canvas).
+        _bag : list
+            Pieces left in the current bag. Only used in 'bag' mode.
+        _queue : collections.deque
+            Every generated piece that has not been taken yet.
+        """
+        MODES = ('uniform', 'bag')
+
+        def __init__(self, seed=None, mode='uniform', size=5):
+            """Initialize the random number generator and generate the initial pieces.
+
+            Parameters
+            ----------
+            seed : int (default = None)
+                Seed of the sequence. If None, a random seed is picked (and saved in seed).
+            mode : str (default = 'uniform')
+                One of MODES.
+            size : int (default = 5)
+                Number of pieces to keep ready.
+            """
+            global Random, randrange
+            global deque
+
+            if mode not in self.MODES:
+                raise ValueError(f'mode must be one of {self.MODES}, not {mode!r}.')
+
+            if seed is None:
+                seed = randrange(1 << 32)
+            self.seed = seed
+            self.rng = Random(seed)
+            self.mode = mode
+            self.size = size
+
+            self._bag = []
+            self._queue = deque()
+            self.peek(size)
 
-class Game:
-    """The main object of the program. Keeps track of a 10x20 grid where the game is played. Contains functions for rendering, piece movement, and coordincate checking. Hosts the App object.
+        @property
+        def pieces(self):
+            """The next size pieces, in order."""
+            return self.peek(self.size)
+
+        def gen_new_piece(self):
+            """Creates a random tetris piece and appends it to the queue.
+
+            Uses the global tuple PIECES which contains all tetris piece classes.
+            """
+            global PIECES
+
+            if self.mode == 'bag':
+                if not self._bag:
+                    self._bag = list(PIECES)
+                    self.rng.shuffle(self._bag)
+                self._queue.append(self._bag.pop()())
+            else:
+                self._queue.append(self.rng.choice(PIECES)())
+
+        def peek(self, n):
+            """Returns the next n pieces in order without taking them. Generates more pieces if needed.
+
+            Parameters
+            ----------
+            n : int
+                Number of pieces to look at. Can be more than size.
+
+            Returns
+            -------
+            list
+                The next n pieces.
+            """
+            global islice
+
+            while len(self._queue) < n:
+                self.gen_new_piece()
+
+            return list(islice(self._queue, n))
+
+        def __iter__(self):
+            """Makes Piece_Buffer an iterator object."""
+            return self
+
+        def __next__(self):
+            """Take and return the first piece, making sure size pieces are still ready."""
+            while len(self._queue) <= self.size:
+                self.gen_new_piece()
+
+            return self._queue.popleft()
+
+        def __str__(self):
+            """Creates a string representation of the coming pieces for debugging."""
+            fin = ''
+            for piece in self.pieces:
+                p = str(piece) + '\n'
+                fin += p
+
+            return fin
+
+
+class Game(Engine):
+    """The tk frontend of Engine. Hosts the App object and runs the game loop, which ticks the game and redraws it whenever an action changed something.
 
     Instance Variables
     ------------------
     app : App
         The Tk application that interfaces the game to the user.
-    current : Piece-like
-        The current piece falling.
-    current_coord : int list
-        The y, x coordinate of where the bottom left corner of the current Piece is on the gamefield. Next Pieces should start at [0, 3].
-    drop_timer : RepeatedTimer
-        The Timer object that is ran in a different thread that calls drop_loop periodically.
-    gamefield : list
-        A 10x23 list describing the placement of all current blocks and the current Piece falling. The extra 3 top rows are for pieces to start in (not to be display).
-    held : Piece-like
-        Variable to hold held piece to be swapped out on command.
-    lines_complete : int
-        Total number of lines completed.
-    piece_buffer : Piece_Buffer
-        Iterator giving next pieces.
-    score : int
-        Score the user has earned.
-    speed : int
-        Current speed in milliseconds. Pieces automatically fall at this speed.
-    _already_held : bool
-        Becomes true when the user holds a piece (calls hold). If True, this prevents the user to hold again until the next piece.
-    _lines_step_counter : int
-        Number of lines left until speed changes. Resets to Constants.LINES_SPEED_STEP.
+    frame_sink : Frame_Sink
+        Every frame is also written here, None to not stream frames.
+    input_queue : collections.deque
+        Key presses and releases waiting to be applied, as (kind, action) tuples. Filled by the key bindings and emptied once per frame.
+    loop : Game_Loop
+        Calls tick every speed seconds and frame every frame, on the tk thread.
+    record_dir : str
+        Directory every game is saved to as a replay file when it ends, None to not record.
+    renderer : Field_Renderer or Canvas_Renderer
+        Keeps the displayed gamefield up to date. Made by app.make_renderer.
+    spectators : spectate.Spectator_Server
+        Every frame is also published here, None to not broadcast the game.
+    state_file : str
+        File the game in progress is saved to and loaded from (see Save_State), None to not allow saving.
+    _last_frame : float
+        time.monotonic time of the last frame.
+    _pressed : set
+        Actions whose key is currently down.
+    _redraw : bool
+        True when the gamefield changed since it was last drawn.
     """
 
-    def __init__(self, app=None):
-        """Creates the App object. Initializes variables. Calls app.get_ready before starting the game."""
-        global RepeatedTimer
-        global Constants
+    def __init__(self, app=None, backend=None, seed=None, randomizer=None, record_dir=None, frame_sink=None, overlay=None, spectators=None, state_file=None, width=None, height=None, hidden=None):
+        """Creates the App object. Initializes variables. Calls app.get_ready before starting the game.
+
+        Parameters
+        ----------
+        app : App (default = None)
+            The App to play in. If None, a new one is created.
+        backend : str (default = None)
+            Passed to App when creating a new one. See Constants.BACKENDS.
+        seed : int (default = None)
+            See Engine.
+        randomizer : str (default = None)
+            See Engine.
+        record_dir : str (default = None)
+            Directory to save a replay of every game to. If None, games are not recorded.
+        frame_sink : Frame_Sink (default = None)
+            Sink to also write every frame to. If None, frames are only shown.
+        overlay : Profiler (default = None)
+            Profiler whose timings are shown over the gamefield of a new app. Ignored if app is given.
+        spectators : spectate.Spectator_Server (default = None)
+            Server to also publish every frame to. If None, the game is not broadcast.
+        state_file : str (default = None)
+            File to save the game in progress to and load it from. If None, saving is not allowed.
+        width : int (default = None)
+            See Engine.
+        height : int (default = None)
+            See Engine.
+        hidden : int (default = None)
+            See Engine.
+        """
+        global Game_Loop
         global App
 
         if app is None:
-            app = App(self)
+            app = App(self, backend, width, height)
+            if overlay is not None:
+                overlay.show_overlay(app)
         self.app = app
-
-        # The displayed gamefield is 10x20, the extra 3 rows are where the pieces start from.
-        self.gamefield = [[None for x in range(10)] for y in range(23)]
-
-        self.score = 0
-        self.speed = Constants.START_SPEED
-        self.lines_complete = 0
-        self._lines_step_counter = Constants.LINES_SPEED_STEP
-        self.drop_timer = RepeatedTimer(self.speed, self.down)
-
-        self.piece_buffer = self.Piece_Buffer(self.app)
-        self.current = None
-        self.current_coord = [0, 3]    # y, x
-        self.held = None
+        self.record_dir = record_dir
+
+        super().__init__(seed, randomizer, record_dir is not None, width, height, hidden)
+
+        self.renderer = self.app.make_renderer(self.board, self.hidden)
+        self.frame_sink = frame_sink
+        if frame_sink is not None:
+            frame_sink.attach(self.board, self.hidden)
+        self.spectators = spectators
+        self.state_file = state_file
+        self._redraw = False
+        self.input_queue = deque()
+        self._pressed = set()
+        self._last_frame = monotonic()
+        self.loop = Game_Loop(self.app.root, self.tick, lambda: self.speed, self.frame, 1 / Constants.FRAME_RATE)
 
         # Show instructions and then play
         self.start()
 
     def start(self):
-        """Starts both the drop loop and tk event loop and creates the first piece."""
-
-        self.current = next(self.piece_buffer)
-
+        """Starts both the game loop and tk event loop."""
+        self.app.update_lbl(self.score, self.lines_complete, self.speed)
+        self.app.update_hold(self.held)
+        self.update_next()
         self.update_cvs()
 
-        # print('DEBUG: self.drop_timer.start not passed [Game.start]')
+        # print('DEBUG: self.loop.start not passed [Game.start]')
         # self.app.start(lambda: None)
-        self.app.start(self.drop_timer.start)
+        self.app.start(self.loop.start)
 
     def stop(self, event=None):
         """Stops the game and the tk interface."""
-        self.drop_timer.stop()
+        self.loop.stop()
 
     def lose(self, event=None):
         """Called once the user has lost the game. Asks the user to play again. If not calls stop to end everything."""
-        self.drop_timer.stop()
+        super().lose()
+        self.loop.stop()
+        self.save_replay()
 
         if self.app.play_again(self.score, self.lines_complete, self.speed):
-            self.__init__(self.app)
+            self.__init__(self.app, randomizer=self.piece_buffer.mode, record_dir=self.record_dir, frame_sink=self.frame_sink, spectators=self.spectators, state_file=self.state_file,
+                          width=self.board.width, height=self.board.height - self.hidden, hidden=self.hidden)
         else:
+            if self.frame_sink is not None:
+                self.frame_sink.close()
+            if self.spectators is not None:
+                self.spectators.close()
             self.app.root.destroy()
 
+    def rescale(self):
+        """Called by app when its block size changed. Makes a new renderer at that size and draws the gamefield again."""
+        self.renderer = self.app.make_renderer(self.board, self.hidden)
+        self.update_cvs()
+
+    def save_replay(self):
+        """Saves the replay of this game in record_dir, named after its seed. Does nothing if the game is not being recorded."""
+        global os
+
+        if self.replay is None:
+            return
+
+        os.makedirs(self.record_dir, exist_ok=True)
+        self.replay.save(os.path.join(self.record_dir, f'{self.replay.seed}.ttr'))
+
+    def save_game(self):
+        """Saves the game in progress to state_file. Does nothing if there is none."""
+        if self.state_file is None:
+            return
+
+        self.save_state().save(self.state_file)
+
+    def load_game(self):
+        """Resumes the game saved in state_file. Does nothing if there is none or nothing was saved yet."""
+        global os
+        global Save_State
+
+        if self.state_file is None or not os.path.exists(self.state_file):
+            return
+
+        self.load_state(Save_State.load(self.state_file))
+
+    def load_state(self, state):
+        """Overrides Engine.load_state to show the loaded game."""
+        super().load_state(state)
+
+        self.renderer = self.app.make_renderer(self.board, self.hidden)
+        if self.frame_sink is not None:
+            self.frame_sink.attach(self.board, self.hidden)
+
+        self.app.update_lbl(self.score, self.lines_complete, self.speed)
+        self.app.update_hold(self.held)
+        self.update_next()
+        self.update_cvs()
+
+    def spawn(self):
+        """Overrides Engine.spawn to also update the next canvas, since the Piece Buffer moved."""
+        super().spawn()
+
+        # The first piece is spawned by Engine.__init__, before there is anything to update
+        if hasattr(self, 'renderer'):
+            self.update_next()
+
 
     def hold(self, event=None):
-        """Swap out the Piece in the current and hold variables. Event binding for hold button.
+        """Overrides Engine.hold to update the hold canvas and redraw the gamefield. Event binding for hold button."""
+        if not super().hold():
+            return False
+
+        self.app.update_hold(self.held)
+        self.request_redraw()
+        return True
+
+    def down(self, event=None):
+        """Overrides Engine.down to redraw the gamefield. Event binding for down button."""
+        result = super().down()
+        self.request_redraw()
+        return result
+
+    def hard_drop(self, event=None):
+        """Overrides Engine.hard_drop to redraw the gamefield. Event binding for hard drop button."""
+        result = super().hard_drop()
+        self.request_redraw()
+        return result
+
+    def right(self, event=None):
+        """Overrides Engine.right to redraw the gamefield. Event binding for right button."""
+        result = super().right()
+        self.request_redraw()
+        return result
+
+    def left(self, event=None):
+        """Overrides Engine.left to redraw the gamefield. Event binding for left button."""
+        result = super().left()
+        self.request_redraw()
+        return result
+
+    def rotate_cw(self, event=None):
+        """Overrides Engine.rotate_cw to redraw the gamefield. Event binding for rotate clockwise button."""
+        result = super().rotate_cw()
+        self.request_redraw()
+        return result
+
+    def rotate_ccw(self, event=None):
+        """Overrides Engine.rotate_ccw to redraw the gamefield. Event binding for rotate counter-clockwise button."""
+        result = super().rotate_ccw()
+        self.request_redraw()
+        return result
+
+
+    def make_permanent(self):
+        """Overrides Engine.make_permanent to redraw the gamefield."""
+        super().make_permanent()
+        self.request_redraw()
+
+    def add_garbage(self, lines, hole):
+        """Overrides Engine.add_garbage to redraw the gamefield."""
+        super().add_garbage(lines, hole)
+        self.request_redraw()
+
+    def score_manager(self, lines):
+        """Overrides Engine.score_manager to update the tk label.
+
+        Parameters
+        ----------
+        lines : int
+            Number of lines that have been cleared.
+        """
+        super().score_manager(lines)
+
+        # The game loop reads speed before every tick, no need to tell it
+        self.app.update_lbl(self.score, self.lines_complete, self.speed)
+
+    def queue_input(self, kind, action):
+        """Queues a key press or release to be applied on the next frame. Used by the key bindings.
+
+        Parameters
+        ----------
+        kind : str
+            'press' or 'release'.
+        action : str
+            One of ACTIONS, 'lose' to give up, or 'save' or 'load' for the game in state_file.
+        """
+        self.input_queue.append((kind, action))
 
-        If hold is None (first held piece), save current Piece to it and replace current with the next Piece. Change the piece position to the top. Update hold canvas and
+    def process_input(self):
+        """Applies every queued key press and release.
+
+        Key repeat from the OS is ignored (the engine repeats held keys itself, see Engine.update_input). Depending on the platform it shows up as extra presses of a key that is already down, or as a release immediately followed by a press, which are both skipped.
         """
-        global PIL
+        queue = self.input_queue
+        # A step can end the game and start a new one with a new queue (Game.lose)
+        while queue and queue is self.input_queue:
+            kind, action = queue.popleft()
+
+            if kind == 'release':
+                if queue and queue[0] == ('press', action):
+                    # OS key repeat, the key never actually went up
+                    queue.popleft()
+                    continue
+                self._pressed.discard(action)
+                if action in self.ACTIONS:
+                    self.release(action)
+
+            elif action not in self._pressed:
+                self._pressed.add(action)
+                if action == 'lose':
+                    self.lose()
+                elif action == 'save':
+                    self.save_game()
+                elif action == 'load':
+                    self.load_game()
+                else:
+                    self.press(action)
+
+    def frame(self):
+        """Called by the game loop every frame. Applies queued input and held keys, then draws the gamefield if it changed."""
+        global monotonic
+
+        now = monotonic()
+        elapsed = now - self._last_frame
+        self._last_frame = now
+
+        self.process_input()
+        self.update_input(elapsed)
+
+        self.draw_frame()
+
+        # Input can end the game, which stops the loop
+        if self.frame_sink is not None and self.loop.is_running:
+            self.frame_sink.write(self.current, self.current_coord)
+        if self.spectators is not None and self.loop.is_running:
+            self.spectators.publish(self)
+
+    def request_redraw(self):
+        """Marks the gamefield as changed, so it is drawn on the next frame."""
+        self._redraw = True
+
+    def draw_frame(self):
+        """Draws the gamefield if it changed since it was last drawn."""
+        if self._redraw:
+            self._redraw = False
+            self.update_cvs()
+
+    def update_cvs(self):
+        """Update the image of the gamefield in the tk application right away."""
+        box = self.renderer.draw(self.current, self.current_coord)
+        if box:
+            self.app.update_game(self.renderer.image, box)
+
+    def update_next(self):
+        """Update the pieces in the next canvas on the tk application."""
+        self.app.update_next(self.piece_buffer.pieces)
+
+
+class Game_Loop:
+    """Runs the game on the tk main thread with root.after, timed by time.monotonic. Replaces the old timer thread, so tkinter and the game are only ever touched from one thread.
+
+    Logic ticks (gravity) use a fixed timestep. Each tick is scheduled from when the previous one was due rather than from when it finished, so the timing never drifts. If ticks were missed because the thread was busy, they are caught up (at most max_catch_up at once, after that the schedule starts over from now). Rendering is paced separately, at most once per frame_interval.
+
+    Instance Variables
+    ------------------
+    frame_interval : float
+        Seconds between frames.
+    interval : callable
+        Returns the seconds between ticks. Called before every tick, so speed changes take effect right away.
+    is_running : bool
+        True while the loop is running.
+    max_catch_up : int
+        Most ticks to run at once when catching up.
+    render : callable
+        Called once per frame.
+    root : tk.Tk
+        The tk application to schedule on.
+    tick : callable
+        Called once per tick.
+    _after_id : str
+        Id of the scheduled call to _run, for cancelling.
+    _next_frame : float
+        time.monotonic time the next frame is due.
+    _next_tick : float
+        time.monotonic time the next tick is due.
+    """
+
+    def __init__(self, root, tick, interval, render, frame_interval=1/60, max_catch_up=5):
+        """Sets up the loop. Nothing runs until start is called.
+
+        Parameters
+        ----------
+        root : tk.Tk
+            The tk application to schedule on.
+        tick : callable
+            Called once per tick.
+        interval : callable
+            Returns the seconds between ticks.
+        render : callable
+            Called once per frame.
+        frame_interval : float (default = 1/60)
+            Seconds between frames.
+        max_catch_up : int (default = 5)
+            Most ticks to run at once when catching up.
+        """
+        self.root = root
+        self.tick = tick
+        self.interval = interval
+        self.render = render
+        self.frame_interval = frame_interval
+        self.max_catch_up = max_catch_up
+
+        self.is_running = False
+        self._after_id = None
+        self._next_tick = 0
+        self._next_frame = 0
+
+    def start(self):
+        """Starts the loop. The first tick is one interval from now."""
+        global monotonic
+
+        if self.is_running:
+            return
+
+        now = monotonic()
+        self._next_tick = now + self.interval()
+        self._next_frame = now
+        self.is_running = True
+
+        self._run()
+
+    def stop(self):
+        """Stops the loop. Safe to call from inside tick or render."""
+        self.is_running = False
+
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _run(self):
+        """Runs every tick and frame that is due and schedules the next call."""
+        global monotonic
+
+        self._after_id = None
+        now = monotonic()
+
+        ticks = 0
+        while self.is_running and now >= self._next_tick:
+            if ticks == self.max_catch_up:
+                # Too far behind, start over instead of running a burst of ticks
+                self._next_tick = now + self.interval()
+                break
+
+            self.tick()
+            ticks += 1
+            self._next_tick += self.interval()
+
+        if self.is_running and now >= self._next_frame:
+            self.render()
+
+            self._next_frame += self.frame_interval
+            if self._next_frame <= now:
+                self._next_frame = now + self.frame_interval
+
+        # tick or render could have stopped the loop
+        if self.is_running:
+            delay = min(self._next_tick, self._next_frame) - monotonic()
+            self._after_id = self.root.after(max(0, round(delay * 1000)), self._run)
+
+
+class Replay:
+    """A recorded game: the seed and randomizer of the piece sequence plus every action and gravity tick, each with the time it happened. Since the engine is deterministic given its pieces, that is enough to play the whole game again.
+
+    Events are kept encoded, one varint per event holding the milliseconds since the previous event and the event code, so even long games only take a couple of bytes per event.
+
+    File format: MAGIC, then one byte each for VERSION, the index of the compression in COMPRESSIONS and the index of the randomizer in Engine.Piece_Buffer.MODES, then the seed as a zigzag varint and the board width, height and hidden rows as varints. The rest of the file is the (compressed) events.
+
+    Class Variables
+    ---------------
+    COMPRESSIONS : str tuple
+        The ways the events can be compressed in a file.
+    EVENTS : str tuple
+        Every event that can be recorded, Engine.ACTIONS and 'tick'. The index is the event code.
+    MAGIC : bytes
+        The first bytes of every replay file.
+    VERSION : int
+        Version of the file format.
+
+    Instance Variables
+    ------------------
+    data : bytearray
+        The encoded events.
+    dimensions : int tuple
+        Width, height and hidden rows of the board, as passed to Engine.
+    randomizer : str
+        One of Engine.Piece_Buffer.MODES.
+    seed : int
+        Seed of the piece sequence.
+    _clock : callable
+        Returns the current time in seconds.
+    _last : int
+        Time of the last recorded event, in milliseconds since recording started.
+    _start : float
+        _clock time recording started.
+    """
+    COMPRESSIONS = ('none', 'zlib', 'lzma')
+    EVENTS = Engine.ACTIONS + ('tick',)
+    MAGIC = b'TTRP'
+    VERSION = 1
+
+    # Event codes take the low bits of each varint, the time delta the rest
+    _CODE_BITS = (len(EVENTS) - 1).bit_length()
+
+    def __init__(self, seed, randomizer='uniform', data=b'', clock=None, dimensions=None):
+        """Starts a recording, or wraps already encoded events.
+
+        Parameters
+        ----------
+        seed : int
+            Seed of the piece sequence.
+        randomizer : str (default = 'uniform')
+            One of Engine.Piece_Buffer.MODES.
+        data : bytes-like (default = b'')
+            Encoded events to start with.
+        clock : callable (default = None)
+            Returns the current time in seconds. If None, time.monotonic is used.
+        dimensions : int tuple (default = None)
+            Width, height and hidden rows of the board. If None, the Constants defaults.
+        """
+        global monotonic
         global Constants
-        global Palette
-        global render
 
-        # If this is the first held piece
-        if self.held is None:
-            self.held = self.current
-            self.current = next(self.piece_buffer)
-        # Prevent user from holding again before next piece
-        elif self._already_held:
-            return None
-        else:
-            new_hold = self.current
-            self.current = self.held
-            self.held = new_hold
+        if dimensions is None:
+            dimensions = (Constants.BOARD_WIDTH, Constants.BOARD_HEIGHT, Constants.HIDDEN_ROWS)
+
+        self.seed = seed
+        self.randomizer = randomizer
+        self.dimensions = tuple(dimensions)
+        self.data = bytearray(data)
+
+        self._clock = monotonic if clock is None else clock
+        self._start = self._clock()
+        self._last = 0
+
+    def record(self, event):
+        """Appends an event, timestamped with the current time.
+
+        Parameters
+        ----------
+        event : str
+            One of EVENTS.
+        """
+        now = round((self._clock() - self._start) * 1000)
+        delta = max(0, now - self._last)
+        self._last += delta
+
+        self._write_varint(self.data, (delta << self._CODE_BITS) | self.EVENTS.index(event))
 
-        self._already_held = True
-        self.current_coord = [0, 3]
+    def __iter__(self):
+        """Decodes the events in order, as (milliseconds since recording started, event) tuples."""
+        mask = (1 << self._CODE_BITS) - 1
+        time = 0
+        value = shift = 0
 
-        # Update hold canvas
-        size = 4 * Constants.BLOCK_SIZE
-        im = PIL.Image.new('RGB', (size, size), Palette.BLANK)
+        for byte in self.data:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                time += value >> self._CODE_BITS
+                yield time, self.EVENTS[value & mask]
+                value = shift = 0
 
-        blank_row = render([[None for x in range(4)]])
-        box = (0, 0, size, Constants.BLOCK_SIZE)
-        im.paste(blank_row.copy(), box)
+    def play(self, stride=0, on_frame=None):
+        """Runs the recorded game on a new headless Engine as fast as possible.
 
-        box = (0, Constants.BLOCK_SIZE, size, size - Constants.BLOCK_SIZE)
-        im.paste(self.held.profile, box)
+        Parameters
+        ----------
+        stride : int (default = 0)
+            If not 0, on_frame is called every stride frames of recorded time (at Constants.FRAME_RATE), with every event up to that frame applied, and once more at the end.
+        on_frame : callable (default = None)
+            Called as on_frame(engine, milliseconds) for each frame.
 
-        box = (0, size - Constants.BLOCK_SIZE, size, size)
-        im.paste(blank_row.copy(), box)
+        Returns
+        -------
+        Engine
+            The engine in the state the recording ended in.
+        """
+        global Engine
+        global Constants
 
-        self.app.update_hold(im)
-        self.update_cvs()
+        width, height, hidden = self.dimensions
+        engine = Engine(self.seed, self.randomizer, width=width, height=height, hidden=hidden)
+        frame_ms = stride * 1000 / Constants.FRAME_RATE
+        next_frame = frame_ms
+        time = 0
 
-    def down(self, event=None):
-        """Moves the piece down if allowed by check_move, otherwise, make_permanent."""
-        new_coord = [self.current_coord[0] + 1, self.current_coord[1]]
-        all_clear = self.check_move(self.current, new_coord)
+        for time, event in self:
+            while stride and time >= next_frame:
+                on_frame(engine, next_frame)
+                next_frame += frame_ms
 
-        if all_clear:
-            self.current_coord = new_coord
-        else:
-            self.make_permanent()
+            if event == 'tick':
+                engine.tick()
+            else:
+                engine.step(event)
 
-        self.update_cvs()
+        if stride:
+            on_frame(engine, time)
 
-    def hard_drop(self, event=None):
-        """Drops the piece as far as possible and places it there (using make_permanent)."""
-        new_coord = self.current_coord
-        all_clear = True
-        while all_clear:
-            new_coord[0] += 1
-            all_clear = self.check_move(self.current, new_coord)
-            # If that drop was not allowed, loop will be dropped
-
-        # Undo that last drop (it was not allowed)
-        new_coord[0] -= 1
-        self.current_coord = new_coord
+        return engine
 
-        self.make_permanent()
+    def dumps(self, compression='zlib'):
+        """Encodes the replay in the file format.
 
-        self.update_cvs()
+        Parameters
+        ----------
+        compression : str (default = 'zlib')
+            One of COMPRESSIONS.
 
-    def right(self, event=None):
-        """Moves the piece right if allowed by check_move, otherwise, make_permanent."""
-        new_coord = [self.current_coord[0], self.current_coord[1] + 1]
-        all_clear = self.check_move(self.current, new_coord)
+        Returns
+        -------
+        bytes
+            The contents of a replay file.
+        """
+        global Engine
+        global zlib, lzma
+
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f'compression must be one of {self.COMPRESSIONS}, not {compression!r}.')
+
+        out = bytearray(self.MAGIC)
+        out += bytes((self.VERSION, self.COMPRESSIONS.index(compression), Engine.Piece_Buffer.MODES.index(self.randomizer)))
+        self._write_varint(out, self.seed << 1 if self.seed >= 0 else (~self.seed << 1) | 1)
+        for value in self.dimensions:
+            self._write_varint(out, value)
+
+        if compression == 'zlib':
+            out += zlib.compress(self.data, 9)
+        elif compression == 'lzma':
+            out += lzma.compress(self.data)
+        else:
+            out += self.data
 
-        if all_clear:
-            self.current_coord = new_coord
+        return bytes(out)
 
-        self.update_cvs()
+    @classmethod
+    def loads(cls, data):
+        """Decodes a replay from the contents of a replay file.
 
-    def left(self, event=None):
-        """Moves the piece left if allowed by check_move, otherwise, make_permanent."""
-        new_coord = [self.current_coord[0], self.current_coord[1] - 1]
-        all_clear = self.check_move(self.current, new_coord)
+        Parameters
+        ----------
+        data : bytes-like
+            The contents of a replay file.
 
-        if all_clear:
-            self.current_coord = new_coord
+        Returns
+        -------
+        Replay
+            The decoded replay.
+        """
+        global Engine
+        global zlib, lzma
+
+        data = memoryview(data)
+        if data[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError('Not a replay file.')
+
+        i = len(cls.MAGIC)
+        version, compression, randomizer = data[i:i + 3]
+        if version != cls.VERSION:
+            raise ValueError(f'Unsupported replay version {version}.')
+
+        seed, i = cls._read_varint(data, i + 3)
+        seed = ~(seed >> 1) if seed & 1 else seed >> 1
+
+        dimensions = []
+        for j in range(3):
+            value, i = cls._read_varint(data, i)
+            dimensions.append(value)
+
+        compression = cls.COMPRESSIONS[compression]
+        if compression == 'zlib':
+            events = zlib.decompress(data[i:])
+        elif compression == 'lzma':
+            events = lzma.decompress(data[i:])
+        else:
+            events = data[i:]
 
-        self.update_cvs()
+        return cls(seed, Engine.Piece_Buffer.MODES[randomizer], events, dimensions=dimensions)
 
-    def rotate_cw(self, event=None):
-        """Rotates the piece clockwise if allowed by check_move, otherwise, make_permanent."""
-        new_orient = self.current.rotate_cw()
-        all_clear = self.check_move(new_orient, self.current_coord)
+    def save(self, path, compression='zlib'):
+        """Writes the replay to a file. See dumps."""
+        with open(path, 'wb') as file:
+            file.write(self.dumps(compression))
 
-        if all_clear:
-            self.current = new_orient
+    @classmethod
+    def load(cls, path):
+        """Reads a replay from a file. See loads."""
+        with open(path, 'rb') as file:
+            return cls.loads(file.read())
 
-        self.update_cvs()
+    @staticmethod
+    def _write_varint(out, value):
+        """Appends a non-negative int to a bytearray, 7 bits per byte, least significant first."""
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
 
-    def rotate_ccw(self, event=None):
-        """Rotates the piece counter-clockwise if allowed by check_move, otherwise, make_permanent."""
-        new_orient = self.current.rotate_ccw()
-        all_clear = self.check_move(new_orient, self.current_coord)
+    @staticmethod
+    def _read_varint(data, i):
+        """Reads a varint written by _write_varint starting at index i. Returns the value and the index after it."""
+        value = shift = 0
+        while True:
+            byte = data[i]
+            i += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                return value, i
 
-        if all_clear:
-            self.current = new_orient
 
-        self.update_cvs()
+class Save_State:
+    """A snapshot of everything needed to resume an Engine: the gamefield, the current and held pieces, the piece sequence (random number generator included), score and speed.
 
+    Snapshots are kept encoded in one bytes-like object and never decoded as a whole. The fixed fields are read straight from it with struct when asked for and cells are 4 bits each, so a snapshot is small (about 2.7 KB for a 10x23 board, most of it the random number generator's state) and loading one is only slicing a buffer. Many snapshots can be written to and read from one file back to back (save_many and load_many); reading maps the file into memory, so nothing is copied until a snapshot is restored.
 
-    def check_move(self, new_piece, new_coord):
-            """Checks to see if the new position will conflict with the current gamefield. If so return True.
+    Format: HEADER (MAGIC, VERSION, board width and height (hidden rows included), hidden rows, randomizer index in Engine.Piece_Buffer.MODES, FLAGS, the current piece's index in PIECES and rotation, the held piece's index (NO_PIECE for none) and rotation, the piece buffer's size, how many pieces it has queued and left in its bag, the current piece's y and x, lines left until the speed changes, score, lines, speed and seed (a signed 64 bit int)), then RNG (the Mersenne Twister state of the piece buffer), then the cells, two per byte (low bits first, row by row, as indexes in COLORS), then the index in PIECES of every queued and every bagged piece.
 
-            Checks for when the block of a piece has the same coord as an existing block in the gamefield. Also checks for if a block of the piece would be outside the bounds of the gamefield.
+    Class Variables
+    ---------------
+    COLORS : tuple
+        Every color a cell can have. The index is what is saved.
+    FIELDS : namedtuple class
+        The fields of HEADER by name.
+    FLAGS : dict
+        Bit of every bool in the flags byte.
+    HEADER : struct.Struct
+        The fixed size start of every snapshot.
+    MAGIC : bytes
+        The first bytes of every snapshot.
+    NO_PIECE : int
+        Piece index saved when nothing is held.
+    RNG : struct.Struct
+        The state of the random number generator.
+    VERSION : int
+        Version of the format.
 
-            Parameters
-            ----------
-            new_piece : Piece-like
-                The Piece being tested at position new_coord.
-            new_coord : int list
-                The new y, x coordinate of the bottom left corner of new_piece's orientation grid.
+    Instance Variables
+    ------------------
+    data : memoryview
+        The encoded snapshot.
+    """
+    COLORS = (None,) + Palette.BLOCKS + (Palette.GARBAGE,)
+    FIELDS = namedtuple('Fields', (
+        'magic', 'version', 'width', 'height', 'hidden', 'randomizer', 'flags', 'current', 'rotation', 'held', 'held_rotation',
+        'buffer_size', 'queued', 'bagged', 'y', 'x', 'lines_step_counter', 'score', 'lines', 'speed', 'seed',
+    ))
+    FLAGS = {'already_held': 1, 'game_over': 2}
+    HEADER = struct.Struct('<4sBHHBBBBBBBHIBhhiQIdq')
+    MAGIC = b'TTSS'
+    NO_PIECE = 255
+    RNG = struct.Struct('<625I')
+    VERSION = 1
+
+    _COLOR_INDEX = {color: i for i, color in enumerate(COLORS)}
+    def __init__(self, data):
+        """Wraps an encoded snapshot without copying or decoding it.
 
-            Returns
-            -------
-            bool
-                False if the new position would hit a pre-existing block, otherwise True.
-            """
-            for relative_y, row in enumerate(new_piece.get_blocks()):
-                y = relative_y + new_coord[0]
-                for relative_x, block in enumerate(row):
-                    # If the piece has a block in this part of its orientation grid. If not, no point of checking (empty space).
-                    if block:
-                        x = relative_x + new_coord[1]
-                        if x < 0:
-                            # Block is outside the left wall. Must check because python will interpret [-1] differently
-                            return False
-
-                        try:
-                            # If this block is outside the bounds of the gamefield, IndexError is raised.
-                            if self.gamefield[y][x] is not None:
-                                # There's a block on the gamefield here, this is a conflict.
-                                return False
-                        except IndexError:
-                            # Block is outside the gamefield, this is a conflict.
-                            return False
-
-            # No conflict detected, movement is ok
-            return True
+        Parameters
+        ----------
+        data : bytes-like
+            The encoded snapshot, like what from_engine gives. Anything after the snapshot is ignored.
+        """
+        data = memoryview(data)
+        if data[:len(self.MAGIC)] != self.MAGIC:
+            raise ValueError('Not a save state.')
+        if data[len(self.MAGIC)] != self.VERSION:
+            raise ValueError(f'Unsupported save state version {data[len(self.MAGIC)]}.')
+
+        self.data = data
+        # Anything after the snapshot (like the next one in a file of many) is not part of it
+        self.data = data[:self.size]
+
+    def _header(self):
+        """Returns the fields of HEADER as a FIELDS."""
+        return self.FIELDS._make(self.HEADER.unpack_from(self.data))
+
+    @property
+    def size(self):
+        """Number of bytes the snapshot takes."""
+        header = self._header()
+        return self.HEADER.size + self.RNG.size + (header.width * header.height + 1) // 2 + header.queued + header.bagged
+
+    @property
+    def score(self):
+        """Score of the saved game."""
+        return self._header().score
+
+    @property
+    def lines_complete(self):
+        """Lines completed in the saved game."""
+        return self._header().lines
+
+    @property
+    def game_over(self):
+        """True if the saved game was lost."""
+        return bool(self._header().flags & self.FLAGS['game_over'])
+
+    @classmethod
+    def from_engine(cls, engine):
+        """Takes a snapshot of engine.
 
-    def make_permanent(self):
-        """Permanently places the current piece at it's current position, checks for lines completed, and gets next piece.
+        Parameters
+        ----------
+        engine : Engine
+            The game to save.
 
-        Goes through the current piece's blocks and sets their corresponding place in the gamefield to the piece's color. Then the current piece is the next piece in the Piece Buffer and the current coordinate is reset. Then checks for and clears lines completed using check_lines and finally updates the canvas.
+        Returns
+        -------
+        Save_State
+            The snapshot.
         """
-        for relative_y, row in enumerate(self.current.get_blocks()):
-            y = relative_y + self.current_coord[0]
-            for relative_x, block in enumerate(row):
-                if block:
-                    x = self.current_coord[1] + relative_x
-                    # Place block
-                    self.gamefield[y][x] = self.current.color
+        global Engine
+        global PIECES
 
-        self.current = next(self.piece_buffer)
-        self.current_coord = [0, 3]
-        # Allow hold button again
-        self._already_held = False
+        board = engine.board
+        buffer = engine.piece_buffer
+        kinds = {p: i for i, p in enumerate(PIECES)}
 
-        self.check_lines()
+        if not -(1 << 63) <= buffer.seed < 1 << 63:
+            raise ValueError('Only seeds that fit in a signed 64 bit int can be saved.')
 
-        self.update_cvs()
+        flags = 0
+        if engine._already_held:
+            flags |= cls.FLAGS['already_held']
+        if engine.game_over:
+            flags |= cls.FLAGS['game_over']
 
-    def check_lines(self):
-        """Finds completed lines, clears them, moves everything down accordingly, and updates the score.
+        if engine.held is None:
+            held, held_rotation = cls.NO_PIECE, 0
+        else:
+            held, held_rotation = kinds[type(engine.held)], engine.held.rotation
 
-        Checks each line of the gamefield from the bottom up. If any lines were completed, they are deleted and a new empty line is added to the top of the gamefield, shuffling everything down. Updates score and speed accordingly.
-        """
-        # lines is a log of the index of completed lines
-        lines = []
-        for y, row in enumerate(self.gamefield):
-            for block in row:
-                if not block:
-                    # There is a gap, stop checking this row, move on
-                    break
-            else:
-                # No gap detected, this is a complete line
-                lines.append(y)
+        out = bytearray(cls.HEADER.pack(
+            cls.MAGIC, cls.VERSION, board.width, board.height, engine.hidden, Engine.Piece_Buffer.MODES.index(buffer.mode), flags,
+            kinds[type(engine.current)], engine.current.rotation, held, held_rotation,
+            buffer.size, len(buffer._queue), len(buffer._bag),
+            engine.current_coord[0], engine.current_coord[1], engine._lines_step_counter,
+            engine.score, engine.lines_complete, engine.speed, buffer.seed,
+        ))
 
-        if len(lines):
-            for line in lines:
-                del self.gamefield[line]
-                self.gamefield.insert(0, [None for x in range(10)])
+        version, state, gauss = buffer.rng.getstate()
+        out += cls.RNG.pack(*state)
 
-            self.score_manager(len(lines))
+        cells = [cls._COLOR_INDEX[color] for row in board.colors for color in row]
+        if len(cells) % 2:
+            cells.append(0)
+        out += bytes(cells[i] | cells[i + 1] << 4 for i in range(0, len(cells), 2))
 
-        # Check for loss after completing and clearing any lines
-        for block in self.gamefield[2]:
-            if block:
-                self.lose()
+        out += bytes(kinds[type(piece)] for piece in buffer._queue)
+        out += bytes(kinds[p] for p in buffer._bag)
 
-    def score_manager(self, lines):
-        """Manages the changes and additions to the user's score including updating the tk label and changing the speed.
+        return cls(out)
+
+    def restore(self, engine=None):
+        """Puts an engine in the saved state. Its replay (if it is recording) is stopped, since the recording could not be played back from a different state.
 
         Parameters
         ----------
-        lines : int
-            Number of lines that have been cleared.
-        """
-        self.score += 100 * lines
-        self.lines_complete += lines
-        if lines == 4:
-            self.score += 100
-
-        self._lines_step_counter -= lines
-        if self._lines_step_counter <= 0:
-            global Constants
-
-            # Allow excess lines to overflow to next counter
-            self._lines_step_counter += Constants.LINES_SPEED_STEP
-            self.speed *= Constants.SPEED_STEP
-            self.drop_timer.interval = self.speed
+        engine : Engine (default = None)
+            The engine to restore into. If None, a new Engine is made.
 
-        self.app.update_lbl(self.score, self.lines_complete, self.speed)
+        Returns
+        -------
+        Engine
+            The restored engine.
+        """
+        global Engine, Board
+        global PIECES
+        global deque
+
+        data = self.data
+        (magic, version, width, height, hidden, randomizer, flags, current, rotation, held, held_rotation,
+            buffer_size, queued, bagged, y, x, lines_step_counter, score, lines, speed, seed) = self._header()
+        mode = Engine.Piece_Buffer.MODES[randomizer]
+
+        if engine is None:
+            engine = Engine(seed, mode, width=width, height=height - hidden, hidden=hidden)
+
+        i = self.HEADER.size
+        state = self.RNG.unpack_from(data, i)
+        i += self.RNG.size
+
+        cells = []
+        for byte in data[i:i + (width * height + 1) // 2]:
+            cells.append(self.COLORS[byte & 0xF])
+            cells.append(self.COLORS[byte >> 4])
+        i += (width * height + 1) // 2
+
+        buffer = engine.piece_buffer
+        buffer.seed = seed
+        buffer.mode = mode
+        buffer.size = buffer_size
+        buffer.rng.setstate((3, state, None))
+        buffer._queue = deque(PIECES[kind]() for kind in data[i:i + queued])
+        buffer._bag = [PIECES[kind] for kind in data[i + queued:i + queued + bagged]]
+
+        engine.board = Board.from_colors([cells[row * width:(row + 1) * width] for row in range(height)])
+        engine.hidden = hidden
+        engine.current = PIECES[current](rotation)
+        engine.current_coord = [y, x]
+        engine.held = None if held == self.NO_PIECE else PIECES[held](held_rotation)
+        engine._already_held = bool(flags & self.FLAGS['already_held'])
+        engine.game_over = bool(flags & self.FLAGS['game_over'])
+        engine.score = score
+        engine.lines_complete = lines
+        engine.speed = speed
+        engine._lines_step_counter = lines_step_counter
+        engine._auto_shift = dict()
+        engine.replay = None
+
+        return engine
+
+    def save(self, path):
+        """Writes the snapshot to a file."""
+        with open(path, 'wb') as file:
+            file.write(self.data)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a snapshot from a file."""
+        with open(path, 'rb') as file:
+            return cls(file.read())
+
+    @staticmethod
+    def save_many(path, states):
+        """Writes many snapshots to one file, back to back.
 
-    def update_cvs(self):
-        """Update the image of the gamefield in the tk application."""
-        global render
+        Parameters
+        ----------
+        path : str
+            The file.
+        states : iterable
+            The Save_States.
+        """
+        with open(path, 'wb') as file:
+            for state in states:
+                file.write(state.data)
 
-        im = render(self.gamefield[3:], self.current, self.current_coord)
-        self.app.update_game(im)
+    @classmethod
+    def load_many(cls, path):
+        """Reads every snapshot of a file written by save_many. The file is mapped into memory and every snapshot is a view of it, so nothing is read until it is used.
 
-    class Piece_Buffer:
-        """Iterator object that generates tetris pieces. Always keeps 5 pieces.
+        Parameters
+        ----------
+        path : str
+            The file.
 
-        Instance Variables
-        ------------------
-        pieces
-            A 5 element list describing the coming squence of pieces.
+        Returns
+        -------
+        list
+            The Save_States, in order.
         """
+        global mmap
+        global os
 
-        def __init__(self, app):
-            """Initialize the pieces list and generate the initial pieces.
+        with open(path, 'rb') as file:
+            if not os.fstat(file.fileno()).st_size:
+                return []
+            data = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
 
-            Parameters
-            ----------
-            app : App
-                The app instance being used in the game instance. Needed for update_cvs to update the next canvas in the tk app.
-            """
-            self.pieces = []
-            self.app = app
+        states = []
+        i = 0
+        while i < len(data):
+            states.append(cls(data[i:]))
+            i += len(states[-1].data)
+        return states
 
-            for i in range(5):
-                self.gen_new_piece()
 
-            self.update_cvs()
+class Histogram:
+    """Durations of calls to one function, counted in power of two buckets of nanoseconds. Recording is a few integer operations, so it can sit on hot paths.
 
-        def gen_new_piece(self):
-            """Creates a random tetris piece and appends it to the pieces list.
+    Instance Variables
+    ------------------
+    buckets : int list
+        buckets[i] is the number of calls that took less than 2**i but at least 2**(i-1) nanoseconds.
+    count : int
+        Number of calls.
+    last : int
+        Nanoseconds the latest call took.
+    max : int
+        Nanoseconds the slowest call took.
+    total : int
+        Nanoseconds all calls took together.
+    """
+    __slots__ = ('buckets', 'count', 'last', 'max', 'total')
+
+    def __init__(self):
+        """Creates an empty histogram."""
+        self.buckets = [0 for i in range(64)]
+        self.count = 0
+        self.last = 0
+        self.max = 0
+        self.total = 0
+
+    def record(self, ns):
+        """Adds a call that took ns nanoseconds."""
+        self.buckets[ns.bit_length()] += 1
+        self.count += 1
+        self.last = ns
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, p):
+        """Returns an upper bound in nanoseconds of the p-th percentile (0 to 100) of the calls, 0 if there are none."""
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(1 << i, self.max)
+        return 0
+
+    def to_dict(self):
+        """Returns the histogram as a dict for JSON, with times in microseconds."""
+        return {
+            'count': self.count,
+            'total_ms': self.total / 1e6,
+            'mean_us': self.total / self.count / 1e3 if self.count else 0,
+            'max_us': self.max / 1e3,
+            'p50_us': self.percentile(50) / 1e3,
+            'p99_us': self.percentile(99) / 1e3,
+            # Upper bound of each bucket (in microseconds) and its count, empty buckets are left out
+            'buckets': {f'{(1 << i) / 1e3:g}': n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Profiler:
+    """Times the hot paths of the game into a Histogram each. While it is not enabled, nothing about the game is changed, so it costs nothing.
+
+    enable replaces every function in TARGETS with a wrapper that times it (monkeypatching the module or class it is found in), and disable puts the originals back.
 
-            Uses the global tuple PIECES which contains all tetris piece classes.
-            """
-            global choice
-            global PIECES
+    Class Variables
+    ---------------
+    TARGETS : str tuple
+        Dotted names, in this module, of the functions to time.
 
-            self.pieces.append(choice(PIECES)())
+    Instance Variables
+    ------------------
+    enabled : bool
+        True while TARGETS are wrapped.
+    stats : dict
+        The Histogram of every target, keyed by name.
+    _originals : list
+        (owner, attribute, original, owned) tuple for every wrapped function, owned being False if the attribute was inherited.
+    _overlay : tk.Label
+        Label showing the latest timings over the gamefield. None if not shown.
+    """
+    TARGETS = (
+        'render',
+        'Field_Renderer.draw',
+        'App.update_game',
+        'Engine.check_move',
+        'Engine.check_lines',
+        'Engine.make_permanent',
+        'Engine.tick',
+        'Game.update_cvs',
+        'Game.frame',
+    )
+
+    def __init__(self):
+        """Creates an empty, disabled profiler."""
+        self.enabled = False
+        self.stats = {name: Histogram() for name in self.TARGETS}
+        self._originals = []
+        self._overlay = None
+
+    def enable(self):
+        """Starts timing every target."""
+        global perf_counter_ns
+
+        if self.enabled:
+            return
+        self.enabled = True
+
+        for name in self.TARGETS:
+            *path, attribute = name.split('.')
+            owner = sys.modules[__name__]
+            for part in path:
+                owner = getattr(owner, part)
+
+            original = getattr(owner, attribute)
+            owned = not isinstance(owner, type) or attribute in vars(owner)
+            self._originals.append((owner, attribute, original, owned))
+            setattr(owner, attribute, self._timed(original, self.stats[name].record))
+
+    def disable(self):
+        """Puts every original function back."""
+        for owner, attribute, original, owned in reversed(self._originals):
+            if owned:
+                setattr(owner, attribute, original)
+            else:
+                delattr(owner, attribute)
 
-        def __iter__(self):
-            """Makes Piece_Buffer an iterator object."""
-            return self
+        self._originals = []
+        self.enabled = False
 
-        def __next__(self):
-            """Pop and return the first piece, append a new piece."""
-            piece = self.pieces.pop(0)
-            self.gen_new_piece()
+    @staticmethod
+    def _timed(func, record):
+        """Returns a wrapper of func that passes how long every call took to record."""
+        global perf_counter_ns
+        global wraps
 
-            self.update_cvs()
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(perf_counter_ns() - start)
 
-            return piece
+        return timed
 
-        def update_cvs(self):
-            """Update the image in the next canvas on the tk application."""
-            global PIL
-            global Constants
-            global Palette
+    def summary(self, top=3):
+        """Returns a short text of the latest frame time and the targets that took the most time in total.
 
-            sizex = 4 * Constants.BLOCK_SIZE
-            # 14 is 2 lines for each Piece with a gap between each
-            sizey = 14 * Constants.BLOCK_SIZE
+        Parameters
+        ----------
+        top : int (default = 3)
+            Number of targets to list.
+        """
+        frame = self.stats['Game.frame']
+        lines = [f'frame {frame.last / 1e6:.2f} ms (p99 {frame.percentile(99) / 1e6:.2f}, max {frame.max / 1e6:.2f})']
 
-            im = PIL.Image.new('RGB', (sizex, sizey), Palette.BLANK)
+        # Game.frame contains everything else, leave it out
+        costs = sorted((hist.total, name) for name, hist in self.stats.items() if name != 'Game.frame' and hist.count)
+        for total, name in reversed(costs[-top:]):
+            hist = self.stats[name]
+            lines.append(f'{name} {total / 1e6:.0f} ms ({total / hist.count / 1e3:.0f} us x {hist.count})')
 
-            # Place a blank row of grid squares between each profile
-            blank_row = render([[None for x in range(4)]])
-            y = 2
-            for i in range(4):
-                box = (0, y * Constants.BLOCK_SIZE, sizex, (y + 1) * Constants.BLOCK_SIZE)
-                im.paste(blank_row.copy(), box)
+        return '\n'.join(lines)
 
-                y += 3
+    def show_overlay(self, app, interval=0.5):
+        """Shows summary over the top left of app's gamefield, refreshed every interval seconds.
 
-            y = 0
-            for i, p in enumerate(self.pieces):
-                height = y + (2 * Constants.BLOCK_SIZE)
+        Parameters
+        ----------
+        app : App
+            The App to show the overlay in.
+        interval : float (default = 0.5)
+            Seconds between refreshes.
+        """
+        global tk
+        global Constants
 
-                box = (0, y, sizex, height)
-                im.paste(p.profile.copy(), box)
+        self._overlay = tk.Label(app.root, justify='left', anchor='nw', font=('TkFixedFont', 8), fg='white', bg='black')
+        self._overlay.place(in_=app.game_cvs, x=Constants.BD_SIZE, y=Constants.BD_SIZE)
 
-                # Add gap between profiles
-                y = height + Constants.BLOCK_SIZE
+        def refresh():
+            self._overlay['text'] = self.summary()
+            app.root.after(round(interval * 1000), refresh)
 
-            self.app.update_next(im)
+        refresh()
 
-        def __str__(self):
-            """Creates a string representation of the coming pieces for debugging."""
-            fin = ''
-            for piece in self.pieces:
-                p = str(piece) + '\n'
-                fin += p
+    def dump(self, path):
+        """Writes every Histogram to path as JSON."""
+        global json
 
-            return fin
+        with open(path, 'w') as file:
+            json.dump({name: hist.to_dict() for name, hist in self.stats.items()}, file, indent=4)
 
 
-class RepeatedTimer:
-    """Uses threading.Timer to repeatedly use another thread to call a function every interval seconds.
+class Orientation:
+    """One rotation state of a tetris piece. Every state of every Piece class is built once when the class is created and shared by all of its instances.
 
-    Stolen from https://www.py4u.net/discuss/10170 (Answer #3)
+    Instance Variables
+    ------------------
+    blocks : tuple
+        A matrix corresponding to the orientation grid with None in empty spots and a Palette color in place of where blocks would be.
+    bounds : int tuple
+        The min_y, min_x, max_y, max_x of the blocks relative to the top left corner of the orientation grid.
+    cells : tuple
+        The relative_y, relative_x of every block.
+    columns : tuple
+        A (relative_x, top, bottom) tuple for every column of the grid that has blocks in it, where top and bottom are the relative_y of its highest and lowest block.
+    grid : tuple
+        A matrix of booleans describing the relative positions of all blocks.
+    masks : tuple
+        A (relative_y, mask) tuple for every row of the grid that has blocks in it. Bit x of mask is set when column x of that row has a block.
     """
-    global Timer
-
-    def __init__(self, interval, function, *args, **kwargs):
-        self._timer     = None
-        self.interval   = interval
-        self.function   = function
-        self.args       = args
-        self.kwargs     = kwargs
-        self.is_running = False
-
-        # Auto-run:
-        # self.start()
+    __slots__ = ('blocks', 'bounds', 'cells', 'columns', 'grid', 'masks')
 
-    def _run(self):
-        self.is_running = False
-        try:
-            self.function(*self.args, **self.kwargs)
-            self.start()
-        except RuntimeError:
-            print('RUNETIME ERROR: Shutting down drop loop.')
+    def __init__(self, grid, color):
+        """Computes everything about the orientation grid ahead of time.
 
-    def start(self):
-        if not self.is_running:
-            self._timer = Timer(self.interval, self._run)
-            self._timer.start()
-            self.is_running = True
+        Parameters
+        ----------
+        grid : bool list
+            A matrix of booleans describing the relative positions of all blocks.
+        color : int tuple
+            The Palette color of the piece.
+        """
+        self.grid = tuple(tuple(row) for row in grid)
+        self.blocks = tuple(tuple(color if block else None for block in row) for row in grid)
+        self.cells = tuple((y, x) for y, row in enumerate(grid) for x, block in enumerate(row) if block)
 
-    def stop(self):
-        try:
-            self._timer.cancel()
-        except AttributeError:
-            # Timer was never created
-            pass
-        self.is_running = False
+        masks = []
+        for y, row in enumerate(grid):
+            mask = 0
+            for x, block in enumerate(row):
+                if block:
+                    mask |= 1 << x
+            if mask:
+                masks.append((y, mask))
+        self.masks = tuple(masks)
+
+        columns = []
+        for x in sorted(set(x for y, x in self.cells)):
+            ys = [y for y, cell_x in self.cells if cell_x == x]
+            columns.append((x, min(ys), max(ys)))
+        self.columns = tuple(columns)
+
+        if self.cells:
+            ys = [y for y, x in self.cells]
+            xs = [x for y, x in self.cells]
+            self.bounds = (min(ys), min(xs), max(ys), max(xs))
+        else:
+            self.bounds = (0, 0, 0, 0)
 
 
 class Piece:
     """Base class for tetris piece.
 
+    Every orientation of a Piece class is computed once (see Orientation) when the class is created, and there is only ever one instance per orientation. A piece is just its class (the kind) and a rotation index into the class's orientations, so rotating is a lookup and never allocates.
+
     Class variables
     ---------------
     color : int tuple
         A 3 element list with 0 to 255 range decribing the rbg color to be shown when Blocks are rendered.
+    kind : str
+        The letter naming the piece.
+    orientations : tuple
+        Every Orientation of the piece, in clockwise order starting at _init_orient.
     profile : PIL.Image
         An image of the piece on it's side to be used in hold and next images.
     _init_orient : bool list
         A 4 by 4 list of booleans describing the relative positions of all Blocks in the initial orientation.
+    _instances : tuple
+        The interned instance of each orientation, indexed by rotation.
     _rot_for_profile : bool
         Tells if gen_profile should rotate before generating the profile. 1 for clockwise rotation, -1 for counter-clockwise, 0 for no rotation.
 
     Instance variables
     ------------------
-    orientation : bool list
-        A matrix of booleans describing the relative positions of all blocks.
-    _matrix_size : int
-        The size (same for x and y) of this piece's orient matrix.
+    rotation : int
+        Index of the current orientation in orientations.
     """
     global Palette
 
+    __slots__ = ('rotation',)
+
     color = Palette.BLANK
+    kind = None
 
     profile = None
     _rot_for_profile = 0
 
     _init_orient = [[False for x in range(4)] for y in range(4)]
 
-    _empty_orient = lambda self: [[False for x in range(self._matrix_size)] for y in range(self._matrix_size)]
+    orientations = ()
+    _instances = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """Builds the orientation table and interned instances of every Piece class as soon as it is defined."""
+        super().__init_subclass__(**kwargs)
+
+        cls.orientations = tuple(Orientation(grid, cls.color) for grid in cls._gen_orients())
+
+        instances = []
+        for rotation in range(len(cls.orientations)):
+            piece = object.__new__(cls)
+            piece.rotation = rotation
+            instances.append(piece)
+        cls._instances = tuple(instances)
+
+    @classmethod
+    def _gen_orients(cls):
+        """Creates the orientation grid of every rotation state by rotating _init_orient clockwise until it gets back to the start.
+
+        Returns
+        -------
+        list
+            The orientation grids in clockwise order.
+        """
+        size = len(cls._init_orient)
+        grids = [cls._init_orient]
+
+        while len(grids) < 4:
+            new_orientation = [[False for x in range(size)] for y in range(size)]
+
+            # Rotate
+            for y, row in enumerate(grids[-1]):
+                for x, block in enumerate(row):
+                    # size-1 is the index of the end of the matrix
+                    new_orientation[x][size-1-y] = block
+
+            if new_orientation == cls._init_orient:
+                break
+            grids.append(new_orientation)
+
+        return grids
 
-    def __init__(self, orientation=None):
-        """Initializes the orientation and color variables.
+    def __new__(cls, rotation=0):
+        """Returns the interned instance of the given rotation.
 
         Parameters
         ----------
-        orientation : bool list (default None)
-            An optional starting orientation. Used when rotating a piece so that it's new position can be tested before replacing origional orientation. A matrix of booleans describing the relative positions of all blocks.
+        rotation : int (default 0)
+            Index of the orientation. Wraps around the number of orientations.
         """
-        if orientation is None:
-            self.orientation = self._init_orient
-        else:
-            self.orientation = orientation
+        return cls._instances[rotation % len(cls._instances)]
 
-        self._matrix_size = len(self._init_orient)
+    def __reduce__(self):
+        """Pickles as the class and rotation so unpickling gives back the interned instance."""
+        return (self.__class__, (self.rotation,))
 
+    @property
+    def orientation(self):
+        """The orientation grid of the current rotation. A matrix of booleans describing the relative positions of all blocks."""
+        return self.orientations[self.rotation].grid
 
     def rotate_cw(self):
         """Rotates the Piece clockwise.
 
-        Calculates a new orientation grid and returns a new Piece-like object (same type as this one) with that orientation.
-
         Returns
         -------
         Piece-like
             The same type of piece but with an orientation grid rotated clockwise.
         """
-        new_orientation = self._empty_orient()
-
-        # Rotate
-        for y, row in enumerate(self.orientation):
-            for x, block in enumerate(row):
-                # self._matrix_size-1 is the index of the end of the matrix
-                new_orientation[x][self._matrix_size-1-y] = block
-
-        return self.__class__(new_orientation)
+        return self._instances[(self.rotation + 1) % len(self._instances)]
 
     def rotate_ccw(self):
-        """Rotates the Piece clockwise.
-
-        Calculates a new orientation grid and returns a new Piece-like object (same type as this one) with that orientation.
+        """Rotates the Piece counter-clockwise.
 
         Returns
         -------
         Piece-like
-            The same type of piece but with an orientation grid rotated clockwise.
+            The same type of piece but with an orientation grid rotated counter-clockwise.
         """
-        new_orientation = self._empty_orient()
+        return self._instances[(self.rotation - 1) % len(self._instances)]
 
-        # Rotate
-        for y, row in enumerate(self.orientation):
-            for x, block in enumerate(row):
-                # self._matrix_size-1 is the index of the end of the matrix
-                new_orientation[self._matrix_size-1-x][y] = block
-
-        return self.__class__(new_orientation)
 
+    def get_orientation(self):
+        """Returns the Orientation of the current rotation."""
+        return self.orientations[self.rotation]
 
     def get_blocks(self):
-        """Creates Block objects representing the current orientation.
+        """Returns a matrix corresponding to the orient with None in empty spots and a Palette color in place of where blocks would be. Shared between calls, do not modify."""
+        return self.orientations[self.rotation].blocks
+
+    def get_cells(self):
+        """Returns the relative_y, relative_x of every block in the current orientation."""
+        return self.orientations[self.rotation].cells
+
+    def get_columns(self):
+        """Returns a (relative_x, top, bottom) tuple for every column of the current orientation with blocks in it. See Orientation.columns."""
+        return self.orientations[self.rotation].columns
 
-        Cycles through the orientation grid and where True, creates a Block object and puts it in a list to iterate.
+    def get_masks(self):
+        """Returns the occupancy bitmasks of the current orientation for use with Board.
 
         Returns
         -------
-        list
-            Returns a matrix corresponding to the orient with None in empty spots and a Palette color in place of where blocks would be.
+        tuple
+            A (relative_y, mask) tuple for every row of the orientation grid that has blocks in it. Bit x of mask is set when column x of that row has a block.
         """
-        blocks = self._empty_orient()
+        return self.orientations[self.rotation].masks
 
-        for y, row in enumerate(self.orientation):
-            for x, block in enumerate(row):
-                if block:
-                    blocks[y][x] = self.color
+    def gen_profile(self, size=None):
+        """Creates a PIL.Image showing the piece on its side to be displayed in hold and next canvases.
 
-        return blocks
+        Parameters
+        ----------
+        size : int (default = None)
+            Pixels per block. If None, the image is made at Constants.BLOCK_SIZE and stored in profile. Otherwise it is only returned.
 
-    def gen_profile(self):
-        """Creates a PIL.Image showing the piece on its side to be displayed in hold and next canvases."""
+        Returns
+        -------
+        PIL.Image
+            The profile.
+        """
         global render
 
         # After possible rotation, the block should be oriented to fit in a 2 by 4 image.
@@ -1094,62 +3734,42 @@ class Piece:
         else:
             p = self
 
-        p = p.get_blocks()[:2]
         # If not a 4 by 4 matrix, add empty columns to fit the 2 by 4 image.
-        if len(p[0]) < 4:
-            for row in p:
-                row.append(None)
+        p = [list(row) + [None for x in range(4 - len(row))] for row in p.get_blocks()[:2]]
+
+        if size is not None:
+            return render(p, size=size)
 
         self.__class__.profile = render(p)
+        return self.profile
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.rotation})'
 
     def __str__(self):
         """Creates a string representation of the Piece for debuging."""
         fin = 'Color: ' + str(self.color) + '\n'
 
         for row in self.orientation:
-            fin += str(row) + '\n'
+            fin += str(list(row)) + '\n'
 
         return fin
 
 class Two_State_Piece(Piece):
-    """A tetris piece that specifically has two states (rotation states) and has altered rotation functions that abuse this fact.
+    """A tetris piece that specifically has two states (rotation states) instead of four. Rotating either way swaps between _init_orient and _alt_orient."""
 
-    Class Variables
-    ---------------
-    first_state : bool
-        Tells which state the piece is in. True if using _init_orient (first state), False if using _alt_orient (second state).
-    """
+    __slots__ = ()
 
     # Inherited Pieces should replace _init_orient and:
     _alt_orient = [[False for x in range(4)] for y in range(4)]
 
-    def __init__(self, init_orientation=True):
-        """Initializes the orientation and color variables.
-
-        Parameters
-        ----------
-        init_orientation : bool list (default True)
-            Determines if the piece is in first state (_init_orient) or second state (_alt_orient). True for first state, False for second.
-        """
-        if init_orientation:
-            self.orientation = self._init_orient
-            self.first_state = True
-        else:
-            self.orientation = self._alt_orient
-            self.first_state = False
-
-        self._matrix_size = len(self._init_orient)
-
-
-    def rotate_cw(self):
-        """Overwrites Piece.rotate_cw to just returning a new piece with the opposite orientation."""
-        return self.__class__(not self.first_state)
-
-    def rotate_ccw(self):
-        """Overwrites Piece.rotate_ccw to just returning a new piece with the opposite orientation."""
-        return self.__class__(not self.first_state)
+    @classmethod
+    def _gen_orients(cls):
+        """Overwrites Piece._gen_orients to just the two states."""
+        return [cls._init_orient, cls._alt_orient]
 
 class I_Piece(Piece):
+    __slots__ = ()
 
     _init_orient = [
         [True, False, False, False],
@@ -1165,8 +3785,10 @@ class I_Piece(Piece):
     #     [False, False, False, False]
     # ]
     color = Palette.I
+    kind = 'I'
     _rot_for_profile = 1
 class J_Piece(Piece):
+    __slots__ = ()
 
     _init_orient = [
         [False, True, False],
@@ -1174,8 +3796,10 @@ class J_Piece(Piece):
         [True, True, False]
     ]
     color = Palette.J
+    kind = 'J'
     _rot_for_profile = 1
 class L_Piece(Piece):
+    __slots__ = ()
 
     _init_orient = [
         [False, True, False],
@@ -1183,8 +3807,10 @@ class L_Piece(Piece):
         [False, True, True]
     ]
     color = Palette.L
+    kind = 'L'
     _rot_for_profile = -1
 class S_Piece(Two_State_Piece):
+    __slots__ = ()
 
     _init_orient = [
         [False, True, True],
@@ -1197,7 +3823,9 @@ class S_Piece(Two_State_Piece):
         [False, True, False]
     ]
     color = Palette.S
+    kind = 'S'
 class Z_Piece(Two_State_Piece):
+    __slots__ = ()
 
     _init_orient = [
         [True, True, False],
@@ -1210,7 +3838,9 @@ class Z_Piece(Two_State_Piece):
         [False, True, False]
     ]
     color = Palette.Z
+    kind = 'Z'
 class T_Piece(Piece):
+    __slots__ = ()
 
     _init_orient = [
         [False, True, False],
@@ -1218,7 +3848,9 @@ class T_Piece(Piece):
         [False, False, False]
     ]
     color = Palette.T
+    kind = 'T'
 class O_Piece(Piece):
+    __slots__ = ()
 
     _init_orient = [
         [False, True, True],
@@ -1226,13 +3858,12 @@ class O_Piece(Piece):
         [False, False, False]
     ]
     color = Palette.O
+    kind = 'O'
 
-    def rotate_cw(self):
-        """Overrides Piece.rotate_cw. Returns self to avoid issues."""
-        return self
-    def rotate_ccw(self):
-        """Overrides Piece.rotate_cw. Returns self to avoid issues."""
-        return self
+    @classmethod
+    def _gen_orients(cls):
+        """Overrides Piece._gen_orients. Rotating an O changes nothing, so it only has one state."""
+        return [cls._init_orient]
 
 PIECES = (I_Piece, J_Piece, L_Piece, S_Piece, Z_Piece, T_Piece, O_Piece)
 
@@ -1275,8 +3906,104 @@ def freeze_test(game):
         elif '2' in inp:
             game.make_permanent()
 
+        game.draw_frame()
+
 if __name__ == '__main__':
-    for p in PIECES:
-        p().gen_profile()
+    main_start = perf_counter()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='A recreation of the classic game of Tetris.')
+    parser.add_argument('--backend', choices=Constants.BACKENDS, default=Constants.BACKEND, help="how the gamefield is drawn; 'canvas' skips PIL for the gamefield (default: %(default)s)")
+    parser.add_argument('--seed', type=int, help='seed of the piece sequence (default: random)')
+    parser.add_argument('--randomizer', choices=Engine.Piece_Buffer.MODES, default=Constants.RANDOMIZER, help="how pieces are picked; 'bag' deals all 7 pieces before repeating (default: %(default)s)")
+    parser.add_argument('--width', type=int, default=Constants.BOARD_WIDTH, help='columns of the gamefield (default: %(default)s)')
+    parser.add_argument('--height', type=int, default=Constants.BOARD_HEIGHT, help='displayed rows of the gamefield (default: %(default)s)')
+    parser.add_argument('--hidden', type=int, default=Constants.HIDDEN_ROWS, help='rows above the gamefield where pieces start (default: %(default)s)')
+    parser.add_argument('--record', metavar='DIR', help='save a replay of every game to DIR')
+    parser.add_argument('--replay', metavar='FILE', nargs='+', help='play replay files headless as fast as possible and print their results instead of playing')
+    parser.add_argument('--stride', type=int, default=0, help='with --replay, render every STRIDE frames (default: no rendering)')
+    parser.add_argument('--record-frames', metavar='PATH', help="stream every frame as raw rgb24 bytes to PATH, '-' for stdout")
+    parser.add_argument('--ring-slots', type=int, default=0, help='with --record-frames, make PATH a memory-mapped ring buffer of this many frames instead of a stream')
+    parser.add_argument('--frames-dir', metavar='DIR', help='with --replay and --stride, save the rendered frames to DIR as PNG files')
+    parser.add_argument('--profile', metavar='FILE', help='time the hot paths and write the histograms to FILE as JSON on exit')
+    parser.add_argument('--overlay', action='store_true', help='time the hot paths and show the frame time and top costs over the gamefield')
+    parser.add_argument('--state', metavar='FILE', help='file F5 saves the game in progress to and F9 loads it from')
+    parser.add_argument('--startup-time', action='store_true', help='print how long each stage of starting up takes (without opening a window) and exit')
+    args = parser.parse_args()
+
+    if args.startup_time:
+        print(f'import:        {(main_start - _import_start) * 1000:7.1f} ms')
+
+        start = perf_counter()
+        engine = Engine(seed=args.seed, randomizer=args.randomizer, width=args.width, height=args.height, hidden=args.hidden)
+        print(f'Engine():      {(perf_counter() - start) * 1000:7.1f} ms  (PIL imported: {"PIL" in sys.modules}, tkinter imported: {"tkinter" in sys.modules})')
+
+        start = perf_counter()
+        Field_Renderer(engine.board, engine.hidden).draw(engine.current, engine.current_coord)
+        print(f'first frame:   {(perf_counter() - start) * 1000:7.1f} ms  (PIL import and sprite atlas)')
+
+        start = perf_counter()
+        get_profiles()
+        print(f'profiles:      {(perf_counter() - start) * 1000:7.1f} ms')
+
+        print(f'cache:         {Constants.CACHE_DIR}')
+        sys.exit()
+
+    profiler = None
+    if args.profile or args.overlay:
+        profiler = Profiler()
+        profiler.enable()
+
+    frame_sink = None
+    if args.record_frames == '-':
+        frame_sink = Frame_Sink(sys.stdout.buffer)
+    elif args.record_frames and args.ring_slots:
+        frame_sink = Ring_Buffer_Sink(args.record_frames, args.ring_slots)
+    elif args.record_frames:
+        frame_sink = Frame_Sink(open(args.record_frames, 'wb'))
+
+    # Keep stdout clean when frames are streamed to it
+    out = sys.stderr if args.record_frames == '-' else sys.stdout
+
+    if args.replay:
+        stride = args.stride or int(bool(frame_sink or args.frames_dir))
+        if args.frames_dir:
+            os.makedirs(args.frames_dir, exist_ok=True)
+
+        start = monotonic()
+        for path in args.replay:
+            renderer = None
+            frames = 0
+
+            def on_frame(engine, time):
+                global renderer, frames
+
+                if frame_sink is not None:
+                    if renderer is None:
+                        frame_sink.attach(engine.board, engine.hidden)
+                        renderer = frame_sink.renderer
+                    frame_sink.write(engine.current, engine.current_coord)
+                else:
+                    if renderer is None:
+                        renderer = Field_Renderer(engine.board, engine.hidden)
+                    renderer.draw(engine.current, engine.current_coord)
+                frames += 1
+
+                if args.frames_dir:
+                    name = os.path.splitext(os.path.basename(path))[0]
+                    renderer.image.save(os.path.join(args.frames_dir, f'{name}-{frames:06}.png'))
+
+            engine = Replay.load(path).play(stride, on_frame)
+            print(f'{path}: score {engine.score}, lines {engine.lines_complete}, {"lost" if engine.game_over else "not lost"}' + (f', {frames} frames' if stride else ''), file=out)
+
+        print(f'{len(args.replay)} replays in {monotonic() - start:.2f}s', file=out)
+        if frame_sink is not None:
+            frame_sink.close()
+            print(f'{frame_sink.frames} frames of {frame_sink.size[0]}x{frame_sink.size[1]} rgb24', file=out)
+
+    else:
+        game = Game(backend=args.backend, seed=args.seed, randomizer=args.randomizer, record_dir=args.record, frame_sink=frame_sink, overlay=profiler if args.overlay else None, state_file=args.state,
+                    width=args.width, height=args.height, hidden=args.hidden)
 
-    game = Game()
+    if args.profile:
+        profiler.dump(args.profile)
@@ -0,0 +1,368 @@
+"""Two-player versus mode over the network.
+
+A Versus_Server pairs up players that connect to it and gives both the same seed, so they get the same pieces. After that it relays every message one player sends to the other. Clearing lines sends rows of garbage to the opponent (see GARBAGE_LINES), which land at the bottom of their board after their next placement. Lines cleared while garbage is waiting cancel it out first.
+
+Boards are never sent. Every client keeps a copy of the opponent's Engine and replays the opponent's inputs on it, which gives the exact same board since the engine is deterministic. All that goes over the wire are fixed size messages (see MESSAGE) for inputs, garbage and the end of the game.
+
+The network runs on an asyncio event loop in its own thread (Connection). It hands received messages to the tk thread through a queue that is emptied once per frame, and the tk thread hands messages to send back with call_soon_threadsafe, so the game loop never waits on the network.
+
+Usage:
+    python versus.py --serve             # run the server
+    python versus.py                     # play, on each of the two machines
+"""
+import asyncio
+import queue
+import struct
+import sys
+import threading
+from random import randrange
+
+from tetris import App, Canvas_Renderer, Constants, Engine, Game, Palette, Replay, tk, messagebox
+
+
+# Rows of garbage sent for clearing 0, 1, 2, 3 or 4 lines at once
+GARBAGE_LINES = (0, 0, 1, 2, 4)
+
+# Every message is a kind and two arguments, one byte each
+MESSAGE = struct.Struct('<BBB')
+# Sent by the server once a player is paired: the player number, the index of the randomizer in Engine.Piece_Buffer.MODES and the seed
+START = struct.Struct('<BBQ')
+
+# Message kinds
+# An action or tick of the sender's engine, the argument is the index in Replay.EVENTS
+EVENT = 0
+# The sender added garbage to its board: number of rows and the empty column
+GARBAGE = 1
+# Garbage for the receiver: number of rows and the empty column
+ATTACK = 2
+# The sender lost, or left
+LOST = 3
+
+
+class Versus_Server:
+    """Pairs up the players that connect, in the order they connect, and relays messages between every pair.
+
+    Instance Variables
+    ------------------
+    randomizer : str
+        How the pieces of every game are picked, one of Engine.Piece_Buffer.MODES.
+    seed : int
+        Seed of every game, None to pick a new one for every pair.
+    _waiting : tuple
+        The reader and writer of the player waiting for an opponent, None if nobody is waiting.
+    """
+
+    def __init__(self, seed=None, randomizer=None):
+        """Sets up the server. Nothing is served until serve is called.
+
+        Parameters
+        ----------
+        seed : int (default = None)
+            Seed of every game. If None, every pair gets a random seed.
+        randomizer : str (default = None)
+            How pieces are picked, one of Engine.Piece_Buffer.MODES. If None, Constants.RANDOMIZER is used.
+        """
+        if randomizer is None:
+            randomizer = Constants.RANDOMIZER
+
+        self.seed = seed
+        self.randomizer = randomizer
+        self._waiting = None
+
+    async def handle(self, reader, writer):
+        """asyncio.start_server callback for every player that connects."""
+        # The waiting player could have left in the meantime
+        if self._waiting is None or self._waiting[0].at_eof():
+            self._waiting = (reader, writer)
+            return
+
+        other_reader, other_writer = self._waiting
+        self._waiting = None
+
+        seed = self.seed if self.seed is not None else randrange(1 << 32)
+        randomizer = Engine.Piece_Buffer.MODES.index(self.randomizer)
+        other_writer.write(START.pack(0, randomizer, seed))
+        writer.write(START.pack(1, randomizer, seed))
+
+        await asyncio.gather(self._relay(other_reader, writer), self._relay(reader, other_writer))
+
+    async def _relay(self, reader, writer):
+        """Passes every message from reader on to writer. When reader closes, the player lost (if they did not already say so) and writer is closed."""
+        try:
+            while True:
+                message = await reader.readexactly(MESSAGE.size)
+                writer.write(message)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+        if not writer.is_closing():
+            writer.write(MESSAGE.pack(LOST, 0, 0))
+            writer.close()
+
+    async def serve(self, host, port):
+        """Accepts players on host and port until cancelled."""
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class Connection:
+    """A player's connection to a Versus_Server, run by an asyncio event loop on a background thread.
+
+    Instance Variables
+    ------------------
+    incoming : queue.SimpleQueue
+        Every message received, as (kind, a, b) tuples. The first one is ('start', player, randomizer, seed) and when the connection closes (LOST, 0, 0) is added.
+    loop : asyncio.AbstractEventLoop
+        The event loop of the network thread.
+    thread : threading.Thread
+        The network thread.
+    _writer : asyncio.StreamWriter
+        Writes to the server. None until connected.
+    """
+
+    def __init__(self, host, port):
+        """Starts connecting to the server on the network thread. Returns right away.
+
+        Parameters
+        ----------
+        host : str
+            Address of the server.
+        port : int
+            Port of the server.
+        """
+        self.incoming = queue.SimpleQueue()
+        self.loop = asyncio.new_event_loop()
+        self._writer = None
+
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._run(host, port),), daemon=True)
+        self.thread.start()
+
+    async def _run(self, host, port):
+        """Connects, then puts every message received in incoming until the connection closes."""
+        try:
+            reader, self._writer = await asyncio.open_connection(host, port)
+
+            self.incoming.put(('start',) + START.unpack(await reader.readexactly(START.size)))
+            while True:
+                self.incoming.put(MESSAGE.unpack(await reader.readexactly(MESSAGE.size)))
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+
+        self.incoming.put((LOST, 0, 0))
+
+    def send(self, kind, a=0, b=0):
+        """Sends a message to the opponent. Never blocks, the message is written by the network thread.
+
+        Parameters
+        ----------
+        kind : int
+            The kind of message, EVENT, GARBAGE, ATTACK or LOST.
+        a : int (default = 0)
+            First argument, 0 to 255.
+        b : int (default = 0)
+            Second argument, 0 to 255.
+        """
+        message = MESSAGE.pack(kind, a, b)
+        self.loop.call_soon_threadsafe(self._write, message)
+
+    def _write(self, message):
+        """Writes message on the network thread."""
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(message)
+
+    def close(self):
+        """Closes the connection."""
+        if self._writer is not None:
+            self.loop.call_soon_threadsafe(self._writer.close)
+
+
+class Versus_Game(Game):
+    """A Game against an opponent over a Connection. Shows a copy of the opponent's board, replayed from their inputs, next to the player's own.
+
+    Instance Variables
+    ------------------
+    connection : Connection
+        The connection to the server.
+    opponent : Engine
+        Copy of the opponent's game, advanced by the messages they send.
+    opponent_cvs : tk.Canvas
+        Canvas showing the opponent's board.
+    opponent_renderer : Canvas_Renderer
+        Draws the opponent's board on opponent_cvs.
+    pending_garbage : list
+        Garbage sent by the opponent that is not on the board yet, as (lines, hole) tuples.
+    result : str
+        'won' or 'lost' once the game is over, otherwise None.
+    _opponent_redraw : bool
+        True when the opponent's board changed since it was last drawn.
+    """
+
+    def __init__(self, connection, seed, randomizer=None, backend=None):
+        """Creates the App with an extra canvas for the opponent, then starts the game like Game does.
+
+        Parameters
+        ----------
+        connection : Connection
+            Connection to the server, already paired (its start message read).
+        seed : int
+            Seed of the game, given by the server.
+        randomizer : str (default = None)
+            See Engine. Given by the server.
+        backend : str (default = None)
+            See App.
+        """
+        self.connection = connection
+        self.opponent = Engine(seed, randomizer)
+        self.pending_garbage = []
+        self.result = None
+        self._opponent_redraw = False
+
+        app = App(self, backend)
+
+        # Half size, so it does not change with the window and App.apply_resize stays right
+        size = Constants.BLOCK_SIZE // 2
+        board = self.opponent.board
+        self.opponent_cvs = tk.Canvas(app.root, width=board.width * size, height=(board.height - self.opponent.hidden) * size)
+        self.opponent_cvs.grid(row=0, column=3, rowspan=2, sticky='n')
+        self.opponent_cvs['relief'] = 'sunken'
+        self.opponent_cvs['bd'] = Constants.BD_SIZE
+        app.set_background(Palette.BLANK_HEX, self.opponent_cvs)
+        self.opponent_renderer = Canvas_Renderer(board, self.opponent.hidden, self.opponent_cvs, size)
+        self.opponent_renderer.draw(self.opponent.current, self.opponent.current_coord)
+
+        super().__init__(app, seed=seed, randomizer=randomizer)
+
+    def step(self, action):
+        """Overrides Engine.step to also send action to the opponent."""
+        self.connection.send(EVENT, Replay.EVENTS.index(action))
+        return super().step(action)
+
+    def tick(self):
+        """Overrides Engine.tick to also send the tick to the opponent."""
+        self.connection.send(EVENT, Replay.EVENTS.index('tick'))
+        return super().tick()
+
+    def make_permanent(self):
+        """Overrides Game.make_permanent to add the pending garbage to the board after the piece is placed."""
+        super().make_permanent()
+
+        while self.pending_garbage and not self.game_over:
+            lines, hole = self.pending_garbage.pop(0)
+            self.connection.send(GARBAGE, lines, hole)
+            self.add_garbage(lines, hole)
+
+    def score_manager(self, lines):
+        """Overrides Game.score_manager to send garbage for the lines cleared, after cancelling out pending garbage with it."""
+        super().score_manager(lines)
+
+        garbage = GARBAGE_LINES[min(lines, 4)]
+        while garbage and self.pending_garbage:
+            pending, hole = self.pending_garbage[0]
+            cancelled = min(garbage, pending)
+            garbage -= cancelled
+            if cancelled == pending:
+                self.pending_garbage.pop(0)
+            else:
+                self.pending_garbage[0] = (pending - cancelled, hole)
+
+        if garbage:
+            self.connection.send(ATTACK, garbage, randrange(self.board.width))
+
+    def receive(self):
+        """Applies every message the opponent sent since the last frame. Never waits for the network."""
+        while self.result is None:
+            try:
+                kind, a, b = self.connection.incoming.get_nowait()
+            except queue.Empty:
+                return
+
+            if kind == EVENT:
+                event = Replay.EVENTS[a]
+                if event == 'tick':
+                    self.opponent.tick()
+                else:
+                    self.opponent.step(event)
+                self._opponent_redraw = True
+            elif kind == GARBAGE:
+                self.opponent.add_garbage(a, b)
+                self._opponent_redraw = True
+            elif kind == ATTACK:
+                self.pending_garbage.append((a, b))
+            elif kind == LOST:
+                self.end('won')
+
+    def frame(self):
+        """Overrides Game.frame to apply the opponent's messages first and draw their board if it changed."""
+        self.receive()
+        if self.result is not None:
+            return
+
+        super().frame()
+
+        if self._opponent_redraw:
+            self._opponent_redraw = False
+            self.opponent_renderer.draw(self.opponent.current, self.opponent.current_coord)
+
+    def lose(self, event=None):
+        """Overrides Game.lose to tell the opponent instead of asking to play again."""
+        Engine.lose(self)
+        if self.result is None:
+            self.connection.send(LOST)
+            self.end('lost')
+
+    def stop(self, event=None):
+        """Overrides Game.stop, closing the window gives up."""
+        if self.result is None:
+            self.lose()
+        else:
+            super().stop()
+
+    def end(self, result):
+        """Stops the game with result ('won' or 'lost') and shows it once the current frame is done."""
+        self.result = result
+        self.loop.stop()
+        self.app.root.after_idle(self.show_result)
+
+    def show_result(self):
+        """Shows who won, then closes the connection and the window."""
+        message = 'You won!' if self.result == 'won' else 'You lost.'
+        message += f'\n\nScore - {self.score}\nLines - {self.lines_complete}'
+        messagebox.showinfo('Game Over', message)
+
+        self.connection.close()
+        self.app.root.destroy()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Two-player versus tetris over the network.')
+    parser.add_argument('--serve', action='store_true', help='run the server that pairs up players instead of playing')
+    parser.add_argument('--host', default='127.0.0.1', help='address of the server, or to serve on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=7437, help='port of the server, or to serve on (default: %(default)s)')
+    parser.add_argument('--seed', type=int, help='with --serve, seed of every game (default: random)')
+    parser.add_argument('--randomizer', choices=Engine.Piece_Buffer.MODES, default=Constants.RANDOMIZER, help="with --serve, how pieces are picked (default: %(default)s)")
+    parser.add_argument('--backend', choices=Constants.BACKENDS, default=Constants.BACKEND, help='how the gamefield is drawn (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.serve:
+        print(f'Serving on {args.host}:{args.port}')
+        try:
+            asyncio.run(Versus_Server(args.seed, args.randomizer).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        connection = Connection(args.host, args.port)
+        print('Waiting for an opponent...')
+
+        start = connection.incoming.get()
+        if start[0] != 'start':
+            sys.exit(f'Could not connect to {args.host}:{args.port}')
+        kind, player, randomizer, seed = start
+
+        Versus_Game(connection, seed, Engine.Piece_Buffer.MODES[randomizer], args.backend)